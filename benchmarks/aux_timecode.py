@@ -0,0 +1,46 @@
+"""
+aux1 frames and HH:MM:SS:FF strings of a bin, the python loop against the numpy pass.
+
+    python benchmarks/aux_timecode.py [--clips 100000] [--points 8]
+
+The drift table has --points sync points over the day, like the clapper marks of a shooting day
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_helper.utils.timecode import FRAMESPERDAY, DriftTable, drift_frames, frame_strings  # noqa: E402
+
+
+def measure(frames, table, vector):
+    start = time.perf_counter()
+    result = frame_strings(drift_frames(frames, table, vector=vector), vector=vector)
+    return time.perf_counter() - start, result
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--clips', type=int, default=100000)
+    p.add_argument('--points', type=int, default=8)
+    arguments = p.parse_args()
+
+    rnd = random.Random(0)
+    frames = [rnd.randrange(FRAMESPERDAY) for _ in range(arguments.clips)]
+    points = sorted(rnd.sample(range(FRAMESPERDAY), max(arguments.points, 2)))
+    table = DriftTable(tuple(points), tuple(12295 + rnd.randrange(-3, 4) for _ in points))
+
+    scalar_time, scalar = measure(frames, table, vector=False)
+    vector_time, vector = measure(frames, table, vector=True)
+    print(f'clips   {len(frames)}')
+    print(f'points  {len(points)}')
+    print(f'python  {scalar_time:.3f} s')
+    print(f'numpy   {vector_time:.3f} s')
+    print(f'same    {scalar == vector}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Memory of the fcpxml object model per clip.
+
+    python benchmarks/clip_memory.py export.xml [--lazy]
+
+Run it on two commits to compare them. Python objects are counted by tracemalloc,
+lxml allocates in C and is only seen in the resident set size, so both are reported
+"""
+import argparse
+import gc
+import os
+import resource
+import sys
+import tracemalloc
+
+from lxml import etree
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_helper.utils.fcpxml import Clip  # noqa: E402
+
+
+def rss() -> int:
+    """
+    Current resident set size in bytes, the peak one where /proc is missing
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('file')
+    p.add_argument('--lazy', action='store_true', default=False)
+    arguments = p.parse_args()
+
+    elements = list(etree.parse(arguments.file).getroot().iter('clip'))
+    gc.collect()
+    rss_before = rss()
+    tracemalloc.start()
+    clips = [Clip.Clip(element, arguments.lazy) for element in elements]
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+    rss_after = rss()
+
+    print(f'clips          {len(clips)}')
+    print(f'python objects {traced / len(clips):.0f} bytes per clip (tracemalloc)')
+    print(f'resident set   {(rss_after - rss_before) / len(clips):.0f} bytes per clip (rss)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""
+Synthetic xmeml v5 project like the ones exported for log_helper.
+
+    python benchmarks/generate.py project.xml [--bins 1] [--videos 10] [--audios 10] [--tracks 4] [--seed 0]
+
+Every bin is one shooting day: camera clips with the clapper IN mark on the first one and the OUT mark
+on the last one, polywav sound clips named like in sound reports, the recorder drifting from the camera
+by --drift frames over the day. The same seed gives the same file
+"""
+import argparse
+import random
+import uuid
+
+from lxml import etree
+
+TIMEBASE = 25
+FRAMESPERDAY = 24 * 60 * 60 * TIMEBASE
+SCENES, SHOTS, TAKES = 60, 12, 9
+
+
+class Generator:
+    def __init__(self, seed: int = 0):
+        self.random = random.Random(seed)
+
+    def uuid(self) -> str:
+        return str(uuid.UUID(int=self.random.getrandbits(128), version=4)).upper()
+
+    def project(self, bins: int = 1, videos: int = 10, audios: int = 10, tracks: int = 4,
+                drift: int = 3) -> etree._Element:
+        root = etree.Element('xmeml', version='5')
+        for idx in range(bins):
+            self.bin(root, idx, videos, audios, tracks, drift)
+        return root
+
+    def bin(self, root: etree._Element, idx: int, videos: int, audios: int, tracks: int, drift: int):
+        bin_ = sub(root, 'bin')
+        sub(bin_, 'uuid', self.uuid())
+        sub(bin_, 'updatebehavior', 'add')
+        sub(bin_, 'name', f'Day{idx + 1:02d}')
+        children = sub(bin_, 'children')
+
+        day_start = (9 + idx) * 3600 * TIMEBASE
+        video_clips = []
+        position = day_start
+        for _ in range(videos):
+            duration = self.random.randint(250, 3000)
+            video_clips.append((position, duration))
+            position += duration + self.random.randint(100, 1000)
+        day_length = max(position - day_start, 1)
+
+        for clip_idx, (position, duration) in enumerate(video_clips):
+            name = f'A{idx + 1:03d}C{clip_idx + 1:03d}'
+            self.clip(children, f'{name}_{self.random.randint(100000, 999999)}', f'{name}.mov', duration, position,
+                      True, 2, in_=50 if clip_idx == 0 else -1, out=60 if clip_idx == videos - 1 else -1)
+
+        series = self.random.choice(['101', '102', '215', '4'])
+        # every take of a day is recorded once, merge pairs clips by shot and take
+        numbers = self.random.sample(range(max(audios, SCENES * SHOTS * TAKES)), audios)
+        for clip_idx, number in enumerate(numbers):
+            position, duration = video_clips[clip_idx % len(video_clips)] if video_clips else (day_start, 1000)
+            offset = 12345 + round(drift * (position - day_start) / day_length)
+            name = self.sound_name(series, number)
+            self.clip(children, f'{name}.WAV', f'{name}.WAV', duration + 100, (position - 50 + offset) % FRAMESPERDAY,
+                      False, tracks, in_=50 if clip_idx == 0 else -1, out=60 if clip_idx == audios - 1 else -1)
+
+    def sound_name(self, series: str, number: int) -> str:
+        scene, take = divmod(number, SHOTS * TAKES)
+        shot, take = divmod(take, TAKES)
+        scene, shot, take = scene + 1, shot + 1, take + 1
+        return self.random.choice([f'{series}_{scene}_{shot}_{take}', f'{series}-{scene}-{shot}T{take}',
+                                   f'{series}.{scene}_{shot}-{take}', f'{series}_{scene}f_{shot}_{take}p',
+                                   f'{series}_{scene}_{shot}d_{take}', f'{series}_{scene}-2_{shot}_{take}'])
+
+    def clip(self, parent: etree._Element, clip_id: str, file_name: str, duration: int, frame: int, is_video: bool,
+             tracks: int, in_: int = -1, out: int = -1):
+        clip = sub(parent, 'clip', id=clip_id)
+        sub(clip, 'uuid', self.uuid())
+        sub(clip, 'updatebehavior', 'add')
+        sub(clip, 'name', clip_id)
+        sub(clip, 'duration', duration)
+        rate(clip)
+        sub(clip, 'in', in_)
+        sub(clip, 'out', out)
+        sub(clip, 'masterclipid', clip_id)
+        sub(clip, 'ismasterclip', 'TRUE')
+        log_block(clip)
+
+        links = [(clip_id + '1', 'video', 1)] if is_video else []
+        links.extend((clip_id + str(track + 2), 'audio', track + 1) for track in range(tracks))
+        media = sub(clip, 'media')
+        if is_video:
+            track = sub(sub(media, 'video'), 'track')
+            self.clipitem(track, clip_id + '1', clip_id, duration, file_name, frame, True, True, 0, links, tracks)
+            track_flags(track)
+        audio = sub(media, 'audio')
+        for idx in range(tracks):
+            track = sub(audio, 'track')
+            # polywav tracks share the file of the first one
+            self.clipitem(track, clip_id + str(idx + 2), clip_id, duration, file_name, frame, not is_video and idx == 0,
+                          False, idx + 1, links, tracks)
+            track_flags(track)
+        return clip
+
+    def clipitem(self, parent: etree._Element, item_id: str, name: str, duration: int, file_name: str, frame: int,
+                 full_file: bool, is_video: bool, trackindex: int, links: list, tracks: int):
+        clipitem = sub(parent, 'clipitem', id=item_id)
+        sub(clipitem, 'name', name)
+        sub(clipitem, 'duration', duration)
+        rate(clipitem)
+        for tag in ('in', 'out', 'start', 'end'):
+            sub(clipitem, tag, -1)
+        if is_video:
+            sub(clipitem, 'pixelaspectratio', 'square')
+            sub(clipitem, 'anamorphic', 'FALSE')
+            sub(clipitem, 'alphatype', 'none')
+        sub(clipitem, 'masterclipid', name)
+        log_block(clipitem)
+
+        file_ = sub(clipitem, 'file', id=file_name)
+        if full_file:
+            self.file(file_, file_name, duration, frame, is_video, tracks)
+        if not is_video:
+            audio_levels(clipitem)
+
+        sourcetrack = sub(clipitem, 'sourcetrack')
+        sub(sourcetrack, 'mediatype', 'video' if is_video else 'audio')
+        if trackindex:
+            sub(sourcetrack, 'trackindex', trackindex)
+        for linkclipref, mediatype, link_trackindex in links:
+            link = sub(clipitem, 'link')
+            sub(link, 'linkclipref', linkclipref)
+            sub(link, 'mediatype', mediatype)
+            sub(link, 'trackindex', link_trackindex)
+            sub(link, 'clipindex', 1)
+            if mediatype == 'audio':
+                sub(link, 'groupindex', 1)
+        if is_video:
+            sub(clipitem, 'fielddominance', 'none')
+        sub(sub(clipitem, 'itemhistory'), 'uuid', self.uuid())
+
+    @staticmethod
+    def file(file_: etree._Element, file_name: str, duration: int, frame: int, is_video: bool, tracks: int):
+        sub(file_, 'name', file_name)
+        sub(file_, 'pathurl', f'file://localhost/Volumes/MEDIA/{file_name}')
+        rate(file_)
+        sub(file_, 'duration', duration)
+        if is_video:
+            metadata = sub(file_, 'metadata')
+            sub(metadata, 'storage', 'QuickTime')
+            sub(metadata, 'key', 'com.apple.proapps.spotlight.kMDItemCodecs')
+            sub(metadata, 'size', 8)
+            sub(metadata, 'type', 'UTF8')
+            sub(metadata, 'value', 'Apple ProRes 422 HQ')
+        timecode(file_, frame)
+
+        media = sub(file_, 'media')
+        if is_video:
+            video = sub(media, 'video')
+            sub(video, 'duration', duration)
+            samplecharacteristics = sub(video, 'samplecharacteristics')
+            sub(samplecharacteristics, 'width', 1920)
+            sub(samplecharacteristics, 'height', 1080)
+        audio = sub(media, 'audio')
+        samplecharacteristics = sub(audio, 'samplecharacteristics')
+        sub(samplecharacteristics, 'samplerate', 48000)
+        sub(samplecharacteristics, 'depth', 24)
+        sub(audio, 'channelcount', 2 if is_video else tracks)
+
+
+def sub(parent: etree._Element, tag: str, text=None, **attributes) -> etree._Element:
+    element = etree.SubElement(parent, tag, **attributes)
+    if text is not None:
+        element.text = str(text)
+    return element
+
+
+def rate(parent: etree._Element):
+    rate_ = sub(parent, 'rate')
+    sub(rate_, 'ntsc', 'FALSE')
+    sub(rate_, 'timebase', TIMEBASE)
+
+
+def timecode(parent: etree._Element, frame: int):
+    timecode_ = sub(parent, 'timecode')
+    rate(timecode_)
+    seconds, frames = divmod(frame, TIMEBASE)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    sub(timecode_, 'string', f'{hours:02d}:{minutes:02d}:{seconds:02d}:{frames:02d}')
+    sub(timecode_, 'frame', frame)
+    sub(timecode_, 'displayformat', 'NDF')
+    sub(timecode_, 'source', 'source')
+
+
+def log_block(parent: etree._Element):
+    logginginfo = sub(parent, 'logginginfo')
+    for tag in ('scene', 'shottake', 'lognote', 'good'):
+        sub(logginginfo, tag)
+    sub(sub(parent, 'labels'), 'label2')
+    comments = sub(parent, 'comments')
+    for idx in range(1, 5):
+        sub(comments, f'mastercomment{idx}')
+
+
+def audio_levels(clipitem: etree._Element):
+    effect = sub(sub(clipitem, 'filter'), 'effect')
+    sub(effect, 'name', 'Audio Levels')
+    sub(effect, 'effectid', 'audiolevels')
+    sub(effect, 'effectcategory', 'audiolevels')
+    sub(effect, 'effecttype', 'audiolevels')
+    sub(effect, 'mediatype', 'audio')
+    parameter = sub(effect, 'parameter')
+    sub(parameter, 'name', 'Level')
+    sub(parameter, 'parameterid', 'level')
+    sub(parameter, 'valuemin', 0)
+    sub(parameter, 'valuemax', 3.98109)
+    sub(parameter, 'value', 1)
+
+
+def track_flags(track: etree._Element):
+    sub(track, 'enabled', 'TRUE')
+    sub(track, 'locked', 'FALSE')
+
+
+def write_project(path: str, root: etree._Element):
+    etree.ElementTree(root).write(path, pretty_print=True, xml_declaration=True, encoding='UTF-8',
+                                  doctype='<!DOCTYPE xmeml>')
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('output')
+    p.add_argument('--bins', type=int, default=1)
+    p.add_argument('--videos', type=int, default=10)
+    p.add_argument('--audios', type=int, default=10)
+    p.add_argument('--tracks', type=int, default=4)
+    p.add_argument('--drift', type=int, default=3, help='recorder drift over the day, frames')
+    p.add_argument('--seed', type=int, default=0)
+    arguments = p.parse_args()
+
+    root = Generator(arguments.seed).project(arguments.bins, arguments.videos, arguments.audios, arguments.tracks,
+                                             arguments.drift)
+    write_project(arguments.output, root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Sound file name parsing, the uncached get_log_from_name + *_correcting chain against parse_log_name.
+
+    python benchmarks/log_name.py [--names 100000] [--tracks 4]
+
+Tracks of a polywav set share the name, --tracks is how many times every name repeats
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_helper.log_helper import (get_log_from_name, parse_log_name, scene_correcting, series_correcting,  # noqa: E402
+                                   shot_correcting, take_correcting)
+
+
+def random_names(count: int, tracks: int, seed: int = 0):
+    rnd = random.Random(seed)
+    names = []
+    while len(names) < count:
+        scene = rnd.choice(['', str(rnd.randint(1, 120)), f'{rnd.randint(1, 120)}f', f'{rnd.randint(1, 99)}-2'])
+        name = '_'.join(part for part in (rnd.choice(['101', '12', '1203', '75']), scene,
+                                          rnd.choice(['3', '12d', '4d2', '07']),
+                                          rnd.choice(['1', '12', '3p', '2p2'])) if part)
+        names.extend([name] * tracks)
+    rnd.shuffle(names)
+    return names[:count]
+
+
+def chain(name: str):
+    series, scene, shot, take = get_log_from_name.__wrapped__(name)
+    return series_correcting(series), scene_correcting(scene), shot_correcting(shot), take_correcting(take)
+
+
+def measure(function, names):
+    start = time.perf_counter()
+    for name in names:
+        function(name)
+    return time.perf_counter() - start
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--names', type=int, default=100000)
+    p.add_argument('--tracks', type=int, default=4)
+    arguments = p.parse_args()
+
+    names = random_names(arguments.names, arguments.tracks)
+    parse_log_name.cache_clear()
+    print(f'names           {len(names)} ({len(set(names))} unique)')
+    print(f'chain           {measure(chain, names):.3f} s')
+    print(f'parse_log_name  {measure(parse_log_name, names):.3f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Time of Clip.Clip on generated clips with more and more audio tracks, saved to JSON to compare commits.
+
+    python benchmarks/parse.py --output before.json [--tracks 2 8 32] [--clips 200]
+    git checkout ...
+    python benchmarks/parse.py --output after.json --compare before.json
+
+Every track is a clipitem with its file, timecodes, filters and links, so the time grows with the tracks.
+Times are the best of --repeat runs, per clip, with and without --lazy
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate import Generator  # noqa: E402
+from stages import git_commit, ratio  # noqa: E402
+from log_helper.utils.fcpxml import Clip  # noqa: E402
+
+
+def measure(clip_elements, lazy: bool, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for element in clip_elements:
+            Clip.Clip(element, lazy)
+        times.append(time.perf_counter() - start)
+    return min(times) / len(clip_elements)
+
+
+def run(tracks, clips: int, repeat: int) -> dict:
+    result = {'commit': git_commit(), 'clips': clips, 'repeat': repeat, 'tracks': {}}
+    for track_count in tracks:
+        root = Generator().project(videos=clips // 2, audios=clips - clips // 2, tracks=track_count)
+        clip_elements = list(root.iter('clip'))
+        result['tracks'][str(track_count)] = {'eager': measure(clip_elements, False, repeat),
+                                              'lazy': measure(clip_elements, True, repeat)}
+    return result
+
+
+def print_result(result: dict, baseline: dict = None):
+    print(f"{result['clips']} clips, commit {result['commit'] or '?'}")
+    header = f"{'tracks':<8}{'eager, us':>12}{'lazy, us':>12}"
+    if baseline:
+        header += f"{'eager x':>10}{'lazy x':>10}"
+    print(header)
+    for track_count, times in result['tracks'].items():
+        line = f"{track_count:<8}{times['eager'] * 1e6:>12.1f}{times['lazy'] * 1e6:>12.1f}"
+        if baseline and track_count in baseline['tracks']:
+            line += f"{ratio(times['eager'], baseline['tracks'][track_count]['eager']):>10}"
+            line += f"{ratio(times['lazy'], baseline['tracks'][track_count]['lazy']):>10}"
+        print(line)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--tracks', type=int, nargs='+', default=[2, 8, 32])
+    p.add_argument('--clips', type=int, default=200)
+    p.add_argument('--repeat', type=int, default=5)
+    p.add_argument('--output', help='JSON file for the result')
+    p.add_argument('--compare', help='JSON result of an earlier run to compare with')
+    arguments = p.parse_args()
+
+    result = run(arguments.tracks, max(arguments.clips, 2), max(arguments.repeat, 1))
+    baseline = None
+    if arguments.compare:
+        with open(arguments.compare, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+    print_result(result, baseline)
+    if arguments.output:
+        with open(arguments.output, 'w', encoding='utf-8') as output:
+            json.dump(result, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Time and peak memory of every pipeline stage, saved to JSON to compare commits.
+
+    python benchmarks/generate.py project.xml --bins 4 --videos 500 --audios 500
+    python benchmarks/stages.py project.xml --output before.json
+    git checkout ...
+    python benchmarks/stages.py project.xml --output after.json --compare before.json
+
+The stages run like `log_helper -B -b -m` with the bin questions left unanswered.
+Times are the best of --repeat runs without tracing, peak memory comes from one more run under tracemalloc:
+the highest python allocation above the level the stage started at. rss is the resident set size after the stage,
+it also sees what lxml allocates in C
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clip_memory import rss  # noqa: E402
+from log_helper.log_helper import (WorkArguments, calculate_delta, fix_duplicate_clip_id,  # noqa: E402
+                                   insert_aux_timecodes, set_log_infos, set_video_name_by_audio)
+from log_helper.rules import Rules  # noqa: E402
+from log_helper.utils.clip_table import ClipTable  # noqa: E402
+from log_helper.utils.fcpxml import Bin, Clip  # noqa: E402
+from log_helper.utils.mergeclip import merge, plan_merge  # noqa: E402
+from log_helper.utils.read_write_xml import get_bin_list, write_xml  # noqa: E402
+
+STAGES = ('get_bin_list', 'Clip.Clip', 'calculate_delta', 'insert_aux_timecode', 'set_log_info',
+          'set_video_name_by_audio', 'fix_duplicate_clip_id', 'write_back', 'merge', 'write_xml')
+
+
+class StageRecorder:
+    """
+    Sums the time of each stage over the bins, keeps the highest memory peak
+    """
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.times = dict.fromkeys(STAGES, 0.0)
+        self.peaks = dict.fromkeys(STAGES, 0)
+        self.rss = dict.fromkeys(STAGES, 0)
+
+    @contextmanager
+    def stage(self, name: str):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        yield
+        self.times[name] += time.perf_counter() - start
+        if self.trace_memory:
+            self.peaks[name] = max(self.peaks[name], tracemalloc.get_traced_memory()[1] - start_memory)
+            self.rss[name] = max(self.rss[name], rss())
+
+
+def run(path: str, output_path: str, recorder: StageRecorder) -> int:
+    arguments = WorkArguments(file=path, bin=True, next_day=False, prev_day=False, rename=True, merge=True,
+                              batch=True, testing=False, non_interactive=True)
+    rules = Rules(interactive=False)
+    date = datetime.now()
+    clip_count = 0
+
+    with recorder.stage('get_bin_list'):
+        bin_list = get_bin_list(arguments)
+
+    items = []
+    for batch_item in bin_list:
+        with recorder.stage('Clip.Clip'):
+            clip_list = [Clip.Clip(clip, arguments.lazy) for clip in batch_item.iter('clip')]
+        clip_count += len(clip_list)
+        table = ClipTable(clip_list)
+        with recorder.stage('calculate_delta'):
+            delta = calculate_delta(table, arguments)
+        with recorder.stage('insert_aux_timecode'):
+            insert_aux_timecodes(table, delta)
+        with recorder.stage('set_log_info'):
+            set_log_infos(table, rules)
+        with recorder.stage('set_video_name_by_audio'):
+            set_video_name_by_audio(table, date)
+        with recorder.stage('fix_duplicate_clip_id'):
+            fix_duplicate_clip_id(table)
+        with recorder.stage('merge'):
+            rows_by_bin = {}
+            for row in range(len(table)):
+                rows_by_bin.setdefault(f'{table.series[row]}.{table.scene[row]}', []).append(row)
+        with recorder.stage('write_back'):
+            table.write_back()
+        with recorder.stage('merge'):
+            bin_nodes = []
+            for bin_name, rows in rows_by_bin.items():
+                bin_node = Bin(name=bin_name)
+                for row in rows:
+                    bin_node.add_children(table.clips[row])
+                for video_clip, audio_clip in plan_merge(table.select(rows)).pairs:
+                    bin_node.add_children(merge(video_clip, audio_clip))
+                bin_nodes.append(bin_node)
+        items.append(bin_nodes)
+
+    with recorder.stage('write_xml'):
+        write_xml(items, output_path)
+
+    return clip_count
+
+
+def measure(path: str, repeat: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        output_path = os.path.join(directory, 'out.xml')
+        times = []
+        for _ in range(repeat):
+            recorder = StageRecorder()
+            clip_count = run(path, output_path, recorder)
+            times.append(recorder.times)
+
+        recorder = StageRecorder(trace_memory=True)
+        tracemalloc.start()
+        try:
+            run(path, output_path, recorder)
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'file': os.path.abspath(path),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'clips': clip_count,
+        'repeat': repeat,
+        'stages': {name: {'time': min(run_times[name] for run_times in times),
+                          'peak_memory': recorder.peaks[name],
+                          'rss': recorder.rss[name]} for name in STAGES},
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def print_result(result: dict, baseline: dict = None):
+    print(f"{result['file']}: {result['clips']} clips, commit {result['commit'] or '?'}")
+    header = f"{'stage':<24}{'time, s':>10}{'peak, MB':>10}{'rss, MB':>10}"
+    if baseline:
+        header += f"{'time x':>10}{'peak x':>10}"
+    print(header)
+    for name, stage in result['stages'].items():
+        line = f"{name:<24}{stage['time']:>10.3f}{stage['peak_memory'] / 2 ** 20:>10.1f}{stage['rss'] / 2 ** 20:>10.1f}"
+        if baseline and name in baseline['stages']:
+            line += f"{ratio(stage['time'], baseline['stages'][name]['time']):>10}"
+            line += f"{ratio(stage['peak_memory'], baseline['stages'][name]['peak_memory']):>10}"
+        print(line)
+
+
+def ratio(value: float, baseline_value: float) -> str:
+    return f'{value / baseline_value:.2f}' if baseline_value else '-'
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('file')
+    p.add_argument('--output', help='JSON file for the result')
+    p.add_argument('--compare', help='JSON result of an earlier run to compare with')
+    p.add_argument('--repeat', type=int, default=3)
+    arguments = p.parse_args()
+
+    result = measure(arguments.file, max(arguments.repeat, 1))
+    baseline = None
+    if arguments.compare:
+        with open(arguments.compare, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+    print_result(result, baseline)
+    if arguments.output:
+        with open(arguments.output, 'w', encoding='utf-8') as output:
+            json.dump(result, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
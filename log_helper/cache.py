@@ -0,0 +1,203 @@
+"""
+Results of earlier runs, to replay what did not change.
+
+Two levels:
+    bins  - a bin is the smallest part whose whole output depends only on its own xml: the delta comes from
+            its marked clips, video clips are renamed by the audio clips they overlap, duplicate ids and merge pairs
+            are found inside the bin. Its key is a hash of the bin xml with the options that change the output
+            and the date of the clip names. A replayed bin is neither parsed nor processed.
+    clips - in a bin that changed (one clip added to a file without -B changes the only bin) the aux1 timecode
+            and the log fields of a clip depend only on its xml and the drift table of the bin, they are keyed
+            by both (see clip_key). Only new or changed clips go through these stages, renaming, bins and merge
+            run again over all of them. With --auto-sync the sync point of every camera clip is stored as well.
+With --auto-sync and --bwf the output also depends on the audio files, their size and modification time
+go into the keys too (see file_stamps).
+A stored result is replayed while every rules lookup and question it made gets the same answer,
+answers typed at the prompts are kept as well and are not asked again in the next runs
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+
+from log_helper.metadata import __version__
+from log_helper.rules import Consulted, Rules, Unresolved
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS bins (key TEXT PRIMARY KEY, nodes BLOB NOT NULL, consulted TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS answers (kind TEXT NOT NULL, key TEXT NOT NULL, answer TEXT NOT NULL,
+                                    PRIMARY KEY (kind, key));
+CREATE TABLE IF NOT EXISTS clips (key TEXT PRIMARY KEY, aux_frame INTEGER NOT NULL, aux_string TEXT NOT NULL,
+                                  log TEXT NOT NULL, consulted TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sync_points (key TEXT PRIMARY KEY, point TEXT NOT NULL);
+'''
+
+
+class CachedBin(NamedTuple):
+    nodes: List[bytes]
+    consulted: List[Consulted]
+
+
+class CachedClip(NamedTuple):
+    aux_frame: int
+    aux_string: str
+    log: Sequence[str]  # series, scene, shot, take
+    consulted: List[Consulted]
+
+
+class ResultCache:
+    def __init__(self, path: str):
+        # worker processes of --jobs share the file, a writer waits for the others
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.executescript(_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        self.clip_hits = 0
+        self.clip_misses = 0
+
+    def __enter__(self) -> 'ResultCache':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def get(self, key: str) -> Optional[CachedBin]:
+        row = self.connection.execute('SELECT nodes, consulted FROM bins WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        return CachedBin(_split_nodes(row[0]), [Consulted(*item) for item in json.loads(row[1])])
+
+    def put(self, key: str, cached_bin: CachedBin):
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO bins VALUES (?, ?, ?)',
+                                    (key, _join_nodes(cached_bin.nodes), json.dumps(cached_bin.consulted)))
+
+    def replay(self, key: str, rules: Rules) -> Optional[List[bytes]]:
+        """
+        Nodes of the stored bin if the rules still answer it the same, its unresolved questions are reported again
+        """
+        cached_bin = self.get(key)
+        if cached_bin is None or not is_valid(cached_bin.consulted, rules):
+            self.misses += 1
+            return None
+        self.hits += 1
+        rules.unresolved.extend(Unresolved(item.kind, item.key, item.question) for item in cached_bin.consulted
+                                if item.question is not None and item.answer is None)
+        return cached_bin.nodes
+
+    def replay_clip(self, key: str, rules: Rules) -> Optional[CachedClip]:
+        """
+        Stored results of a clip if the rules still answer it the same. Its lookups go into rules.consulted,
+        the bin it is in depends on them like on its own
+        """
+        row = self.connection.execute('SELECT aux_frame, aux_string, log, consulted FROM clips WHERE key = ?',
+                                      (key,)).fetchone()
+        consulted = None if row is None else [Consulted(*item) for item in json.loads(row[3])]
+        if consulted is None or not is_valid(consulted, rules):
+            self.clip_misses += 1
+            return None
+        self.clip_hits += 1
+        rules.consulted.extend(consulted)
+        rules.unresolved.extend(Unresolved(item.kind, item.key, item.question) for item in consulted
+                                if item.question is not None and item.answer is None)
+        return CachedClip(row[0], row[1], tuple(json.loads(row[2])), consulted)
+
+    def put_clips(self, items: Sequence[tuple]):
+        """
+        (key, CachedClip) pairs
+        """
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO clips VALUES (?, ?, ?, ?, ?)',
+                                        [(key, int(clip.aux_frame), clip.aux_string, json.dumps(list(clip.log)),
+                                          json.dumps(clip.consulted)) for key, clip in items])
+
+    def get_sync_point(self, key: str) -> Optional[list]:
+        """
+        [point] as stored, [None] for a clip without one, None if it was not stored
+        """
+        row = self.connection.execute('SELECT point FROM sync_points WHERE key = ?', (key,)).fetchone()
+        return None if row is None else [json.loads(row[0])]
+
+    def put_sync_points(self, items: Sequence[tuple]):
+        """
+        (key, point) pairs, point is json serializable or None
+        """
+        with self.connection:
+            self.connection.executemany('INSERT OR REPLACE INTO sync_points VALUES (?, ?)',
+                                        [(key, json.dumps(point)) for key, point in items])
+
+    def load_answers(self, rules: Rules):
+        """
+        Answers typed in earlier runs, the rules file wins
+        """
+        for kind, key, answer in self.connection.execute('SELECT kind, key, answer FROM answers'):
+            if kind in rules.answers:
+                rules.answers[kind].setdefault(key, answer)
+
+    def save_answers(self, rules: Rules, consulted: List[Consulted]):
+        # typed answers never get into rules.answers
+        typed = [(item.kind, item.key, item.answer) for item in consulted
+                 if item.question is not None and item.answer is not None and item.key not in rules.answers[item.kind]]
+        if typed:
+            with self.connection:
+                self.connection.executemany('INSERT OR REPLACE INTO answers VALUES (?, ?, ?)', typed)
+
+
+def is_valid(consulted: List[Consulted], rules: Rules) -> bool:
+    for item in consulted:
+        answer = rules.answers[item.kind].get(item.key)
+        if item.question is not None and answer is None and rules.interactive:
+            # it would be asked now
+            return False
+        if answer != item.answer:
+            return False
+    return True
+
+
+def bin_key(bin_xml: bytes, options: list) -> str:
+    """
+    options - everything else the output of the bin depends on, json serializable
+    """
+    digest = hashlib.sha256(bin_xml)
+    digest.update(json.dumps([__version__] + options).encode())
+    return digest.hexdigest()
+
+
+def clip_key(clip_xml: bytes, options: list) -> str:
+    """
+    options - the drift table of the bin and everything else the aux1 timecode and the log fields depend on
+    """
+    return bin_key(clip_xml, ['clip'] + options)
+
+
+def file_stamps(paths: Iterable[str]) -> list:
+    """
+    [path, size, mtime_ns] of every file for bin_key, size and time are None for a missing one
+    """
+    stamps = []
+    for path in sorted(set(paths)):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stamps.append([path, None, None])
+        else:
+            stamps.append([path, stat.st_size, stat.st_mtime_ns])
+    return stamps
+
+
+def _join_nodes(nodes: List[bytes]) -> bytes:
+    return b''.join(len(node).to_bytes(4, 'big') + node for node in nodes)
+
+
+def _split_nodes(data: bytes) -> List[bytes]:
+    nodes = []
+    position = 0
+    while position < len(data):
+        size = int.from_bytes(data[position:position + 4], 'big')
+        nodes.append(data[position + 4:position + 4 + size])
+        position += 4 + size
+    return nodes
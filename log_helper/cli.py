@@ -1,13 +1,56 @@
 import argparse
+import glob
+import importlib.util
+import os
 import sys
+import time
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import BinaryIO, List, NamedTuple, Optional, Union
 
-from log_helper.utils.read_write_xml import get_bin_list, write_xml
-from log_helper.log_helper import get_xml_items, WorkArguments
+from log_helper import profiling
+from log_helper.config import CACHE_PATH, OUTPUT_PATH, OUTPUT_SUFFIX, PROFILE_PATH
+from log_helper.rules import Rules, Unresolved
+from log_helper.utils.read_write_xml import STDOUT, get_bin_list, iter_clip_batches, write_xml, write_xml_per_bin
+from log_helper.log_helper import iter_xml_items, get_stream_xml_items, get_arguments_rules, WorkArguments
+
+
+class FileResult(NamedTuple):
+    file: str
+    output: str
+    error: Optional[str]
+    nodes: int
+    seconds: float
+    unresolved: List[Unresolved]
+    records: List[profiling.StageRecord] = []
 
 
 def get_arguments() -> WorkArguments:
-    p = argparse.ArgumentParser()
-    p.add_argument('file')
+    p = argparse.ArgumentParser(epilog='log_helper watch --help: process the files exported into a folder')
+    p.add_argument('files', nargs='+', metavar='file', help='xml files, directories of them or glob patterns')
+    p.add_argument('-o', '--output',
+                   help=f'output file, - for stdout, a folder for several files; {OUTPUT_PATH} by default')
+    add_work_arguments(p)
+
+    args = p.parse_args(sys.argv[1:])
+    files = expand_files(args.files)
+    if not files:
+        p.error(f'no xml files in {" ".join(args.files)}')
+    if args.jobs != 1 and len(files) == 1 and (args.stream or not args.batch):
+        p.error('-j/--jobs needs several files or --batch, and cannot be used with --stream for one file')
+    if args.output == STDOUT and (len(files) > 1 or args.per_bin):
+        p.error('-o - writes one document, it cannot be used with several files or --per-bin')
+    if args.output and args.output != STDOUT and len(files) > 1 and not os.path.isdir(args.output):
+        p.error(f'-o must be an existing folder for several files, {args.output} is not')
+    check_work_arguments(p, args)
+
+    values = vars(args)
+    del values['files']
+    return WorkArguments(file=files[0], files=tuple(files), **values)
+
+
+def add_work_arguments(p: argparse.ArgumentParser):
     p.add_argument('-b', '--bin', action='store_true', default=False)
     p.add_argument('-n', '--next_day', action='store_true', default=False)
     p.add_argument('-p', '--prev_day', action='store_true', default=False)
@@ -15,12 +58,184 @@ def get_arguments() -> WorkArguments:
     p.add_argument('-m', '--merge', action='store_true', default=False)
     p.add_argument('-B', '--batch', action='store_true', default=False)
     p.add_argument('--testing', action='store_true', default=False)
+    p.add_argument('-s', '--stream', action='store_true', default=False,
+                   help='parse clips as they are read, without --batch the clips of the whole file are kept in memory')
+    p.add_argument('-j', '--jobs', type=int, default=1)
+    p.add_argument('--rules')
+    p.add_argument('--non-interactive', dest='non_interactive', action='store_true', default=False)
+    p.add_argument('--lazy', action='store_true', default=False)
+    p.add_argument('--profile', nargs='?', const=PROFILE_PATH)
+    p.add_argument('--per-bin', dest='per_bin', action='store_true', default=False,
+                   help='with --batch every bin gets its own output: out.01.xml, out.02.xml ...')
+    p.add_argument('--gzip', action='store_true', default=False, help='gzip the output, .gz is added to its name')
+    p.add_argument('--auto-sync', dest='auto_sync', action='store_true', default=False,
+                   help='sync by the sound of the referenced files, needs numpy (pip install log-helper[fast])')
+    p.add_argument('--sync-window', dest='sync_window', type=float, default=2.0,
+                   help='seconds around the marks or the timecodes the sound is searched in, 2 by default')
+    p.add_argument('--bwf', action='store_true', default=False,
+                   help='scene, take and missing source timecodes of audio clips from the bext and iXML of their files')
+    p.add_argument('--cache', nargs='?', const=CACHE_PATH,
+                   help=f'replay the bins that did not change since an earlier run, {CACHE_PATH} by default')
+
+
+def check_work_arguments(p: argparse.ArgumentParser, args: argparse.Namespace):
+    if args.lazy and args.stream:
+        # lazy clips keep their elements, the document would stay in memory anyway
+        p.error('--lazy cannot be used with --stream')
+    if args.per_bin and not args.batch:
+        p.error('--per-bin needs --batch')
+    if args.auto_sync and importlib.util.find_spec('numpy') is None:
+        p.error('--auto-sync needs numpy (pip install log-helper[fast])')
+    if args.cache and args.stream:
+        # the key is the hash of the bin xml, streaming drops it
+        p.error('--cache cannot be used with --stream')
+
+
+def expand_files(patterns: List[str]) -> List[str]:
+    """
+    Directories give their *.xml files, glob patterns are expanded here as well for shells that do not do it
+    """
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            files.extend(sorted(glob.glob(os.path.join(glob.escape(pattern), '*.xml'))))
+        elif glob.has_magic(pattern):
+            files.extend(sorted(glob.glob(pattern, recursive=True)))
+        else:
+            files.append(pattern)
+    return list(dict.fromkeys(files))
+
+
+def get_output_paths(files: List[str], output: Optional[str] = None, compress: bool = False) -> List[str]:
+    """
+    One file is written to -o or OUTPUT_PATH, several ones into the -o folder (next to OUTPUT_PATH by default)
+    as <name>__outXML.xml. A folder given to one file gets <name>__outXML.xml as well
+    """
+    if len(files) == 1 and not (output and os.path.isdir(output)):
+        output = output or OUTPUT_PATH
+        if compress and output != STDOUT and not output.endswith('.gz'):
+            output += '.gz'
+        return [output]
+    output_paths = []
+    for path in files:
+        output_path = get_output_path(path, output, compress=compress)
+        idx = 1
+        while output_path in output_paths:
+            idx += 1
+            output_path = get_output_path(path, output, f'_{idx}', compress)
+        output_paths.append(output_path)
+    return output_paths
+
 
-    return WorkArguments(**vars(p.parse_args(sys.argv[1:])))
+def get_output_path(path: str, directory: Optional[str] = None, suffix: str = '', compress: bool = False) -> str:
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(directory or os.path.dirname(OUTPUT_PATH),
+                        f'{name}{suffix}{OUTPUT_SUFFIX}{".gz" if compress else ""}')
+
+
+def process_file(arguments: WorkArguments, rules: Rules, output: Union[str, BinaryIO]) -> int:
+    if arguments.stream:
+        xml_items = get_stream_xml_items(iter_clip_batches(arguments), arguments, rules)
+    else:
+        with profiling.stage('get_bin_list'):
+            bin_list = get_bin_list(arguments)
+        xml_items = iter_xml_items(bin_list, arguments, rules)
+    # bins are processed while they are written, their stages are nested in this one
+    # without --gzip the name decides, -o out.xml.gz is compressed as well
+    compress = arguments.gzip or None
+    with profiling.stage('write_xml'):
+        if arguments.per_bin:
+            return write_xml_per_bin(xml_items, output, compress)
+        return write_xml(xml_items, output, compress)
+
+
+def process_files(arguments: WorkArguments, rules: Rules) -> List[FileResult]:
+    """
+    Every file gets its own output, an error in one of them is reported and the others go on.
+    With --jobs files are processed in worker processes, bins of a file one by one.
+    Workers never ask, like bin workers
+    """
+    output_paths = get_output_paths(arguments.files, arguments.output, arguments.gzip)
+    file_arguments = [arguments._replace(file=path, jobs=1) for path in arguments.files]
+    if arguments.jobs == 1:
+        return [process_file_safely(file_argument, rules, output_path)
+                for file_argument, output_path in zip(file_arguments, output_paths)]
+
+    max_workers = min(arguments.jobs if arguments.jobs > 0 else os.cpu_count() or 1, len(file_arguments))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_process_file_in_worker, file_arguments, output_paths, repeat(rules.answers)))
+    for result in results:
+        rules.unresolved.extend(result.unresolved)
+        profiling.add_records(result.records)
+    return results
+
+
+def process_file_safely(arguments: WorkArguments, rules: Rules, output_path: str) -> FileResult:
+    unresolved_before = len(rules.unresolved)
+    error = None
+    nodes = 0
+    start = time.perf_counter()
+    try:
+        with profiling.stage('file', file=arguments.file):
+            nodes = process_file(arguments, rules, output_path)
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}' if str(e) else type(e).__name__
+    return FileResult(arguments.file, output_path, error, nodes, time.perf_counter() - start,
+                      rules.unresolved[unresolved_before:])
+
+
+def _process_file_in_worker(arguments: WorkArguments, output_path: str, answers: dict) -> FileResult:
+    # a forked worker starts with a copy of the parent's profiler and its records
+    profiling.disable()
+    if arguments.profile:
+        profiling.enable()
+    result = process_file_safely(arguments, Rules(answers, interactive=False), output_path)
+    return result._replace(records=profiling.disable())
+
+
+def print_summary(results: List[FileResult]):
+    rows = [('file', 'status', 'items', 'time, s', 'output')]
+    for result in results:
+        rows.append((result.file, result.error or 'ok', str(result.nodes), f'{result.seconds:.2f}',
+                     result.output if result.error is None else '-'))
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]) - 1)]
+    for row in rows:
+        print('  '.join(value.ljust(width) for value, width in zip(row, widths)) + '  ' + row[-1])
+    failed = sum(result.error is not None for result in results)
+    print(f'{len(results) - failed} done, {failed} failed')
 
 
 def main():
+    if sys.argv[1:2] == ['watch']:
+        from log_helper.watch import main as watch_main
+        return watch_main(sys.argv[2:])
     arguments = get_arguments()
-    bin_list = get_bin_list(arguments)
-    xml_items = get_xml_items(bin_list, arguments)
-    write_xml(xml_items)
+    if arguments.output == STDOUT:
+        # the document goes to stdout, messages and questions to stderr
+        output = sys.stdout.buffer
+        with redirect_stdout(sys.stderr):
+            results = run(arguments, output)
+    else:
+        results = run(arguments)
+    if results and any(result.error is not None for result in results):
+        sys.exit(1)
+
+
+def run(arguments: WorkArguments, output: Union[str, BinaryIO, None] = None) -> Optional[List[FileResult]]:
+    if arguments.profile:
+        profiling.enable(arguments.profile)
+    results = None
+    try:
+        rules = get_arguments_rules(arguments)
+        if len(arguments.files) == 1:
+            process_file(arguments, rules, output or get_output_paths(arguments.files, arguments.output,
+                                                                      arguments.gzip)[0])
+        else:
+            results = process_files(arguments, rules)
+    finally:
+        profiling.write()
+    if results:
+        print_summary(results)
+    for line in rules.report():
+        print(line)
+    return results
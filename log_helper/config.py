@@ -1,6 +1,11 @@
-from getpass import getuser
+import os
 
-OUTPUT_PATH = f"/Users/{getuser()}/Documents/__outXML.xml"
+# -o/--output overrides it, the current folder when there is no ~/Documents
+_DOCUMENTS = os.path.expanduser('~/Documents')
+OUTPUT_PATH = os.path.join(_DOCUMENTS if os.path.isdir(_DOCUMENTS) else os.getcwd(), '__outXML.xml')
+OUTPUT_SUFFIX = '__outXML.xml'
+PROFILE_PATH = 'log_helper_profile.json'
+CACHE_PATH = 'log_helper_cache.sqlite'
 delimiters = ['T', '.', '--', '-', '_', '__']
 hundred_episodes_after_60 = '28'
 hundred_episodes_up_to_60 = '28'
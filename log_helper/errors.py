@@ -1,2 +1,10 @@
 class DeltaBaseZero(Exception):
     pass
+
+
+class RulesFormatError(Exception):
+    pass
+
+
+class SyncMarksMismatch(Exception):
+    pass
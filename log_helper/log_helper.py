@@ -1,15 +1,25 @@
-from collections import Counter
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, NamedTuple
+from functools import lru_cache
+from itertools import count, repeat
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 
+from lxml import etree
 from lxml.etree import _Element
 
+from log_helper import profiling
+from log_helper.cache import CachedBin, CachedClip, ResultCache, bin_key, clip_key, file_stamps
 from log_helper.config import delimiters, hundred_episodes_after_60, hundred_episodes_up_to_60
-from log_helper.errors import DeltaBaseZero
-from log_helper.utils.fcpxml import Clip, Bin
-from log_helper.utils.mergeclip import merge
-
-FRAMESPERDAY = 2160000
+from log_helper.errors import DeltaBaseZero, SyncMarksMismatch
+from log_helper.rules import BIN, SCENE, Consulted, Rules, Unresolved, get_rules
+from log_helper.utils.bwf import AudioMetadata, read_all_metadata
+from log_helper.utils.clip_table import ClipRows, ClipTable, Log, working_table
+from log_helper.utils.fcpxml import Clip, Bin, SerializedNode, pathurl_path
+from log_helper.utils.interval_index import IntervalIndex
+from log_helper.utils.mergeclip import merge, plan_merge, MergePlan
+from log_helper.utils.timecode import FRAMESPERDAY, DriftTable, drift_frame, drift_frames, frame_strings
 
 
 class WorkArguments(NamedTuple):
@@ -21,6 +31,24 @@ class WorkArguments(NamedTuple):
     merge: bool
     batch: bool
     testing: bool
+    stream: bool = False
+    jobs: int = 1
+    rules: Optional[str] = None
+    non_interactive: bool = False
+    lazy: bool = False
+    profile: Optional[str] = None
+    files: Tuple[str, ...] = ()
+    output: Optional[str] = None
+    per_bin: bool = False
+    gzip: bool = False
+    cache: Optional[str] = None
+    auto_sync: bool = False
+    sync_window: float = 2.0
+    bwf: bool = False
+
+
+# options that change the output of a bin, see cache.bin_key
+CACHE_KEY_FIELDS = ('bin', 'next_day', 'prev_day', 'rename', 'merge', 'auto_sync', 'sync_window', 'bwf')
 
 
 class Delta(NamedTuple):
@@ -28,58 +56,199 @@ class Delta(NamedTuple):
     in_frame: int
     base: float
     k_max: int
+    frames_per_day: int = FRAMESPERDAY
+    table: Optional[DriftTable] = None
 
+    def drift_table(self) -> DriftTable:
+        """
+        The sync points, IN and OUT of the line when there are only two
+        """
+        if self.table is not None:
+            return self.table
+        return DriftTable((self.in_frame, self.in_frame + int(self.base)), (self.delta_in, self.delta_in + self.k_max),
+                          self.frames_per_day)
 
-def calculate_delta(clip_list: List[Clip], arguments: WorkArguments) -> Delta:
-    video_in_marked_frame = 0
-    video_out_marked_frame = 0
-    audio_in_marked_frame = 0
-    audio_out_marked_frame = 0
-    for clip in clip_list:
-        start_frame = clip.get_timecode_frame('source')
-        if not start_frame:
-            continue
-        if clip.in_ != -1:
-            marked_frame = int(start_frame) + int(clip.in_)
-            clip.in_ = -1
-            if clip.is_video():
-                video_in_marked_frame = marked_frame
-            else:
-                audio_in_marked_frame = marked_frame
-        if clip.out != -1:
-            marked_frame = int(start_frame) + int(clip.out)
-            clip.out = -1
-            if clip.is_video():
-                video_out_marked_frame = marked_frame
-            else:
-                audio_out_marked_frame = marked_frame
-        if arguments.testing:
-            print(clip.id_)
-            print(video_in_marked_frame)
-            print(audio_in_marked_frame)
-            print(video_out_marked_frame)
-            print(audio_out_marked_frame)
-
-    if video_in_marked_frame == video_out_marked_frame:
+
+class _Mark(NamedTuple):
+    frame: int
+    is_in: bool
+    frames_per_day: int
+
+
+def calculate_delta(clip_list: ClipRows, arguments: WorkArguments) -> Delta:
+    """
+    Every IN and OUT mark on a clapper is a sync point: the n-th video mark in time order
+    and the n-th audio mark are the same clap. One IN and one OUT give a linear drift,
+    more marks a piecewise linear one
+    """
+    video_marks = []
+    audio_marks = []
+    with working_table(clip_list) as table:
+        for row, start_frame in enumerate(table.source):
+            if not start_frame:
+                continue
+            marks = video_marks if table.is_video[row] else audio_marks
+            in_, out = table.in_[row], table.out[row]
+            if in_ != -1:
+                marks.append(_Mark(int(start_frame) + int(in_), True, table.formats[row].frames_per_day))
+            if out != -1:
+                marks.append(_Mark(int(start_frame) + int(out), False, table.formats[row].frames_per_day))
+            if in_ != -1 or out != -1:
+                table.clear_marks(row)
+            if arguments.testing:
+                print(table.clips[row].id_)
+                print([mark.frame for mark in video_marks])
+                print([mark.frame for mark in audio_marks])
+
+    video_frames, video_frames_per_day = _sync_frames(video_marks)
+    audio_frames, _ = _sync_frames(audio_marks)
+    if len(video_frames) != len(audio_frames):
+        raise SyncMarksMismatch(f'{len(video_frames)} video marks, {len(audio_frames)} audio marks')
+    if any(frame == next_frame for frame, next_frame in zip(video_frames, video_frames[1:])):
         raise DeltaBaseZero
-    audio_out_marked_frame += FRAMESPERDAY if audio_out_marked_frame < audio_in_marked_frame else 0
-    video_out_marked_frame += FRAMESPERDAY if video_out_marked_frame < video_in_marked_frame else 0
 
-    delta_in = audio_in_marked_frame - video_in_marked_frame
-    delta_out = audio_out_marked_frame - video_out_marked_frame
+    deltas = [audio_frame - video_frame for video_frame, audio_frame in zip(video_frames, audio_frames)]
+    delta_in = deltas[0]
+    delta_out = deltas[-1]
     k_max = delta_out - delta_in
 
     if arguments.rename:
         print('delta_in  =', delta_in)
         print('delta_out =', delta_out)
         print('k_max     =', k_max)
+        if len(deltas) > 2:
+            print('sync      =', len(deltas), 'points')
 
     # if delta_in <= 0:  # в бине нет аудио
     # if in_frame == 0:  # в бине нет видео. приводит к делению на ноль.
     #                      тк base == 0, а в insert_aux_timecode есть деление на base
 
-    return Delta(delta_in=delta_in, in_frame=video_in_marked_frame,
-                 base=float(video_out_marked_frame - video_in_marked_frame), k_max=k_max)
+    return Delta(delta_in=delta_in, in_frame=video_frames[0], base=float(video_frames[-1] - video_frames[0]),
+                 k_max=k_max, frames_per_day=video_frames_per_day,
+                 table=DriftTable(tuple(video_frames), tuple(deltas), video_frames_per_day))
+
+
+def auto_sync_delta(clip_list: ClipRows, arguments: WorkArguments) -> Delta:
+    """
+    Sync points found by the sound: the scratch audio of every camera clip is correlated with the recorder file
+    the marks (or the timecodes, without marks) put it in, within +-arguments.sync_window seconds.
+    Clips without readable audio or a clear match are left out, without any point the marks are used
+    """
+    from log_helper.utils.autosync import SyncJob, scratch_audio_path
+
+    with working_table(clip_list) as table:
+        try:
+            marks_delta = calculate_delta(table, arguments)
+            guess_table = marks_delta.drift_table()
+        except DeltaBaseZero:
+            # timecodes of camera and recorder jammed together
+            marks_delta = None
+            guess_table = DriftTable((0, 1), (0, 0))
+
+        paths = [clip.file_path for clip in table.clips]
+        source = [frame or 0 for frame in table.source]
+        audio_rows = [row for row in table.rows(False) if paths[row]]
+        audio_index = IntervalIndex([(source[row], source[row] + table.duration[row]) for row in audio_rows],
+                                    guess_table.frames_per_day)
+        candidates = []
+        windows = []
+        for row in table.rows(True):
+            scratch_path = paths[row] and scratch_audio_path(paths[row])
+            if not scratch_path:
+                continue
+            video_frame = source[row]
+            guess = drift_frame(video_frame, guess_table) - video_frame
+            # the shorter way round the clock
+            guess = ((guess + guess_table.frames_per_day // 2) % guess_table.frames_per_day
+                     - guess_table.frames_per_day // 2)
+            window = round(arguments.sync_window * table.formats[row].fps)
+            candidates.append((row, scratch_path, guess))
+            windows.append((video_frame + guess - window, video_frame + guess + table.duration[row] + window))
+
+        # all the windows in one sweep over the audio intervals
+        jobs = []
+        for (row, scratch_path, guess), match in zip(candidates, audio_index.last_overlapping(windows)):
+            if match is None:
+                continue
+            audio_row = audio_rows[match]
+            jobs.append(SyncJob(scratch_path, source[row], table.formats[row].fps, table.duration[row],
+                                paths[audio_row], source[audio_row], table.formats[audio_row].fps, guess))
+
+    points = {}
+    for point in _sync_points(jobs, arguments):
+        if point is not None:
+            points.setdefault(point.frame, point.delta)
+    print(f'auto sync: {len(points)} of {len(jobs)} clips')
+    if not points:
+        if marks_delta is None:
+            raise DeltaBaseZero
+        return marks_delta
+
+    frames_per_day = guess_table.frames_per_day
+    start = _day_start(list(points), frames_per_day)
+    frames = sorted(points, key=lambda frame: (frame - start) % frames_per_day)
+    deltas = [points[frame] for frame in frames]
+    frames = [start + (frame - start) % frames_per_day for frame in frames]
+    if len(frames) == 1:
+        # one clip: the same delta for the whole bin
+        frames.append(frames[0] + 1)
+        deltas.append(deltas[0])
+    return Delta(delta_in=deltas[0], in_frame=frames[0], base=float(frames[-1] - frames[0]),
+                 k_max=deltas[-1] - deltas[0], frames_per_day=frames_per_day,
+                 table=DriftTable(tuple(frames), tuple(deltas), frames_per_day))
+
+
+def _sync_points(jobs: list, arguments: WorkArguments) -> list:
+    """
+    sync_points of the jobs, with arguments.cache the points found by an earlier run on the same files are replayed
+    """
+    from log_helper.utils.autosync import SyncPoint, sync_points
+
+    if not arguments.cache:
+        return sync_points(jobs, arguments.sync_window)
+    keys = [bin_key(json.dumps(list(job)).encode(),
+                    ['sync_point', arguments.sync_window, file_stamps([job.scratch_path, job.audio_path])])
+            for job in jobs]
+    with ResultCache(arguments.cache) as cache:
+        stored = [cache.get_sync_point(key) for key in keys]
+        missing = [idx for idx, point in enumerate(stored) if point is None]
+        for idx, point in zip(missing, sync_points([jobs[idx] for idx in missing], arguments.sync_window)):
+            stored[idx] = [None if point is None else [int(point.frame), int(point.delta), float(point.score)]]
+        cache.put_sync_points([(keys[idx], stored[idx][0]) for idx in missing])
+    return [None if point is None else SyncPoint(*point) for point, in stored]
+
+
+def _day_start(frames: List[int], frames_per_day: int) -> int:
+    """
+    The frame that keeps all the others closest after it, the day goes on past midnight from it:
+    the one after the longest gap between the frames round the clock
+    """
+    frames = sorted(frames)
+    gaps = [(frame - previous) % frames_per_day for previous, frame in zip(frames[-1:] + frames[:-1], frames)]
+    return frames[max(range(len(frames)), key=gaps.__getitem__)]
+
+
+def _sync_frames(marks: List[_Mark]) -> Tuple[List[int], int]:
+    """
+    Frames of the marks in time order and the frames per day of the first one.
+    One IN and one OUT at most: [IN, OUT], a missing mark is frame 0 and OUT before IN is on the next day.
+    Otherwise the day starts at the IN mark that keeps all marks closest to it, later marks go past midnight
+    """
+    in_marks = [mark for mark in marks if mark.is_in]
+    out_marks = [mark for mark in marks if not mark.is_in]
+    if len(in_marks) <= 1 and len(out_marks) <= 1:
+        frame_in = in_marks[0].frame if in_marks else 0
+        frame_out = out_marks[0].frame if out_marks else 0
+        frames_per_day = in_marks[0].frames_per_day if in_marks else FRAMESPERDAY
+        if frame_in == frame_out:
+            return [frame_in, frame_out], frames_per_day
+        frame_out += frames_per_day if frame_out < frame_in else 0
+        return [frame_in, frame_out], frames_per_day
+
+    start = min(in_marks or marks, key=lambda start_mark: max((mark.frame - start_mark.frame) % start_mark.frames_per_day
+                                                             for mark in marks))
+    frames = sorted(start.frame + (mark.frame - start.frame) % start.frames_per_day for mark in marks)
+    return frames, start.frames_per_day
 
 
 def insert_aux_timecode(clip: Clip, delta: Delta):
@@ -93,16 +262,74 @@ def insert_aux_timecode(clip: Clip, delta: Delta):
         print(clip.logginginfo)
         raise DeltaBaseZero
 
-    k = (current_frame - delta.in_frame) / delta.base
-
-    frames_with_delta = current_frame + delta.delta_in + round(delta.k_max * k)
-    if frames_with_delta > FRAMESPERDAY - 1:
-        frames_with_delta = frames_with_delta - FRAMESPERDAY
+    frames_with_delta = drift_frame(current_frame, delta.drift_table())
 
     clip.insert_timecode(frames_with_delta if clip.is_video() else current_frame, 'aux1', reel_name='001')
 
 
+def insert_aux_timecodes(clip_list: ClipRows, delta: Delta):
+    """
+    insert_aux_timecode for a whole bin, frames and strings are computed in one pass
+    """
+    if not len(clip_list):
+        return
+    with working_table(clip_list) as table:
+        table.set_aux(*aux_timecodes(table, delta, range(len(table))))
+
+
+def aux_timecodes(table: ClipTable, delta: Delta, rows: Sequence[int]) -> Tuple[List[int], List[str]]:
+    """
+    aux1 frames and strings of some rows of a table
+    """
+    if not rows:
+        return [], []
+    if not delta.base:
+        print(table.clips[rows[0]].logginginfo)
+        raise DeltaBaseZero
+
+    current_frames = [table.source[row] or 0 for row in rows]
+    frames_with_delta = drift_frames(current_frames, delta.drift_table())
+    frames = [frame_with_delta if table.is_video[row] else current_frame
+              for row, frame_with_delta, current_frame in zip(rows, frames_with_delta, current_frames)]
+
+    # aux1 counts like the source timecode of its clip, strings are made per format
+    by_format = {}
+    for idx, row in enumerate(rows):
+        by_format.setdefault(table.formats[row], []).append(idx)
+    strings = [''] * len(rows)
+    for tc_format, indexes in by_format.items():
+        for idx, string in zip(indexes, frame_strings([frames[idx] for idx in indexes], tc_format)):
+            strings[idx] = string
+
+    return frames, strings
+
+
+@lru_cache(maxsize=65536)
+def parse_log_name(name: str) -> Tuple[str, str, str, str]:
+    """
+    Series, scene, shot and take of a sound file name, corrected.
+    Tracks of a polywav set share the name, so the result is memoized
+    """
+    return correct_log(*get_log_from_name(name))
+
+
+def correct_log(series: str, scene: str, shot: str, take: str) -> Tuple[str, str, str, str]:
+    return series_correcting(series), scene_correcting(scene), shot_correcting(shot), take_correcting(take)
+
+
+@lru_cache(maxsize=65536)
 def get_log_from_name(name: str) -> tuple:
+    series, scene, shot, take = split_log_name(name)
+    if not scene:
+        scene = '00'
+
+    return series, scene, shot, take
+
+
+def split_log_name(name: str) -> tuple:
+    """
+    Series, scene, shot and take of a sound file name as they are written, scene is empty if the name has none
+    """
     if name[-4:].lower() == '-nr2':
         name = name[:-4]
     if name[0] == '+':
@@ -117,8 +344,6 @@ def get_log_from_name(name: str) -> tuple:
     shot = seq[-2]
     take = seq[-1]
     scene = name[len(series) + 1:-1 - len(shot) - 1 - len(take)]
-    if not scene:
-        scene = '00'
 
     return series, scene, shot, take
 
@@ -193,49 +418,103 @@ def series_correcting(series: str) -> str:
     return series
 
 
-def set_log_info(clip: Clip):
+def set_log_info(clip: Clip, rules: Rules = None, metadata: Optional[AudioMetadata] = None):
+    """
+    Актуально для звуковых файлов по имени. Для видео пустые строки.
+    Scene and take the recorder wrote into the file (metadata) are used instead of the name
+    """
+    clip.series, clip.scene, clip.shot, clip.take = get_log_info(clip.is_video(), clip.id_, rules, metadata)
+
+
+def set_log_infos(clip_list: ClipRows, rules: Rules = None, metadata_by_path: Dict[str, AudioMetadata] = None):
+    """
+    set_log_info for a whole bin, metadata of the clips by file path
+    """
+    with working_table(clip_list) as table:
+        table.set_logs([_row_log_info(table, row, rules, metadata_by_path) for row in range(len(table))])
+
+
+def _row_log_info(table: ClipTable, row: int, rules: Rules = None,
+                  metadata_by_path: Dict[str, AudioMetadata] = None) -> Log:
+    return get_log_info(table.is_video[row], table.name(row), rules,
+                        metadata_by_path.get(table.clips[row].file_path) if metadata_by_path else None)
+
+
+def get_log_info(is_video: bool, clip_id: str, rules: Rules = None, metadata: Optional[AudioMetadata] = None) -> Log:
     """
-    Актуально для звуковых файлов по имени. Для видео пустые строки
+    Series, scene, shot and take of a clip, empty strings for video
     """
     series = ''
     scene = ''
     shot = ''
     take = ''
 
-    if not clip.is_video():
-        series, scene, shot, take = get_log_from_name(clip.id_[:-4])
-        # print(clip.id_[:-4], end=', ')
+    if not is_video and metadata is not None and metadata.scene and metadata.take:
+        series, scene, shot, take = get_metadata_log(metadata, clip_id[:-4])
+    elif not is_video:
+        log_name = clip_id[:-4]
+        # print(clip_id[:-4], end=', ')
         # print(f'seria {series}', end=', ')
         # print(f'scene {scene}', end=', ')
         # print(f'shot {shot}', end=', ')
         # print(f'take {take}', end=', ')
         # print()
 
-        if not scene:
-            scene = shot[:-2]
-            shot = shot[-2:]
-            print(f'{scene}, {shot}?')
-            new_scene_shot = input()
-            if new_scene_shot:
-                scene_shot = new_scene_shot.split('_')
-                scene = scene_shot[0]
-                shot = scene_shot[1]
+        # a name without a scene gets scene 00 unless the rules know it
+        new_scene_shot = rules.answer(SCENE, log_name) if rules else None
+        if new_scene_shot and not split_log_name(log_name)[1]:
+            series, _, shot, take = get_log_from_name(log_name)
+            scene, _, new_shot = new_scene_shot.partition('_')
+            series, scene, shot, take = correct_log(series, scene, new_shot or shot, take)
+        else:
+            series, scene, shot, take = parse_log_name(log_name)
 
-        take = take_correcting(take)
-        shot = shot_correcting(shot)
-        scene = scene_correcting(scene)
-        series = series_correcting(series)
+    return series, scene, shot, take
 
-    clip.series = series
-    clip.scene = scene
-    clip.shot = shot
-    clip.take = take
 
+def get_metadata_log(metadata: AudioMetadata, name: str) -> Log:
+    """
+    Series, scene, shot and take of the SCENE and TAKE the recorder wrote, they are only corrected.
+    SCENE is the scene, scene_shot or series_scene_shot, the series and shot it lacks come from the file name
+    """
+    scene = metadata.scene
+    for delimiter in delimiters:
+        scene = scene.replace(delimiter, '_')
+    parts = [part for part in scene.split('_') if part]
+    if len(parts) > 2:
+        series, scene, shot = parts[0], '_'.join(parts[1:-1]), parts[-1]
+    else:
+        series, _, shot, _ = split_log_name(name)
+        scene = parts[0]
+        if len(parts) == 2:
+            shot = parts[1]
+    return correct_log(series, scene, shot, metadata.take)
 
-def _get_video_clips(clip_list: List[Clip]):
-    for clip in clip_list:
-        if clip.is_video():
-            yield clip
+
+def read_audio_metadata(clip_list: List[Clip]) -> Dict[str, AudioMetadata]:
+    """
+    BWF metadata of the files of the audio clips by path. The source timecode of a clip that has none
+    is filled in from the time reference, a different one is kept and counted
+    """
+    audio_clips = [clip for clip in _get_audio_clips(clip_list) if clip.file_path]
+    metadata_by_path = read_all_metadata(clip.file_path for clip in audio_clips)
+    filled = 0
+    different = 0
+    for clip in audio_clips:
+        metadata = metadata_by_path.get(clip.file_path)
+        if metadata is None or metadata.seconds is None:
+            continue
+        tc_format = clip.get_timecode_format('source')
+        frame = round(metadata.seconds * tc_format.fps) % tc_format.frames_per_day
+        source_frame = clip.get_timecode_frame('source')
+        if source_frame is None:
+            clip.insert_timecode(frame, 'source')
+            filled += 1
+        elif source_frame != frame:
+            different += 1
+    print(f'bwf: {len(metadata_by_path)} of {len(audio_clips)} files, {filled} timecodes filled in'
+          + (f', {different} differ from the xml' if different else ''))
+    return metadata_by_path
 
 
 def _get_audio_clips(clip_list: List[Clip]):
@@ -244,73 +523,156 @@ def _get_audio_clips(clip_list: List[Clip]):
             yield clip
 
 
-def set_video_name_by_audio(clip_list: List[Clip], date: datetime):
-    prev_clip_name = ''
-
-    for video_clip in _get_video_clips(clip_list):
-        clip_name = ''
-        for audio_clip in _get_audio_clips(clip_list):
-            if not (video_clip.first_aux_frame > audio_clip.last_aux_frame or
-                    video_clip.last_aux_frame < audio_clip.first_aux_frame):
-                clip_name = f'{audio_clip.series}.{audio_clip.scene}_{audio_clip.shot}_{audio_clip.take}-' + \
-                            date.strftime('%d%m%y') + 'm'
-                video_clip.series = audio_clip.series
-                video_clip.scene = audio_clip.scene
-                video_clip.shot = audio_clip.shot
-                video_clip.take = audio_clip.take
-        if clip_name:
-            if clip_name == prev_clip_name:
-                clip_name += '_bis'
-        video_clip.set_clip_name(clip_name)
-        prev_clip_name = clip_name
-
-
-def fix_duplicate_clip_id(clip_list: List[Clip]):
-    clip_id_list = [clip.id_ for clip in clip_list]
-    if len(clip_id_list) != len(set(clip_id_list)):
-        duplicates = [k for k, v in Counter(clip_id_list).items() if v > 1]
-        for duplicate in duplicates:
-            selected_clips = [clip for clip in clip_list if clip.id_ == duplicate]
-            for idx, clip in enumerate(selected_clips):
-                clip.set_clip_name(f'{clip.id_}_{idx:02d}')
-
-
-def make_xml_node(root: _Element, arguments: WorkArguments):
+def set_video_name_by_audio(clip_list: ClipRows, date: datetime):
+    with working_table(clip_list) as table:
+        video_rows = table.rows(True)
+        audio_rows = table.rows(False)
+        aux_ranges = [(frame or 0, (frame or 0) + duration) for frame, duration in zip(table.aux, table.duration)]
+        # clips running past midnight overlap the ones after it, when every clip counts the same day
+        days = {tc_format.frames_per_day for tc_format in table.formats}
+        audio_index = IntervalIndex([aux_ranges[row] for row in audio_rows], days.pop() if len(days) == 1 else None)
+        # the last overlapping audio clip gives the name
+        matches = audio_index.last_overlapping([aux_ranges[row] for row in video_rows])
+        date_name = date.strftime('%d%m%y')
+        prev_clip_name = ''
+
+        for row, match in zip(video_rows, matches):
+            clip_name = ''
+            if match is not None:
+                series, scene, shot, take = table.log(audio_rows[match])
+                clip_name = f'{series}.{scene}_{shot}_{take}-' + date_name + 'm'
+                table.set_log(row, series, scene, shot, take)
+            if clip_name:
+                if clip_name == prev_clip_name:
+                    clip_name += '_bis'
+                table.names[row] = clip_name
+            prev_clip_name = clip_name
+
+
+def fix_duplicate_clip_id(clip_list: ClipRows):
+    """
+    Clips sharing an id get _00, _01 ... suffixes in list order.
+    A suffixed id that is already taken is skipped, the clip gets the next free number
+    """
+    with working_table(clip_list) as table:
+        rows_by_id = {}
+        for row in range(len(table)):
+            rows_by_id.setdefault(table.name(row), []).append(row)
+        if len(rows_by_id) == len(table):
+            return
+
+        taken_ids = set(rows_by_id)
+        for clip_id, rows in rows_by_id.items():
+            if len(rows) < 2:
+                continue
+            idx = 0
+            for row in rows:
+                new_id = f'{clip_id}_{idx:02d}'
+                while new_id in taken_ids:
+                    idx += 1
+                    new_id = f'{clip_id}_{idx:02d}'
+                taken_ids.add(new_id)
+                table.names[row] = new_id
+                idx += 1
+
+
+def print_merge_report(bin_name: str, merge_plan: MergePlan):
+    if not (merge_plan.unmatched_video or merge_plan.unmatched_audio or merge_plan.multiple_matches):
+        return
+    print(f'merge {bin_name}: {len(merge_plan.pairs)} merged')
+    for title, clips in (('no audio', merge_plan.unmatched_video),
+                         ('no video', merge_plan.unmatched_audio),
+                         ('multiple matches', merge_plan.multiple_matches)):
+        for clip in clips:
+            print(f'  {title}: {clip.id_} (shot {clip.shot}, take {clip.take})')
+
+
+def make_xml_node(root: _Element, arguments: WorkArguments, rules: Rules = None):
     bin_list_from_xml = [bin_.find('name').text for bin_ in root.iter('bin')]
     # print(bin_list_from_xml)
-    clip_list = [Clip.Clip(clip) for clip in root.iter('clip')]
+    clip_elements = list(root.iter('clip'))
+    with profiling.stage('Clip.Clip', clips=len(clip_elements)):
+        clip_list = [Clip.Clip(clip, arguments.lazy) for clip in clip_elements]
+    # the xml as read keys the results of every clip in the cache
+    clip_xml = [etree.tostring(clip, with_tail=False) for clip in clip_elements] if arguments.cache else None
 
-    delta = calculate_delta(clip_list, arguments)
+    return process_clip_list(clip_list, bin_list_from_xml, arguments, rules, clip_xml)
 
-    for clip in clip_list:
-        insert_aux_timecode(clip, delta)
-        set_log_info(clip)
 
-    date = datetime.now()
-    if arguments.next_day:
-        date += timedelta(1)
-    if arguments.prev_day:
-        date -= timedelta(1)
+def replay_clip_results(table: ClipTable, delta: Delta, rules: Rules, metadata_by_path: Dict[str, AudioMetadata],
+                        clip_xml: List[bytes], arguments: WorkArguments):
+    """
+    insert_aux_timecodes and set_log_infos with arguments.cache: the clips stored by an earlier run with the same
+    xml, drift table and answers get the stored results, only the others go through the stages and are stored
+    """
+    drift_table = delta.drift_table()
+    options = [[int(frame) for frame in drift_table.frames], [int(delta) for delta in drift_table.deltas],
+               int(drift_table.frames_per_day), arguments.bwf]
+    paths = [clip.file_path for clip in table.clips]
+    keys = [clip_key(xml, options + [file_stamps([path]) if arguments.bwf and path else []])
+            for xml, path in zip(clip_xml, paths)]
+
+    with ResultCache(arguments.cache) as cache:
+        results = [cache.replay_clip(key, rules) for key in keys]
+        missing = [row for row, result in enumerate(results) if result is None]
+        with profiling.stage('insert_aux_timecode', clips=len(missing)):
+            frames, strings = aux_timecodes(table, delta, missing)
+        with profiling.stage('set_log_info', clips=len(missing)):
+            for row, frame, string in zip(missing, frames, strings):
+                # the lookups of this clip alone, to replay it in another bin
+                first = len(rules.consulted)
+                log = _row_log_info(table, row, rules, metadata_by_path)
+                results[row] = CachedClip(frame, string, log, rules.consulted[first:])
+        cache.put_clips([(keys[row], results[row]) for row in missing])
+        print(f'clip cache: {cache.clip_hits} clips replayed, {cache.clip_misses} processed')
+
+    table.set_aux([result.aux_frame for result in results], [result.aux_string for result in results])
+    table.set_logs([tuple(result.log) for result in results])
+
+
+def process_clip_list(clip_list: List[Clip], bin_list_from_xml: List[str], arguments: WorkArguments,
+                      rules: Rules = None, clip_xml: Optional[List[bytes]] = None):
+    if rules is None:
+        rules = get_arguments_rules(arguments)
+
+    clips = len(clip_list)
+    metadata_by_path = {}
+    if arguments.bwf:
+        with profiling.stage('read_audio_metadata', clips=clips):
+            metadata_by_path = read_audio_metadata(clip_list)
+    # the stages compute on the columns, the clips get the result once, before the bins are built
+    table = ClipTable(clip_list)
+    with profiling.stage('calculate_delta', clips=clips):
+        delta = auto_sync_delta(table, arguments) if arguments.auto_sync else calculate_delta(table, arguments)
+
+    if clip_xml is not None:
+        replay_clip_results(table, delta, rules, metadata_by_path, clip_xml, arguments)
+    else:
+        with profiling.stage('insert_aux_timecode', clips=clips):
+            insert_aux_timecodes(table, delta)
+        with profiling.stage('set_log_info', clips=clips):
+            set_log_infos(table, rules, metadata_by_path)
 
     # rename video clip
     if arguments.rename:
-        set_video_name_by_audio(clip_list, date)
-        fix_duplicate_clip_id(clip_list)
+        with profiling.stage('set_video_name_by_audio', clips=clips):
+            set_video_name_by_audio(table, get_date(arguments))
+        with profiling.stage('fix_duplicate_clip_id', clips=clips):
+            fix_duplicate_clip_id(table)
 
     bin_dict = {}
     if arguments.bin:
 
-        # create bins dictionary
-        for clip in clip_list:
-            bin_name = f'{clip.series}.{clip.scene}' if arguments.rename else bin_list_from_xml[0]
+        # create bins dictionary, rows of the table by bin name
+        for row in range(len(table)):
+            bin_name = f'{table.series[row]}.{table.scene[row]}' if arguments.rename else bin_list_from_xml[0]
             if bin_name not in bin_dict:
                 bin_dict.update({bin_name: []})
-            bin_dict[bin_name].append(clip)
+            bin_dict[bin_name].append(row)
 
         if arguments.rename:
             for binKey in bin_dict.copy():
-                print(binKey + '?')
-                new_bin = input()
+                new_bin = rules.ask(BIN, binKey, binKey + '?')
                 if new_bin:
                     print('ups')
                     if new_bin[0] == '.':
@@ -318,12 +680,13 @@ def make_xml_node(root: _Element, arguments: WorkArguments):
                         new_bin = series + new_bin
                     series = new_bin[:4]
                     scenes = new_bin[5:]
-                    for clip in _get_video_clips(bin_dict[binKey]):
-                        clip_name = clip.id_
+                    for row in bin_dict[binKey]:
+                        if not table.is_video[row]:
+                            continue
+                        clip_name = table.name(row)
                         clip_name = series + '.' + scenes + clip_name[len(binKey):]
-                        clip.series = series
-                        clip.scene = scenes
-                        clip.set_clip_name(clip_name)
+                        table.set_log(row, series, scenes, table.shot[row], table.take[row])
+                        table.names[row] = clip_name
                     if new_bin not in bin_dict:
                         bin_dict.update({new_bin: []})
                     bin_dict[new_bin].extend(bin_dict.pop(binKey))
@@ -331,18 +694,22 @@ def make_xml_node(root: _Element, arguments: WorkArguments):
             for binKey in bin_dict:
                 print(binKey)
 
+    with profiling.stage('write_back', clips=clips):
+        table.write_back()
+
     if arguments.bin:
         bin_list = []
         for binKey in bin_dict:
             bin_node = Bin(name=binKey)
-            for clip in bin_dict[binKey]:
-                bin_node.add_children(clip)
+            for row in bin_dict[binKey]:
+                bin_node.add_children(table.clips[row])
 
             if arguments.merge:
-                for video_clip in _get_video_clips(bin_dict[binKey]):
-                    for audio_clip in _get_audio_clips(bin_dict[binKey]):
-                        if video_clip.shot == audio_clip.shot and video_clip.take == audio_clip.take:
-                            bin_node.add_children(merge(video_clip, audio_clip))
+                with profiling.stage('merge', bin=binKey, clips=len(bin_dict[binKey])):
+                    merge_plan = plan_merge(table.select(bin_dict[binKey]))
+                    for video_clip, audio_clip in merge_plan.pairs:
+                        bin_node.add_children(merge(video_clip, audio_clip))
+                print_merge_report(binKey, merge_plan)
 
             bin_list.append(bin_node)
         return bin_list
@@ -350,9 +717,143 @@ def make_xml_node(root: _Element, arguments: WorkArguments):
         return clip_list
 
 
-def get_xml_items(bin_list: List[_Element], arguments: WorkArguments) -> List:
-    item_list = []
+def get_date(arguments: WorkArguments) -> datetime:
+    """
+    Date of the renamed video clips
+    """
+    date = datetime.now()
+    if arguments.next_day:
+        date += timedelta(1)
+    if arguments.prev_day:
+        date -= timedelta(1)
+    return date
+
+
+def get_arguments_rules(arguments: WorkArguments) -> Rules:
+    return get_rules(arguments.rules, interactive=not arguments.non_interactive)
+
+
+def get_xml_items(bin_list: List[_Element], arguments: WorkArguments, rules: Rules = None) -> List:
+    return list(iter_xml_items(bin_list, arguments, rules))
+
+
+def iter_xml_items(bin_list: List[_Element], arguments: WorkArguments, rules: Rules = None) -> Iterator[List]:
+    if rules is None:
+        rules = get_arguments_rules(arguments)
+    if arguments.cache:
+        yield from _iter_cached_xml_items(bin_list, arguments, rules)
+        return
+    if arguments.jobs != 1 and len(bin_list) > 1:
+        yield from _iter_xml_items_parallel(bin_list, arguments, rules)
+        return
     for idx, batch_item in enumerate(bin_list):
-        item = make_xml_node(batch_item, arguments)
-        item_list.append(item)
-    return item_list
+        with profiling.stage('bin', index=idx, bin=batch_item.findtext('name')):
+            item = make_xml_node(batch_item, arguments, rules)
+        yield item
+
+
+def _iter_xml_items_parallel(bin_list: List[_Element], arguments: WorkArguments, rules: Rules) -> Iterator[List]:
+    """
+    Bins are independent, each one is processed in its own worker process.
+    Workers get the serialized bin and send back serialized nodes, order of the bins is kept.
+    Workers have no terminal, they never ask: questions without an answer in rules are gathered into rules.unresolved.
+    With arguments.profile workers profile their bins and send the records back
+    """
+    max_workers = min(arguments.jobs if arguments.jobs > 0 else os.cpu_count() or 1, len(bin_list))
+    batch_xml_list = [etree.tostring(batch_item, with_tail=False) for batch_item in bin_list]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for node_xml_list, unresolved, records, _ in executor.map(_make_serialized_xml_node, batch_xml_list,
+                                                                  repeat(arguments), repeat(rules.answers), count()):
+            rules.unresolved.extend(unresolved)
+            profiling.add_records(records)
+            yield [SerializedNode(node_xml) for node_xml in node_xml_list]
+
+
+def _make_serialized_xml_node(batch_xml: bytes, arguments: WorkArguments, answers: dict, idx: int = 0
+                              ) -> Tuple[List[bytes], List[Unresolved], List[profiling.StageRecord], List[Consulted]]:
+    rules = Rules(answers, interactive=False)
+    # a forked worker starts with a copy of the parent's profiler and its records
+    profiling.disable()
+    if arguments.profile:
+        profiling.enable()
+    batch_item = etree.fromstring(batch_xml)
+    with profiling.stage('bin', index=idx, bin=batch_item.findtext('name')):
+        item = make_xml_node(batch_item, arguments, rules)
+        node_xml_list = [etree.tostring(node.create_node()) for node in item]
+    return node_xml_list, rules.unresolved, profiling.disable(), rules.consulted
+
+
+def _iter_cached_xml_items(bin_list: List[_Element], arguments: WorkArguments, rules: Rules) -> Iterator[List]:
+    """
+    Bins stored by an earlier run with the same xml, options, date and answers are replayed,
+    the others are processed (in workers with --jobs) and stored
+    """
+    with ResultCache(arguments.cache) as cache:
+        cache.load_answers(rules)
+        options = [get_date(arguments).strftime('%d%m%y')] + [getattr(arguments, name) for name in CACHE_KEY_FIELDS]
+        batch_xml_list = [etree.tostring(batch_item, with_tail=False) for batch_item in bin_list]
+        keys = [bin_key(batch_xml, options + [file_stamps(_referenced_files(batch_item, arguments))])
+                for batch_xml, batch_item in zip(batch_xml_list, bin_list)]
+        replayed = [cache.replay(key, rules) for key in keys]
+        missing = [idx for idx, nodes in enumerate(replayed) if nodes is None]
+
+        if arguments.jobs != 1 and len(missing) > 1:
+            max_workers = min(arguments.jobs if arguments.jobs > 0 else os.cpu_count() or 1, len(missing))
+            executor = ProcessPoolExecutor(max_workers=max_workers)
+            results = executor.map(_make_serialized_xml_node, [batch_xml_list[idx] for idx in missing],
+                                   repeat(arguments), repeat(rules.answers), missing)
+        else:
+            executor = None
+            results = (_make_cached_xml_node(bin_list[idx], arguments, rules, idx) for idx in missing)
+
+        try:
+            for idx, nodes in enumerate(replayed):
+                if nodes is None:
+                    nodes, unresolved, records, consulted = next(results)
+                    rules.unresolved.extend(unresolved)
+                    profiling.add_records(records)
+                    cache.put(keys[idx], CachedBin(nodes, consulted))
+                    cache.save_answers(rules, consulted)
+                yield [SerializedNode(node_xml) for node_xml in nodes]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        print(f'cache: {cache.hits} bins replayed, {cache.misses} processed')
+
+
+def _referenced_files(batch_item: _Element, arguments: WorkArguments) -> List[str]:
+    """
+    Files the output of a bin depends on besides its xml: the media files of its clips with --bwf,
+    with --auto-sync also the scratch audio next to them. Keyed per bin like the xml, a changed file reprocesses it
+    """
+    if not (arguments.bwf or arguments.auto_sync):
+        return []
+    paths = [pathurl_path(pathurl.text) for pathurl in batch_item.iter('pathurl') if pathurl.text]
+    if arguments.auto_sync:
+        # every name autosync.scratch_audio_path looks for, one that appears later changes the key as well
+        paths += [os.path.splitext(path)[0] + extension for path in paths
+                  if os.path.splitext(path)[1].lower() != '.wav' for extension in ('.wav', '.WAV')]
+    return paths
+
+
+def _make_cached_xml_node(batch_item: _Element, arguments: WorkArguments, rules: Rules, idx: int
+                          ) -> Tuple[List[bytes], List[Unresolved], List[profiling.StageRecord], List[Consulted]]:
+    """
+    _make_serialized_xml_node in this process, unresolved questions and records are already in rules and profiling
+    """
+    consulted_before = len(rules.consulted)
+    with profiling.stage('bin', index=idx, bin=batch_item.findtext('name')):
+        item = make_xml_node(batch_item, arguments, rules)
+        node_xml_list = [etree.tostring(node.create_node()) for node in item]
+    return node_xml_list, [], [], rules.consulted[consulted_before:]
+
+
+def get_stream_xml_items(batches: Iterable[Tuple[List[str], List[Clip]]],
+                         arguments: WorkArguments, rules: Rules = None) -> Iterator[List]:
+    if rules is None:
+        rules = get_arguments_rules(arguments)
+    for idx, (bin_list_from_xml, clip_list) in enumerate(batches):
+        with profiling.stage('bin', index=idx, bin=bin_list_from_xml[0] if bin_list_from_xml else None,
+                             clips=len(clip_list)):
+            item = process_clip_list(clip_list, bin_list_from_xml, arguments, rules)
+        yield item
@@ -0,0 +1,139 @@
+"""
+Timing of the pipeline stages.
+
+Disabled by default: stage() then returns one shared null context manager and nothing is measured.
+enable() starts recording wall time, cpu time and allocated memory (tracemalloc, it slows python code down)
+of every stage, hooks get each StageRecord when its stage ends, write() saves the records
+as a trace event file (chrome://tracing, ui.perfetto.dev)
+
+    profiling.enable('profile.json')
+    profiling.add_hook(print)
+    with profiling.stage('calculate_delta', clips=len(clip_list)):
+        ...
+    profiling.write()
+"""
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+_NULL_STAGE = nullcontext()
+
+
+class StageRecord(NamedTuple):
+    name: str
+    start: float  # seconds since the epoch
+    wall: float
+    cpu: float
+    allocated: int  # bytes, net growth of python memory
+    pid: int
+    args: Dict[str, object]
+
+
+class Profiler:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.records: List[StageRecord] = []
+        self.hooks: List[Callable[[StageRecord], None]] = []
+        # perf_counter has no common origin between processes, it is anchored to the clock once
+        self.__epoch = time.time() - time.perf_counter()
+        self.__started_tracemalloc = not tracemalloc.is_tracing()
+        if self.__started_tracemalloc:
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str, args: Dict[str, object]):
+        start_memory = tracemalloc.get_traced_memory()[0]
+        start_cpu = time.process_time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            self.add(StageRecord(name, self.__epoch + start, wall, time.process_time() - start_cpu,
+                                 tracemalloc.get_traced_memory()[0] - start_memory, os.getpid(), args))
+
+    def add(self, record: StageRecord):
+        self.records.append(record)
+        for hook in self.hooks:
+            hook(record)
+
+    def close(self):
+        if self.__started_tracemalloc:
+            tracemalloc.stop()
+
+    def trace_events(self) -> dict:
+        return {
+            'traceEvents': [{
+                'name': record.name,
+                'cat': 'log_helper',
+                'ph': 'X',
+                'ts': round(record.start * 1e6),
+                'dur': round(record.wall * 1e6),
+                'pid': record.pid,
+                'tid': record.pid,
+                'args': {**record.args, 'cpu_ms': round(record.cpu * 1e3, 3), 'allocated': record.allocated},
+            } for record in self.records],
+            'displayTimeUnit': 'ms',
+        }
+
+
+_profiler: Optional[Profiler] = None
+
+
+def enable(path: Optional[str] = None) -> Profiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(path)
+    elif path:
+        _profiler.path = path
+    return _profiler
+
+
+def disable() -> List[StageRecord]:
+    """
+    Stops recording and returns the records
+    """
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is None:
+        return []
+    profiler.close()
+    return profiler.records
+
+
+def is_enabled() -> bool:
+    return _profiler is not None
+
+
+def stage(name: str, **args):
+    """
+    Context manager measuring one stage, args (clip counts, bin names) go into the record
+    """
+    if _profiler is None:
+        return _NULL_STAGE
+    return _profiler.stage(name, args)
+
+
+def add_hook(hook: Callable[[StageRecord], None]):
+    enable().hooks.append(hook)
+
+
+def add_records(records: List[StageRecord]):
+    """
+    Records measured in another process, worker processes profile their bins themselves
+    """
+    if _profiler is not None:
+        for record in records:
+            _profiler.add(record)
+
+
+def write(path: Optional[str] = None):
+    if _profiler is None:
+        return
+    path = path or _profiler.path
+    if path:
+        with open(path, 'w', encoding='utf-8') as trace_file:
+            json.dump(_profiler.trace_events(), trace_file)
@@ -0,0 +1,132 @@
+import csv
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional
+
+from log_helper.errors import RulesFormatError
+
+SCENE = 'scene'
+BIN = 'bin'
+KINDS = (SCENE, BIN)
+
+
+class Unresolved(NamedTuple):
+    kind: str
+    key: str
+    question: str
+
+
+class Consulted(NamedTuple):
+    kind: str
+    key: str
+    answer: Optional[str]  # None: no answer, or nobody answered the question
+    question: Optional[str]  # None for a lookup
+
+
+class Rules:
+    """
+    Answers to the questions of the pipeline:
+        scene - sound file name without a scene -> 'scene_shot', looked up only, without it the scene is 00
+        bin   - bin key -> new bin name
+    An empty answer keeps the proposed value.
+    In non interactive mode unanswered questions are collected in unresolved instead of prompting.
+    Every lookup and question is recorded in consulted, a cached result is valid while they get the same answers
+    """
+    def __init__(self, answers: Optional[Dict[str, Dict[str, str]]] = None, interactive: bool = True):
+        self.answers = {kind: {} for kind in KINDS}
+        if answers:
+            for kind, kind_answers in answers.items():
+                self.answers[kind].update(kind_answers)
+        self.interactive = interactive
+        self.unresolved: List[Unresolved] = []
+        self.consulted: List[Consulted] = []
+
+    def answer(self, kind: str, key: str) -> Optional[str]:
+        answer = self.answers[kind].get(key)
+        self.consulted.append(Consulted(kind, key, answer, None))
+        return answer
+
+    def ask(self, kind: str, key: str, question: str) -> str:
+        kind_answers = self.answers[kind]
+        if key in kind_answers:
+            answer = kind_answers[key]
+        else:
+            answer = None
+            if self.interactive:
+                try:
+                    answer = ask(question)
+                except EOFError:
+                    # no terminal to answer, report it like in non interactive mode
+                    pass
+            if answer is None:
+                self.unresolved.append(Unresolved(kind, key, question))
+        self.consulted.append(Consulted(kind, key, answer, question))
+        return answer or ''
+
+    def report(self) -> List[str]:
+        lines = []
+        if self.unresolved:
+            lines.append(f'unresolved: {len(self.unresolved)}')
+            for item in self.unresolved:
+                lines.append(f'  {item.kind}: {item.key}')
+        return lines
+
+
+def ask(question: str) -> str:
+    print(question)
+    return input()
+
+
+def get_rules(path: Optional[str], interactive: bool = True) -> Rules:
+    return Rules(load_rules_file(path) if path else None, interactive)
+
+
+def load_rules_file(path: str) -> Dict[str, Dict[str, str]]:
+    """
+    JSON or YAML: {"scene": {"name": "scene_shot"}, "bin": {"key": "new bin"}}
+    CSV: kind,key,answer rows, the header row is optional
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return _load_csv(path)
+    with open(path, encoding='utf-8') as rules_file:
+        if extension in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise RulesFormatError(f'{path}: PyYAML is required for yaml rules (pip install log-helper[yaml])')
+            try:
+                data = yaml.safe_load(rules_file) or {}
+            except yaml.YAMLError as e:
+                raise RulesFormatError(f'{path}: {e}') from e
+        elif extension == '.json':
+            try:
+                data = json.load(rules_file)
+            except json.JSONDecodeError as e:
+                raise RulesFormatError(f'{path}: {e}') from e
+        else:
+            raise RulesFormatError(f'{path}: unknown rules format, use .json, .yaml or .csv')
+
+    if not isinstance(data, dict):
+        raise RulesFormatError(f'{path}: top level must be a mapping')
+    answers = {}
+    for kind, kind_answers in data.items():
+        if kind not in KINDS or not isinstance(kind_answers, dict):
+            raise RulesFormatError(f'{path}: {kind!r} must be one of {KINDS} with a mapping of answers')
+        answers[kind] = {str(key): '' if answer is None else str(answer) for key, answer in kind_answers.items()}
+
+    return answers
+
+
+def _load_csv(path: str) -> Dict[str, Dict[str, str]]:
+    answers = {kind: {} for kind in KINDS}
+    with open(path, newline='', encoding='utf-8') as rules_file:
+        for line, row in enumerate(csv.reader(rules_file), start=1):
+            if not row or (line == 1 and row == ['kind', 'key', 'answer']):
+                continue
+            if len(row) != 3 or row[0] not in KINDS:
+                raise RulesFormatError(f'{path}:{line}: expected kind,key,answer with kind one of {KINDS}')
+            kind, key, answer = row
+            answers[kind][key] = answer
+
+    return answers
@@ -0,0 +1,123 @@
+"""
+Sync by the sound: the scratch audio of a camera clip is found in the recorder file by FFT cross-correlation.
+
+Both signals are mixed down and decimated to SYNC_RATE, an excerpt of the scratch audio is searched
+for only within +-window seconds of where the timecodes put it, so the FFT stays small whatever the length
+of the recording. Pairs are correlated in a thread pool, numpy releases the GIL in the FFT and the pages
+of the memory mapped files are read in parallel. Needs numpy (pip install log-helper[fast])
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from log_helper.utils.wav import WavFile, open_wav
+
+SYNC_RATE = 1000  # samples per second after decimation
+SYNC_SECONDS = 8.0  # length of the scratch audio excerpt
+# the peak of the correlation against its standard deviation, below it the match is noise
+MIN_SCORE = 8.0
+
+
+class SyncJob(NamedTuple):
+    scratch_path: str
+    video_frame: int  # source timecode of the camera file
+    video_fps: float
+    video_frames: int  # duration
+    audio_path: str
+    audio_frame: int  # source timecode of the recorder file
+    audio_fps: float
+    guess: int  # audio minus camera frame the timecodes and marks give
+
+
+class SyncPoint(NamedTuple):
+    frame: int  # camera frame
+    delta: int  # audio minus camera frame at it
+    score: float
+
+
+def scratch_audio_path(path: str) -> Optional[str]:
+    """
+    The file itself when it is a WAVE file, otherwise a .wav with the same name next to it
+    (scratch audio exported from the camera files)
+    """
+    base, extension = os.path.splitext(path)
+    if extension.lower() == '.wav':
+        return path
+    for extension in ('.wav', '.WAV'):
+        if os.path.isfile(base + extension):
+            return base + extension
+    return None
+
+
+def sync_points(jobs: List[SyncJob], window: float, max_workers: Optional[int] = None) -> List[Optional[SyncPoint]]:
+    """
+    SyncPoint of every job, None where the files cannot be read or the sound does not match
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(sync_point, jobs, [window] * len(jobs)))
+
+
+def sync_point(job: SyncJob, window: float) -> Optional[SyncPoint]:
+    scratch = open_wav(job.scratch_path)
+    recording = open_wav(job.audio_path)
+    if scratch is None or recording is None:
+        return None
+    factor = _decimation(scratch, recording)
+    if factor is None:
+        return None
+    rate = scratch.format.samplerate / factor[0]
+
+    # the middle of the camera clip, away from the roll in and out
+    duration = min(job.video_frames / job.video_fps, scratch.seconds)
+    seconds = min(SYNC_SECONDS, duration)
+    start = round(max((duration - seconds) / 2, 0.0) * scratch.format.samplerate)
+    reference = _decimate(scratch.read(start, round(seconds * scratch.format.samplerate)), factor[0])
+    scratch_start = start / scratch.format.samplerate
+
+    # where the timecodes put the excerpt in the recorder file, +-window
+    instant = job.video_frame / job.video_fps + scratch_start
+    expected = (job.video_frame + scratch_start * job.video_fps + job.guess) / job.audio_fps
+    start = round(max(expected - job.audio_frame / job.audio_fps - window, 0.0) * recording.format.samplerate)
+    signal = _decimate(recording.read(start, round((seconds + 2 * window) * recording.format.samplerate)), factor[1])
+    audio_start = start / recording.format.samplerate
+    if len(reference) < rate or len(signal) < len(reference):
+        return None
+
+    lag, score = find_offset(reference, signal)
+    if score < MIN_SCORE:
+        return None
+    # the camera instant is heard at audio_start + lag in the recorder file
+    audio_frame = job.audio_frame + (audio_start + lag / rate) * job.audio_fps
+    return SyncPoint(round(instant * job.video_fps), round(audio_frame - instant * job.video_fps), score)
+
+
+def find_offset(reference: np.ndarray, signal: np.ndarray) -> Tuple[int, float]:
+    """
+    Position of reference in signal, in samples, and how far the correlation peak stands out
+    """
+    reference = reference - reference.mean()
+    signal = signal - signal.mean()
+    lags = len(signal) - len(reference) + 1
+    size = 1 << (len(signal) + len(reference) - 1).bit_length()
+    correlation = np.fft.irfft(np.conj(np.fft.rfft(reference, size)) * np.fft.rfft(signal, size), size)[:lags]
+    lag = int(np.argmax(correlation))
+    deviation = correlation.std()
+    return lag, float((correlation[lag] - correlation.mean()) / deviation) if deviation else 0.0
+
+
+def _decimation(scratch: WavFile, recording: WavFile) -> Optional[Tuple[int, int]]:
+    """
+    Factors that bring both files to the same rate near SYNC_RATE
+    """
+    factors = (max(scratch.format.samplerate // SYNC_RATE, 1), max(recording.format.samplerate // SYNC_RATE, 1))
+    if scratch.format.samplerate * factors[1] != recording.format.samplerate * factors[0]:
+        return None
+    return factors
+
+
+def _decimate(samples: np.ndarray, factor: int) -> np.ndarray:
+    # the mean of each block is the low pass filter
+    samples = samples[:len(samples) - len(samples) % factor]
+    return samples.reshape(-1, factor).mean(axis=1)
@@ -0,0 +1,107 @@
+"""
+Broadcast WAVE metadata of the sound files: scene, take and the start time the recorder writes
+into the bext and iXML chunks. Only the chunk headers and these two chunks are read, never the samples
+"""
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from lxml import etree
+
+from log_helper.utils.wav import read_chunk, read_chunks, wav_format
+
+# Description, Originator, OriginatorReference, OriginationDate, OriginationTime, TimeReferenceLow and High
+_BEXT = struct.Struct('<256s32s32s10s8sII')
+
+
+class AudioMetadata(NamedTuple):
+    scene: Optional[str]
+    take: Optional[str]
+    note: Optional[str]
+    time_reference: Optional[int]  # samples since midnight
+    samplerate: Optional[int]
+
+    @property
+    def seconds(self) -> Optional[float]:
+        if self.time_reference is None or not self.samplerate:
+            return None
+        return self.time_reference / self.samplerate
+
+
+def read_metadata(path: str) -> Optional[AudioMetadata]:
+    """
+    Metadata of a file, None when it is not a WAVE file or has no bext and iXML.
+    Cached per path while the file keeps its size and modification time
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return _read_metadata(path, stat.st_size, stat.st_mtime_ns)
+
+
+def read_all_metadata(paths: Iterable[str], max_workers: Optional[int] = None) -> Dict[str, AudioMetadata]:
+    """
+    read_metadata of every path in a thread pool, the files are mostly waited for on network volumes
+    """
+    paths = list(dict.fromkeys(paths))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return {path: metadata for path, metadata in zip(paths, executor.map(read_metadata, paths))
+                if metadata is not None}
+
+
+@lru_cache(maxsize=4096)
+def _read_metadata(path: str, size: int, mtime_ns: int) -> Optional[AudioMetadata]:
+    try:
+        chunks = read_chunks(path)
+        if b'bext' not in chunks and b'iXML' not in chunks:
+            return None
+        fields = {}
+        time_reference = None
+        if b'bext' in chunks and chunks[b'bext'].size >= _BEXT.size:
+            description, time_reference = parse_bext(read_chunk(path, chunks[b'bext']))
+            fields.update(description)
+        if b'iXML' in chunks:
+            # iXML wins, it is structured
+            fields.update(parse_ixml(read_chunk(path, chunks[b'iXML'])))
+        samplerate = None
+        if b'fmt ' in chunks and chunks[b'fmt '].size >= 16:
+            samplerate = wav_format(read_chunk(path, chunks[b'fmt '])).samplerate
+    except OSError:
+        return None
+    return AudioMetadata(fields.get('SCENE'), fields.get('TAKE'), fields.get('NOTE'), time_reference, samplerate)
+
+
+def parse_bext(data: bytes) -> Tuple[Dict[str, str], int]:
+    """
+    KEY=value lines of the description (sSCENE=12 on Sound Devices, the first letter tells the vendor)
+    and the time reference
+    """
+    description, _, _, _, _, low, high = _BEXT.unpack_from(data)
+    fields = {}
+    for line in description.split(b'\x00', 1)[0].decode('latin-1').splitlines():
+        key, separator, value = line.partition('=')
+        if not separator or not value.strip():
+            continue
+        key = key.strip()
+        if len(key) > 1 and key[0].islower():
+            key = key[1:]
+        fields[key.upper()] = value.strip()
+    return fields, high << 32 | low
+
+
+def parse_ixml(data: bytes) -> Dict[str, str]:
+    try:
+        root = etree.fromstring(data.rstrip(b'\x00 \r\n\t'), etree.XMLParser(recover=True, resolve_entities=False))
+    except etree.XMLSyntaxError:
+        return {}
+    if root is None:
+        return {}
+    fields = {}
+    for tag in ('SCENE', 'TAKE', 'NOTE'):
+        text = root.findtext(tag)
+        if text and text.strip():
+            fields[tag] = text.strip()
+    return fields
@@ -0,0 +1,171 @@
+"""
+The clips of a bin as columns, the working representation of the pipeline stages.
+
+A column is a list with one value per clip in list order, it is read from the clips the first time a stage
+asks for it, so every getter of the object model runs once per clip instead of once per stage.
+The stages compute on the columns: sync marks, aux1 frames and strings, log fields, names, bins and merge pairs.
+write_back then puts what they changed into the clips, once, before the bins are built and written
+"""
+from contextlib import contextmanager
+from functools import cached_property
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from log_helper.utils.fcpxml import Clip
+from log_helper.utils.timecode import TimecodeFormat
+
+Log = Tuple[str, str, str, str]  # series, scene, shot, take
+
+
+class ClipTable:
+    """
+    Columns of the clips, clips[row] is the clip of a row
+    """
+    # read from the clips, select copies the ones already read
+    COLUMNS = ('is_video', 'source', 'formats', 'duration', 'in_', 'out', 'aux', 'series', 'scene', 'shot', 'take')
+
+    def __init__(self, clips: Iterable[Clip]):
+        self.clips = list(clips)
+        # set by the stages: new names, None keeps the id, and the strings of new aux1 frames
+        self.names: List[Optional[str]] = [None] * len(self.clips)
+        self.aux_strings: List[Optional[str]] = [None] * len(self.clips)
+        self.__marks_rows = set()
+        self.__log_rows = set()
+
+    def __len__(self):
+        return len(self.clips)
+
+    @cached_property
+    def is_video(self) -> List[bool]:
+        return [clip.is_video() for clip in self.clips]
+
+    @cached_property
+    def source(self) -> List[Optional[int]]:
+        """
+        Source timecode frames, None without a timecode
+        """
+        return [clip.get_timecode_frame('source') for clip in self.clips]
+
+    @cached_property
+    def formats(self) -> List[TimecodeFormat]:
+        return [clip.get_timecode_format('source') for clip in self.clips]
+
+    @cached_property
+    def duration(self) -> List[int]:
+        return [clip.duration for clip in self.clips]
+
+    @cached_property
+    def in_(self) -> list:
+        return [clip.in_ for clip in self.clips]
+
+    @cached_property
+    def out(self) -> list:
+        return [clip.out for clip in self.clips]
+
+    @cached_property
+    def aux(self) -> List[Optional[int]]:
+        return [clip.get_timecode_frame('aux1') for clip in self.clips]
+
+    @cached_property
+    def series(self) -> List[str]:
+        return [clip.series for clip in self.clips]
+
+    @cached_property
+    def scene(self) -> List[str]:
+        return [clip.scene for clip in self.clips]
+
+    @cached_property
+    def shot(self) -> List[str]:
+        return [clip.shot for clip in self.clips]
+
+    @cached_property
+    def take(self) -> List[str]:
+        return [clip.take for clip in self.clips]
+
+    def rows(self, is_video: bool) -> List[int]:
+        return [row for row, video in enumerate(self.is_video) if video == is_video]
+
+    def name(self, row: int) -> str:
+        name = self.names[row]
+        return self.clips[row].id_ if name is None else name
+
+    def log(self, row: int) -> Log:
+        return self.series[row], self.scene[row], self.shot[row], self.take[row]
+
+    def clear_marks(self, row: int):
+        self.in_[row] = -1
+        self.out[row] = -1
+        self.__marks_rows.add(row)
+
+    def set_aux(self, frames: Sequence[int], strings: Sequence[str]):
+        """
+        aux1 of every row
+        """
+        self.aux = list(frames)
+        self.aux_strings = list(strings)
+
+    def set_logs(self, logs: Sequence[Log]):
+        """
+        Log fields of every row
+        """
+        columns = tuple(zip(*logs)) or ((), (), (), ())
+        self.series, self.scene, self.shot, self.take = (list(column) for column in columns)
+        self.__log_rows.update(range(len(self.clips)))
+
+    def set_log(self, row: int, series: str, scene: str, shot: str, take: str):
+        self.series[row] = series
+        self.scene[row] = scene
+        self.shot[row] = shot
+        self.take[row] = take
+        self.__log_rows.add(row)
+
+    def select(self, rows: Sequence[int]) -> 'ClipTable':
+        """
+        Table of some rows with the columns read so far, to be used after write_back
+        """
+        table = ClipTable([self.clips[row] for row in rows])
+        for column in self.COLUMNS:
+            if column in self.__dict__:
+                values = self.__dict__[column]
+                setattr(table, column, [values[row] for row in rows])
+        return table
+
+    def write_back(self):
+        """
+        Marks, aux1 timecodes, log fields and names the stages changed, into the clips
+        """
+        for row, clip in enumerate(self.clips):
+            if row in self.__marks_rows:
+                clip.in_ = self.in_[row]
+                clip.out = self.out[row]
+            if self.aux_strings[row] is not None:
+                clip.remove_timecode('aux1')
+                clip.insert_timecode(self.aux[row], 'aux1', reel_name='001', string=self.aux_strings[row])
+            if row in self.__log_rows:
+                clip.series = self.series[row]
+                clip.scene = self.scene[row]
+                clip.shot = self.shot[row]
+                clip.take = self.take[row]
+            if self.names[row] is not None:
+                clip.set_clip_name(self.names[row])
+        self.__marks_rows.clear()
+        self.__log_rows.clear()
+        self.aux_strings = [None] * len(self.clips)
+        self.names = [None] * len(self.clips)
+
+
+# what the stages take: the clips of a bin or their table
+ClipRows = Union[Sequence[Clip], ClipTable]
+
+
+@contextmanager
+def working_table(clips: ClipRows) -> Iterator[ClipTable]:
+    """
+    The table a stage works on: the one it is given, or one made of a list of clips
+    that is written back when the stage is done
+    """
+    if isinstance(clips, ClipTable):
+        yield clips
+        return
+    table = ClipTable(clips)
+    yield table
+    table.write_back()
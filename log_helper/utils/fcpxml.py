@@ -1,28 +1,198 @@
 import uuid
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from copy import deepcopy
+from dataclasses import dataclass, fields
+from operator import attrgetter
+from sys import intern
+from urllib.parse import unquote, urlparse
 
 from lxml import etree
 from lxml.etree import _Element
 
+from log_helper.utils.timecode import DEFAULT_FORMAT, frame_string, string_frame, timecode_format
+
+
+def _enum_text(tag):
+    """
+    Text of a tag with a few possible values (mediatype, TRUE/FALSE, timebase), shared between all clips
+    """
+    return intern(tag.text) if tag.text is not None else None
+
+
+def _slotted(cls):
+    """
+    dataclass(slots=True) for python < 3.10
+    """
+    field_names = tuple(field.name for field in fields(cls))
+    namespace = {key: value for key, value in cls.__dict__.items()
+                 if key not in field_names + ('__dict__', '__weakref__')}
+    namespace['__slots__'] = field_names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
 
 class _Tag:
+    __slots__ = ()
+
     def get_tag(self):
         return self.__class__.__name__.lower().lstrip('_')
 
 
+class _Tracked:
+    """
+    Remembers the element it was parsed from and the values of its fields at that moment.
+    While they stay the same create_*_node copies the element instead of building it field by field.
+    In place changes of nested dataclasses, lists and dicts are not seen, assign the attribute instead.
+    A rebuilt node gets the children of the element the model does not parse (not in _known_tags) back
+    """
+    __slots__ = ('_source', '_state', '_unknown')
+    # slots filled on demand by lazy parsing, their setters drop the state
+    _lazy_slots = ()
+    _known_tags = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        prefix = '_' + cls.__name__.lstrip('_')
+        cls._fields = attrgetter(*(prefix + name if name.startswith('__') else name
+                                   for name in cls.__slots__ if name not in cls._lazy_slots))
+
+    def _track(self, tag):
+        self._source = tag
+        self._state = self._fields(self)
+
+    def _children(self):
+        return ()
+
+    def _is_clean(self):
+        return (getattr(self, '_state', None) is not None and self._fields(self) == self._state
+                and all(child._is_clean() for child in self._children()))
+
+    def _unknown_children(self):
+        source = getattr(self, '_source', None)
+        if source is not None:
+            return _unknown_children(source, self._known_tags)
+        return getattr(self, '_unknown', None) or ()
+
+    def _drop_source(self):
+        # the unknown children outlive the element, copied so they do not hold its document
+        if getattr(self, '_source', None) is not None:
+            self._unknown = [(anchor, deepcopy(child))
+                             for anchor, child in _unknown_children(self._source, self._known_tags)]
+        self._source = None
+        self._state = None
+        for child in self._children():
+            child._drop_source()
+
+
+def pathurl_path(pathurl):
+    """
+    Local path of a pathurl (file://localhost/Volumes/...)
+    """
+    return unquote(urlparse(pathurl).path)
+
+
+def _split_first(string, delimiter):
+    """
+    ('a', 'b.c') for 'a.b.c', ('a', '') without the delimiter
+    """
+    first = string.split(delimiter)[0]
+    return first, string[len(first) + len(delimiter):]
+
+
+def _children_by_tag(tag, repeated=()):
+    """
+    Children of an element found in one pass over them: tag -> the first child with it,
+    tag -> list of all the children with it for the repeated tags
+    """
+    children = {name: [] for name in repeated}
+    for child in tag:
+        name = child.tag
+        if name in repeated:
+            children[name].append(child)
+        elif name not in children:
+            children[name] = child
+    return children
+
+
+def _child_texts(tag):
+    """
+    tag -> text of the first child with it, for elements made of text children (rate, logginginfo, comments...)
+    """
+    texts = {}
+    for child in tag:
+        texts.setdefault(child.tag, child.text)
+    return texts
+
+
+def _unknown_children(source, known_tags):
+    """
+    Children of source the model does not parse, each with the tag of the known child before it, None for the first ones
+    """
+    unknown = []
+    anchor = None
+    for child in source:
+        if not isinstance(child.tag, str):
+            continue
+        if child.tag in known_tags:
+            anchor = child.tag
+        else:
+            unknown.append((anchor, child))
+    return unknown
+
+
+def _insert_unknown(node, unknown):
+    """
+    Copies the unknown children into a rebuilt node where they were: after the last child with their anchor tag,
+    at the start without one, at the end if the node has no such child any more
+    """
+    previous = None
+    previous_anchor = None
+    start = 0
+    for anchor, child in unknown:
+        child = deepcopy(child)
+        if previous is not None and anchor == previous_anchor:
+            previous.addnext(child)
+        elif anchor is None:
+            node.insert(start, child)
+            start += 1
+        else:
+            anchors = [known for known in node if known.tag == anchor]
+            if anchors:
+                anchors[-1].addnext(child)
+            else:
+                node.append(child)
+        previous = child
+        previous_anchor = anchor
+
+
 class Node(_Tag, ABC):
+    __slots__ = ()
+
     @abstractmethod
     def create_node(self) -> _Element:
         pass
 
 
+class SerializedNode(Node):
+    """
+    Node already serialized elsewhere (e.g. in a worker process)
+    """
+    __slots__ = ('data',)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def create_node(self):
+        return etree.fromstring(self.data)
+
+
+@_slotted
 @dataclass
 class _Rate:
     ntsc: str = 'FALSE'
     timebase: int = 25
 
 
+@_slotted
 @dataclass
 class _LoggingInfo:
     scene: str = ''
@@ -31,27 +201,32 @@ class _LoggingInfo:
     good: str = 'FALSE'
 
 
+@_slotted
 @dataclass
 class _Labels:
     label2: str = ''
 
 
+@_slotted
 @dataclass
 class _Reel:
     name: str = ''
 
 
+@_slotted
 @dataclass
 class _ItemHistory:
     uuid_: str = ''
 
 
+@_slotted
 @dataclass
 class _SourceTrack:
     mediatype: str = ''
     trackindex: str = ''
 
 
+@_slotted
 @dataclass
 class _SampleCharacteristics:
     width: str = ''
@@ -60,6 +235,7 @@ class _SampleCharacteristics:
     depth: str = ''
 
 
+@_slotted
 @dataclass
 class _Parameter:
     name: str = ''
@@ -69,6 +245,7 @@ class _Parameter:
     value: str = ''
 
 
+@_slotted
 @dataclass
 class _Comments:
     mastercomment1: str = ''
@@ -77,7 +254,20 @@ class _Comments:
     mastercomment4: str = ''
 
 
+def _logging_info(tag):
+    texts = _child_texts(tag)
+    return _LoggingInfo(scene=texts['scene'], shottake=texts['shottake'], lognote=texts['lognote'], good=texts['good'])
+
+
+def _comments(tag):
+    texts = _child_texts(tag)
+    return _Comments(mastercomment1=texts['mastercomment1'], mastercomment2=texts['mastercomment2'],
+                     mastercomment3=texts['mastercomment3'], mastercomment4=texts['mastercomment4'])
+
+
 class Bin(Node):
+    __slots__ = ('uuid_', 'updatebehavior', 'name', 'childrens')
+
     def __init__(self, uuid_=None, updatebehavior='add', name='', childrens=None):
         if not uuid_:
             uuid_ = str(uuid.uuid4()).upper()
@@ -124,13 +314,17 @@ class Bin(Node):
         self.childrens.append(children)
 
 
-class _Timecode:
-    def __init__(self, rate=_Rate(), string='00:00:00:00', frame=0, displayformat='NDF',
+class _Timecode(_Tracked):
+    __slots__ = ('__rate', '__string', '__frame', '__displayformat', '__source', '__reel')
+    _known_tags = frozenset(('rate', 'string', 'frame', 'displayformat', 'source', 'reel'))
+
+    def __init__(self, rate=_Rate(ntsc=None), string='00:00:00:00', frame=0, displayformat='NDF',
                  source='source'):
+        # string and frame are converted with the timebase and the display format
         self.rate = rate
+        self.displayformat = displayformat
         self.string = string
         self.frame = frame
-        self.displayformat = displayformat
         self.source = source  #
         self.reel = None  #
 
@@ -176,6 +370,10 @@ class _Timecode:
     def source(self, source):
         self.__source = source
 
+    @property
+    def format(self):
+        return timecode_format(self.rate.timebase, self.rate.ntsc, self.displayformat)
+
     @property
     def reel(self):
         return self.__reel
@@ -186,33 +384,43 @@ class _Timecode:
 
     @classmethod
     def Timecode(cls, tag):
-        rate = _Rate(timebase=int(tag.find('rate').find('timebase').text))
-        string = tag.find('string').text
-        frame = tag.find('frame').text
-        displayformat = tag.find('displayformat').text
-        timecode = cls(rate, string, int(frame), displayformat)
-        if tag.find('source') is not None:
-            timecode.source = tag.find('source').text
-        if tag.find('reel') is not None:
-            timecode.reel = _Reel(tag.find('reel').find('name').text)
+        children = _children_by_tag(tag)
+        rate = _children_by_tag(children['rate'])
+        rate = _Rate(ntsc=_enum_text(rate['ntsc']) if 'ntsc' in rate else None, timebase=int(rate['timebase'].text))
+        displayformat = _enum_text(children['displayformat'])
+        timecode = cls(rate, children['string'].text, int(children['frame'].text), displayformat)
+        if 'source' in children:
+            timecode.source = children['source'].text
+        if 'reel' in children:
+            timecode.reel = _Reel(_child_texts(children['reel'])['name'])
+        timecode._track(tag)
 
         return timecode
 
+    def set_frame(self, frame: int, string: str = None):
+        """
+        Sets the frame, string is its HH:MM:SS:FF if it is already known
+        """
+        if string is None:
+            self.frame = frame
+        else:
+            self.__frame = frame
+            self.__string = string
+
     def __string_by_frame(self, frame: int):
-        time_base = self.rate.timebase
-        seconds, frames = divmod(frame, time_base)
-        minutes, seconds = divmod(seconds, 60)
-        hours, minutes = divmod(minutes, 60)
-        self.__string = f'{hours:02d}:{minutes:02d}:{seconds:02d}:{frames:02d}'
+        self.__string = frame_string(frame, self.format)
 
     def __frame_by_string(self, string: str):
-        time_base = self.rate.timebase
-        t = string.split(':')
-        self.__frame = ((int(t[0]) * 60 + int(t[1])) * 60 + int(t[2])) * time_base + int(t[3])
+        self.__frame = string_frame(string, self.format)
 
     def create_timecode_node(self):
+        if self._is_clean():
+            return deepcopy(self._source)
         timecode_node = etree.Element('timecode')
         rate = etree.SubElement(timecode_node, 'rate')
+        if self.rate.ntsc is not None:
+            ntsc = etree.SubElement(rate, 'ntsc')
+            ntsc.text = self.rate.ntsc
         timebase = etree.SubElement(rate, 'timebase')
         timebase.text = str(self.rate.timebase)
         string = etree.SubElement(timecode_node, 'string')
@@ -228,18 +436,27 @@ class _Timecode:
             name = etree.SubElement(reel, 'name')
             name.text = self.reel.name
 
+        _insert_unknown(timecode_node, self._unknown_children())
+
         return timecode_node
 
 
-class _Metadata:
+class _Metadata(_Tracked):
+    __slots__ = ('storage', 'key', 'size', 'type_', 'value')
+    _known_tags = frozenset(('storage', 'key', 'size', 'type', 'value'))
+
     def __init__(self, tag):
-        self.storage = tag.find('storage').text
-        self.key = tag.find('key').text
-        self.size = tag.find('size').text
-        self.type_ = tag.find('type').text
-        self.value = tag.find('value').text
+        texts = _child_texts(tag)
+        self.storage = texts['storage']
+        self.key = texts['key']
+        self.size = texts['size']
+        self.type_ = texts['type']
+        self.value = texts['value']
+        self._track(tag)
 
     def create_metadata_node(self):
+        if self._is_clean():
+            return deepcopy(self._source)
         metadata_node = etree.Element('metadata')
         storage = etree.SubElement(metadata_node, 'storage')
         storage.text = self.storage
@@ -252,10 +469,18 @@ class _Metadata:
         value = etree.SubElement(metadata_node, 'value')
         value.text = self.value
 
+        _insert_unknown(metadata_node, self._unknown_children())
+
         return metadata_node
 
 
-class _File:
+class _File(_Tracked):
+    __slots__ = ('id_', 'name', 'pathurl', 'rate', 'duration', '__metadatas', 'timecodes', '__medias',
+                 '__metadata_tags', '__media_tag')
+    _lazy_slots = ('__metadatas', '__medias', '__metadata_tags', '__media_tag')
+    _known_tags = frozenset(('name', 'pathurl', 'rate', 'duration', 'metadata', 'timecode', 'media'))
+    __repeated_tags = ('metadata', 'timecode')
+
     def __init__(self, id_):
         self.id_ = id_
         self.name = None
@@ -266,38 +491,86 @@ class _File:
         self.timecodes = None
         self.medias = None
 
+    @property
+    def metadatas(self):
+        if self.__metadata_tags is not None:
+            self.__metadatas = [_Metadata(metadata) for metadata in self.__metadata_tags]
+            self.__metadata_tags = None
+        return self.__metadatas
+
+    @metadatas.setter
+    def metadatas(self, metadatas):
+        self.__metadatas = metadatas
+        self.__metadata_tags = None
+        self._state = None
+
+    @property
+    def medias(self):
+        if self.__media_tag is not None:
+            self.__medias = self.__parse_medias(self.__media_tag)
+            self.__media_tag = None
+        return self.__medias
+
+    @medias.setter
+    def medias(self, medias):
+        self.__medias = medias
+        self.__media_tag = None
+        self._state = None
+
     @classmethod
-    def File(cls, tag):
+    def File(cls, tag, lazy=False):
         ret = cls(tag.get('id'))
-        if tag.find('name') is not None:
-            ret.name = tag.find('name').text
-        if tag.find('pathurl') is not None:
-            ret.pathurl = tag.find('pathurl').text
-        if tag.find('rate') is not None:
-            ret.rate = _Rate(timebase=int(tag.find('rate').find('timebase').text))
-        if tag.find('duration') is not None:
-            ret.duration = tag.find('duration').text
-        if tag.find('metadata') is not None:
-            ret.metadatas = []
-            for metadata in tag.findall('metadata'):
-                ret.metadatas.append(_Metadata(metadata))
-        if tag.find('timecode') is not None:
+        children = _children_by_tag(tag, cls.__repeated_tags)
+        if 'name' in children:
+            ret.name = children['name'].text
+        if 'pathurl' in children:
+            ret.pathurl = children['pathurl'].text
+        if 'rate' in children:
+            ret.rate = _Rate(timebase=int(_child_texts(children['rate'])['timebase']))
+        if 'duration' in children:
+            ret.duration = children['duration'].text
+        if children['metadata']:
+            if lazy:
+                ret.__metadata_tags = children['metadata']
+            else:
+                ret.metadatas = [_Metadata(metadata) for metadata in children['metadata']]
+        if children['timecode']:
             ret.timecodes = {}
-            for timecode in tag.findall('timecode'):
-                source = timecode.find('source').text
-                ret.timecodes.update({source: _Timecode.Timecode(timecode)})
-        if tag.find('media') is not None:
-            ret.medias = []
-            # ret.medias = {}
-            for media in tag.find('media').getchildren():
-                if media.tag == 'video':
-                    ret.medias.append(('video', _Video.Video(media)))
-                if media.tag == 'audio':
-                    ret.medias.append(('audio', _Audio.Audio(media)))
+            for timecode in children['timecode']:
+                timecode = _Timecode.Timecode(timecode)
+                ret.timecodes.update({timecode.source: timecode})
+        if 'media' in children:
+            if lazy:
+                ret.__media_tag = children['media']
+            else:
+                ret.medias = cls.__parse_medias(children['media'])
+        ret._track(tag)
 
         return ret
 
+    def _children(self):
+        # pending lazy tags are copied as they are
+        if self.__metadata_tags is None:
+            yield from self.__metadatas or ()
+        yield from (self.timecodes or {}).values()
+        if self.__media_tag is None:
+            yield from (media for _, media in self.__medias or ())
+
+    @staticmethod
+    def __parse_medias(tag):
+        medias = []
+        # medias = {}
+        for media in tag.getchildren():
+            if media.tag == 'video':
+                medias.append(('video', _Video.Video(media)))
+            if media.tag == 'audio':
+                medias.append(('audio', _Audio.Audio(media)))
+
+        return medias
+
     def create_file_node(self):
+        if self._is_clean():
+            return deepcopy(self._source)
         file_node = etree.Element('file')
         file_node.set('id', self.id_)
         if self.name is not None:
@@ -313,13 +586,18 @@ class _File:
         if self.duration is not None:
             duration = etree.SubElement(file_node, 'duration')
             duration.text = self.duration
-        if self.metadatas is not None:
+        if self.__metadata_tags is not None:
+            for metadata in self.__metadata_tags:
+                file_node.append(deepcopy(metadata))
+        elif self.metadatas is not None:
             for metadata in self.metadatas:
                 file_node.append(metadata.create_metadata_node())
         if self.timecodes is not None:
             for key in self.timecodes:
                 file_node.append(self.timecodes[key].create_timecode_node())
-        if self.medias is not None:
+        if self.__media_tag is not None:
+            file_node.append(deepcopy(self.__media_tag))
+        elif self.medias is not None:
             media_node = etree.SubElement(file_node, 'media')
             for media in self.medias:
                 if media[0] == 'video':
@@ -330,20 +608,29 @@ class _File:
             #     media_node.append(self.medias['video'].create_video_node())
             # if 'audio' in self.medias:
             #     media_node.append(self.medias['audio'].create_audio_node())
+        _insert_unknown(file_node, self._unknown_children())
 
         return file_node
 
 
-class _Link:
+class _Link(_Tracked):
+    __slots__ = ('linkclipref', 'mediatype', 'trackindex', 'clipindex', 'groupindex')
+    _known_tags = frozenset(('linkclipref', 'mediatype', 'trackindex', 'clipindex', 'groupindex'))
+
     def __init__(self, tag):
-        self.linkclipref = tag.find('linkclipref').text
-        self.mediatype = tag.find('mediatype').text
-        self.trackindex = int(tag.find('trackindex').text)
-        self.clipindex = int(tag.find('clipindex').text)
-        if tag.find('groupindex') is not None:
-            self.groupindex = int(tag.find('groupindex').text)
+        children = _children_by_tag(tag)
+        self.linkclipref = children['linkclipref'].text
+        self.mediatype = _enum_text(children['mediatype'])
+        self.trackindex = int(children['trackindex'].text)
+        self.clipindex = int(children['clipindex'].text)
+        self.groupindex = None
+        if 'groupindex' in children:
+            self.groupindex = int(children['groupindex'].text)
+        self._track(tag)
 
     def create_link_node(self):
+        if self._is_clean():
+            return deepcopy(self._source)
         link_node = etree.Element('link')
         linkclipref = etree.SubElement(link_node, 'linkclipref')
         linkclipref.text = self.linkclipref
@@ -353,14 +640,19 @@ class _Link:
         trackindex.text = str(self.trackindex)
         clipindex = etree.SubElement(link_node, 'clipindex')
         clipindex.text = str(self.clipindex)
-        if hasattr(self, 'groupindex'):
+        if self.groupindex is not None:
             groupindex = etree.SubElement(link_node, 'groupindex')
             groupindex.text = str(self.groupindex)
 
+        _insert_unknown(link_node, self._unknown_children())
+
         return link_node
 
 
-class _Effect:
+class _Effect(_Tracked):
+    __slots__ = ('name', 'effectid', 'effectcategory', 'effecttype', 'mediatype', 'parameter')
+    _known_tags = frozenset(('name', 'effectid', 'effectcategory', 'effecttype', 'mediatype', 'parameter'))
+
     def __init__(self, name, effectid, effectcategory, effecttype, mediatype, parameter):
         self.name = name
         self.effectid = effectid
@@ -371,20 +663,25 @@ class _Effect:
 
     @classmethod
     def Effect(cls, tag):
-        name = tag.find('name').text
-        effectid = tag.find('effectid').text
-        effectcategory = tag.find('effectcategory').text
-        effecttype = tag.find('effecttype').text
-        mediatype = tag.find('mediatype').text
-        parameter = _Parameter(name=tag.find('parameter').find('name').text,
-                               parameterid=tag.find('parameter').find('parameterid').text,
-                               valuemin=tag.find('parameter').find('valuemin').text,
-                               valuemax=tag.find('parameter').find('valuemax').text,
-                               value=tag.find('parameter').find('value').text)
-
-        return cls(name, effectid, effectcategory, effecttype, mediatype, parameter)
+        children = _children_by_tag(tag)
+        name = children['name'].text
+        effectid = children['effectid'].text
+        effectcategory = children['effectcategory'].text
+        effecttype = children['effecttype'].text
+        mediatype = children['mediatype'].text
+        parameter = _child_texts(children['parameter'])
+        parameter = _Parameter(name=parameter['name'], parameterid=parameter['parameterid'],
+                               valuemin=parameter['valuemin'], valuemax=parameter['valuemax'],
+                               value=parameter['value'])
+
+        ret = cls(name, effectid, effectcategory, effecttype, mediatype, parameter)
+        ret._track(tag)
+
+        return ret
 
     def create_effect_node(self):
+        if self._is_clean():
+            return deepcopy(self._source)
         effect_node = etree.Element('effect')
         name_effect = etree.SubElement(effect_node, 'name')
         name_effect.text = self.name
@@ -408,10 +705,15 @@ class _Effect:
         value = etree.SubElement(parameter, 'value')
         value.text = self.parameter.value
 
+        _insert_unknown(effect_node, self._unknown_children())
+
         return effect_node
 
 
-class _Filter:
+class _Filter(_Tracked):
+    __slots__ = ('effects',)
+    _known_tags = frozenset(('effect',))
+
     def __init__(self, effects):
         self.effects = effects
 
@@ -420,18 +722,36 @@ class _Filter:
         effects = []
         for effect in tag.findall('effect'):
             effects.append(_Effect.Effect(effect))
+        ret = cls(effects)
+        ret._track(tag)
 
-        return cls(effects)
+        return ret
+
+    def _children(self):
+        return self.effects
 
     def create_filter_node(self):
+        if self._is_clean():
+            return deepcopy(self._source)
         filter_node = etree.Element('filter')
         for effect in self.effects:
             filter_node.append(effect.create_effect_node())
 
+        _insert_unknown(filter_node, self._unknown_children())
+
         return filter_node
 
 
-class _Clipitem:
+class _Clipitem(_Tracked):
+    __slots__ = ('id_', 'name', 'duration', 'rate', 'in_', 'out', 'start', 'end', 'subframeoffset', 'pixelaspectratio',
+                 'anamorphic', 'alphatype', 'masterclipid', 'logginginfo', 'labels', 'comments', 'file', '__filters',
+                 'sourcetrack', 'links', 'fielddominance', 'itemhistory', 'syncoffset', '__filter_tags')
+    _lazy_slots = ('__filters', '__filter_tags')
+    _known_tags = frozenset(('name', 'duration', 'rate', 'in', 'out', 'start', 'end', 'subframeoffset',
+                             'pixelaspectratio', 'anamorphic', 'alphatype', 'masterclipid', 'logginginfo', 'labels',
+                             'comments', 'file', 'filter', 'sourcetrack', 'link', 'fielddominance', 'itemhistory'))
+    __repeated_tags = ('filter', 'link')
+
     def __init__(self, id_, name, duration, rate, in_, out, start, end, masterclipid, logginginfo, labels, comments,
                  file, filters, sourcetrack, links, itemhistory):
         self.id_ = id_
@@ -456,58 +776,62 @@ class _Clipitem:
         self.links = links
         self.fielddominance = None
         self.itemhistory = itemhistory
+        self.syncoffset = None
+
+    @property
+    def filters(self):
+        if self.__filter_tags is not None:
+            self.__filters = [_Filter.Filter(filter_) for filter_ in self.__filter_tags]
+            self.__filter_tags = None
+        return self.__filters
+
+    @filters.setter
+    def filters(self, filters):
+        self.__filters = filters
+        self.__filter_tags = None
+        self._state = None
 
     @classmethod
-    def Clipitem(cls, tag):
+    def Clipitem(cls, tag, lazy=False):
         id_ = tag.get('id')
-        name = tag.find('name').text
-        duration = tag.find('duration').text
-        rate = _Rate(ntsc=tag.find('rate').find('ntsc').text,
-                     timebase=tag.find('rate').find('timebase').text)
-        in_ = tag.find('in').text
-        out = tag.find('out').text
-        start = tag.find('start').text
-        end = tag.find('end').text
-        masterclipid = tag.find('masterclipid').text
-        logginginfo = _LoggingInfo(scene=tag.find('logginginfo').find('scene').text,
-                                   shottake=tag.find('logginginfo').find('shottake').text,
-                                   lognote=tag.find('logginginfo').find('lognote').text,
-                                   good=tag.find('logginginfo').find('good').text)
-        labels = _Labels(label2=tag.find('labels').find('label2').text)
-        comments = _Comments(mastercomment1=tag.find('comments').find('mastercomment1').text,
-                             mastercomment2=tag.find('comments').find('mastercomment2').text,
-                             mastercomment3=tag.find('comments').find('mastercomment3').text,
-                             mastercomment4=tag.find('comments').find('mastercomment4').text)
-        file = _File.File(tag.find('file'))
-        filters = []
-        for filter_ in tag.findall('filter'):
-            filters.append(_Filter.Filter(filter_))
-        trackindex = ''
-        if tag.find('sourcetrack').find('trackindex') is not None:
-            trackindex = tag.find('sourcetrack').find('trackindex').text
-        sourcetrack = _SourceTrack(mediatype=tag.find('sourcetrack').find('mediatype').text,
-                                   trackindex=trackindex)
-        links = []
-        for link in tag.findall('link'):
-            links.append(_Link(link))
-        itemhistory = _ItemHistory(uuid_=tag.find('itemhistory').find('uuid').text)
-
-        ret = cls(id_, name, int(duration), rate, int(in_), int(out), int(start), int(end), masterclipid, logginginfo,
-                  labels, comments, file, filters, sourcetrack, links, itemhistory)
-        if tag.find('subframeoffset') is not None:
-            ret.subframeoffset = int(tag.find('subframeoffset').text)
-        if tag.find('pixelaspectratio') is not None:
-            ret.pixelaspectratio = tag.find('pixelaspectratio').text
-        if tag.find('anamorphic') is not None:
-            ret.anamorphic = tag.find('anamorphic').text
-        if tag.find('alphatype') is not None:
-            ret.alphatype = tag.find('alphatype').text
-        if tag.find('fielddominance') is not None:
-            ret.fielddominance = tag.find('fielddominance').text
+        children = _children_by_tag(tag, cls.__repeated_tags)
+        texts = {name: child.text for name, child in children.items() if name not in cls.__repeated_tags}
+        rate = _children_by_tag(children['rate'])
+        rate = _Rate(ntsc=_enum_text(rate['ntsc']), timebase=_enum_text(rate['timebase']))
+        logginginfo = _logging_info(children['logginginfo'])
+        labels = _Labels(label2=_child_texts(children['labels'])['label2'])
+        comments = _comments(children['comments'])
+        file = _File.File(children['file'], lazy)
+        filters = [] if lazy else [_Filter.Filter(filter_) for filter_ in children['filter']]
+        sourcetrack = _children_by_tag(children['sourcetrack'])
+        trackindex = sourcetrack['trackindex'].text if 'trackindex' in sourcetrack else ''
+        sourcetrack = _SourceTrack(mediatype=_enum_text(sourcetrack['mediatype']), trackindex=trackindex)
+        links = [_Link(link) for link in children['link']]
+        itemhistory = _ItemHistory(uuid_=_child_texts(children['itemhistory'])['uuid'])
+
+        ret = cls(id_, texts['name'], int(texts['duration']), rate, int(texts['in']), int(texts['out']),
+                  int(texts['start']), int(texts['end']), texts['masterclipid'], logginginfo, labels, comments, file,
+                  filters, sourcetrack, links, itemhistory)
+        if 'subframeoffset' in texts:
+            ret.subframeoffset = int(texts['subframeoffset'])
+        for name in ('pixelaspectratio', 'anamorphic', 'alphatype', 'fielddominance'):
+            if name in texts:
+                setattr(ret, name, texts[name])
+        if lazy:
+            ret.__filter_tags = children['filter']
+        ret._track(tag)
 
         return ret
 
+    def _children(self):
+        yield self.file
+        yield from self.links
+        if self.__filter_tags is None:
+            yield from self.__filters
+
     def create_clipitem_node(self):
+        if self._is_clean():
+            return deepcopy(self._source)
         clipitem_node = etree.Element('clipitem')
         clipitem_node.set('id', self.id_)
         name = etree.SubElement(clipitem_node, 'name')
@@ -563,8 +887,12 @@ class _Clipitem:
         mastercomment4 = etree.SubElement(comments, 'mastercomment4')
         mastercomment4.text = self.comments.mastercomment4
         clipitem_node.append(self.file.create_file_node())
-        for filter_ in self.filters:
-            clipitem_node.append(filter_.create_filter_node())
+        if self.__filter_tags is not None:
+            for filter_ in self.__filter_tags:
+                clipitem_node.append(deepcopy(filter_))
+        else:
+            for filter_ in self.filters:
+                clipitem_node.append(filter_.create_filter_node())
         if self.sourcetrack is not None:
             sourcetrack = etree.SubElement(clipitem_node, 'sourcetrack')
             mediatype = etree.SubElement(sourcetrack, 'mediatype')
@@ -580,17 +908,28 @@ class _Clipitem:
         itemhistory = etree.SubElement(clipitem_node, 'itemhistory')
         uuid_ = etree.SubElement(itemhistory, 'uuid')
         uuid_.text = self.itemhistory.uuid_
+        _insert_unknown(clipitem_node, self._unknown_children())
 
         return clipitem_node
 
 
-class _Track:
-    def __init__(self, tag):
-        self.clipitem = _Clipitem.Clipitem(tag.find('clipitem'))
-        self.enabled = tag.find('enabled').text
-        self.locked = tag.find('locked').text
+class _Track(_Tracked):
+    __slots__ = ('clipitem', 'enabled', 'locked')
+    _known_tags = frozenset(('clipitem', 'enabled', 'locked'))
+
+    def __init__(self, tag, lazy=False):
+        children = _children_by_tag(tag)
+        self.clipitem = _Clipitem.Clipitem(children['clipitem'], lazy)
+        self.enabled = _enum_text(children['enabled'])
+        self.locked = _enum_text(children['locked'])
+        self._track(tag)
+
+    def _children(self):
+        return self.clipitem,
 
     def create_track_node(self):
+        if self._is_clean():
+            return deepcopy(self._source)
         track_node = etree.Element('track')
         track_node.append(self.clipitem.create_clipitem_node())
         enabled_node = etree.SubElement(track_node, 'enabled')
@@ -598,30 +937,42 @@ class _Track:
         locked_node = etree.SubElement(track_node, 'locked')
         locked_node.text = self.locked
 
+        _insert_unknown(track_node, self._unknown_children())
+
         return track_node
 
 
-class _Video(_Tag):
+class _Video(_Tracked, _Tag):
+    __slots__ = ('track', 'duration', 'samplecharacteristics')
+    _known_tags = frozenset(('track', 'duration', 'samplecharacteristics'))
+
     def __init__(self):
         self.track = None
         self.duration = None
         self.samplecharacteristics = None
 
     @classmethod
-    def Video(cls, tag):
+    def Video(cls, tag, lazy=False):
         ret = cls()
-        if tag.find('track') is not None:
-            ret.track = _Track(tag.find('track'))
-        if tag.find('duration') is not None:
-            ret.duration = int(tag.find('duration').text)
-        if tag.find('samplecharacteristics') is not None:
-            ret.samplecharacteristics \
-                = _SampleCharacteristics(width=tag.find('samplecharacteristics').find('width').text,
-                                         height=tag.find('samplecharacteristics').find('height').text)
+        children = _children_by_tag(tag)
+        if 'track' in children:
+            ret.track = _Track(children['track'], lazy)
+        if 'duration' in children:
+            ret.duration = int(children['duration'].text)
+        if 'samplecharacteristics' in children:
+            samplecharacteristics = _child_texts(children['samplecharacteristics'])
+            ret.samplecharacteristics = _SampleCharacteristics(width=samplecharacteristics['width'],
+                                                               height=samplecharacteristics['height'])
+        ret._track(tag)
 
         return ret
 
+    def _children(self):
+        return () if self.track is None else (self.track,)
+
     def create_video_node(self):
+        if self._is_clean():
+            return deepcopy(self._source)
         video_node = etree.Element('video')
         if self.track is not None:
             video_node.append(self.track.create_track_node())
@@ -635,10 +986,17 @@ class _Video(_Tag):
             height = etree.SubElement(samplecharacteristics, 'height')
             height.text = self.samplecharacteristics.height
 
+        _insert_unknown(video_node, self._unknown_children())
+
         return video_node
 
 
-class _Audio(_Tag):
+class _Audio(_Tracked, _Tag):
+    __slots__ = ('in_', 'out', '__tracks', 'samplecharacteristics', 'channelcount', '__filter_', '__track_tags',
+                 '__first_track')
+    _lazy_slots = ('__tracks', '__track_tags', '__first_track')
+    _known_tags = frozenset(('in', 'out', 'track', 'samplecharacteristics', 'channelcount'))
+
     def __init__(self):
         self.in_ = None
         self.out = None
@@ -648,27 +1006,56 @@ class _Audio(_Tag):
         self.__filter_ = None
 
     @classmethod
-    def Audio(cls, tag):
+    def Audio(cls, tag, lazy=False):
         ret = cls()
-        if tag.find('in') is not None:
-            ret.in_ = int(tag.find('in').text)
-        if tag.find('out') is not None:
-            ret.out = int(tag.find('out').text)
-        if tag.find('track') is not None:
-            ret.tracks = []
-            for track in tag.findall('track'):
-                ret.tracks.append(_Track(track))
-        if tag.find('samplecharacteristics') is not None:
-            ret.samplecharacteristics \
-                = _SampleCharacteristics(samplerate=tag.find('samplecharacteristics').find('samplerate').text,
-                                         depth=tag.find('samplecharacteristics').find('depth').text)
-        if tag.find('channelcount') is not None:
-            ret.channelcount = int(tag.find('channelcount').text)
+        children = _children_by_tag(tag, ('track',))
+        if 'in' in children:
+            ret.in_ = int(children['in'].text)
+        if 'out' in children:
+            ret.out = int(children['out'].text)
+        if children['track']:
+            if lazy:
+                ret.__track_tags = children['track']
+            else:
+                ret.tracks = [_Track(track, lazy) for track in children['track']]
+        if 'samplecharacteristics' in children:
+            samplecharacteristics = _child_texts(children['samplecharacteristics'])
+            ret.samplecharacteristics = _SampleCharacteristics(samplerate=samplecharacteristics['samplerate'],
+                                                               depth=samplecharacteristics['depth'])
+        if 'channelcount' in children:
+            ret.channelcount = int(children['channelcount'].text)
+        ret._track(tag)
 
         return ret
 
+    def _children(self):
+        if self.__track_tags is not None:
+            return () if self.__first_track is None else (self.__first_track,)
+        return self.__tracks or ()
+
+    @property
+    def tracks(self):
+        if self.__track_tags is not None:
+            first_track = self.track
+            self.__tracks = [first_track] + [_Track(track, lazy=True) for track in self.__track_tags[1:]]
+            self.__track_tags = None
+            self.__first_track = None
+        return self.__tracks
+
+    @tracks.setter
+    def tracks(self, tracks):
+        self.__tracks = tracks
+        self.__track_tags = None
+        self.__first_track = None
+        self._state = None
+
     @property
     def track(self):
+        if self.__track_tags is not None:
+            # the main track is enough for timecodes, the other ones are parsed with tracks
+            if self.__first_track is None:
+                self.__first_track = _Track(self.__track_tags[0], lazy=True)
+            return self.__first_track
         return self.tracks[0]
 
     @property
@@ -680,6 +1067,8 @@ class _Audio(_Tag):
         self.__filter_ = filter_
 
     def create_audio_node(self):
+        if self._is_clean():
+            return deepcopy(self._source)
         audio_node = etree.Element('audio')
         if self.in_ is not None:
             in_node = etree.SubElement(audio_node, 'in')
@@ -687,7 +1076,13 @@ class _Audio(_Tag):
         if self.out is not None:
             out_node = etree.SubElement(audio_node, 'out')
             out_node.text = f'{self.out}'
-        if self.tracks is not None:
+        if self.__track_tags is not None:
+            for idx, track in enumerate(self.__track_tags):
+                if idx == 0 and self.__first_track is not None:
+                    audio_node.append(self.__first_track.create_track_node())
+                else:
+                    audio_node.append(deepcopy(track))
+        elif self.tracks is not None:
             for track in self.tracks:
                 audio_node.append(track.create_track_node())
         if self.samplecharacteristics is not None:
@@ -700,11 +1095,30 @@ class _Audio(_Tag):
             channelcount = etree.SubElement(audio_node, 'channelcount')
             channelcount.text = f'{self.channelcount}'
 
+        _insert_unknown(audio_node, self._unknown_children())
+
         return audio_node
 
 
 class Clip(Node):
+    __slots__ = ('__id_', '__uuid_', '__updatebehavior', '__name', '__duration', '__rate', '__in_', '__out',
+                 '__masterclipid', '__ismasterclip', '__logginginfo', '__labels', '__comments', '__medias',
+                 '__media_tag', '__scene_key', '__series_scene', '__shottake_key', '__shot_take',
+                 '__unknown')
+    _known_tags = frozenset(('uuid', 'updatebehavior', 'name', 'duration', 'rate', 'in', 'out', 'masterclipid',
+                             'ismasterclip', 'logginginfo', 'labels', 'comments', 'media'))
+    __series_scene_delimiter = '.'
+    __shot_take_delimiter = '_'
+    __scene_shot_delimiter = '_'
+
     def __init__(self, name, duration, rate):
+        # series, scene, shot and take are parsed once, the keys are the logginginfo strings they were parsed from
+        self.__scene_key = None
+        self.__series_scene = None
+        self.__shottake_key = None
+        self.__shot_take = None
+        # children of the parsed clip the model does not parse, with their anchors, see _insert_unknown
+        self.__unknown = ()
         self.id_ = None
         self.uuid_ = None
         self.updatebehavior = None
@@ -719,39 +1133,30 @@ class Clip(Node):
         self.labels = None
         self.comments = None
         self.medias = None
-        self.__series_scene_delimiter = '.'
-        self.__shot_take_delimiter = '_'
-        self.__scene_shot_delimiter = '_'
 
     @classmethod
-    def Clip(cls, clip):
+    def Clip(cls, clip, lazy=False):
+        """
+        lazy - keep the media element and parse it on the first access to medias.
+        Filters, metadata and file media inside it stay elements until they are read,
+        untouched ones are written back as they were
+        """
         id_ = clip.get('id')
-        uuid_ = clip.find('uuid').text
-        updatebehavior = clip.find('updatebehavior').text
-        name = clip.find('name').text
-        duration = clip.find('duration').text
-        rate = _Rate(ntsc=clip.find('rate').find('ntsc').text,
-                     timebase=clip.find('rate').find('timebase').text)
-        in_ = clip.find('in').text
-        out = clip.find('out').text
-        masterclipid = clip.find('masterclipid').text
-        ismasterclip = clip.find('ismasterclip').text
-        logginginfo = _LoggingInfo(scene=clip.find('logginginfo').find('scene').text,
-                                   shottake=clip.find('logginginfo').find('shottake').text,
-                                   lognote=clip.find('logginginfo').find('lognote').text,
-                                   good=clip.find('logginginfo').find('good').text)
-        labels = _Labels(label2=clip.find('labels').find('label2').text)
-        comments = _Comments(mastercomment1=clip.find('comments').find('mastercomment1').text,
-                             mastercomment2=clip.find('comments').find('mastercomment2').text,
-                             mastercomment3=clip.find('comments').find('mastercomment3').text,
-                             mastercomment4=clip.find('comments').find('mastercomment4').text)
-        medias = {}
-        children = clip.find('media').getchildren()
-        for media in children:
-            if media.tag == 'video':
-                medias.update({'video': _Video.Video(media)})
-            if media.tag == 'audio':
-                medias.update({'audio': _Audio.Audio(media)})
+        children = _children_by_tag(clip)
+        uuid_ = children['uuid'].text
+        updatebehavior = children['updatebehavior'].text
+        name = children['name'].text
+        duration = children['duration'].text
+        rate = _children_by_tag(children['rate'])
+        rate = _Rate(ntsc=_enum_text(rate['ntsc']), timebase=_enum_text(rate['timebase']))
+        in_ = children['in'].text
+        out = children['out'].text
+        masterclipid = children['masterclipid'].text
+        ismasterclip = children['ismasterclip'].text
+        logginginfo = _logging_info(children['logginginfo'])
+        labels = _Labels(label2=_child_texts(children['labels'])['label2'])
+        comments = _comments(children['comments'])
+        medias = None if lazy else cls.__parse_medias(children['media'])
         # ret.medias = []
         # # ret.medias = {}
         # for media in tag.find('media').getchildren():
@@ -772,9 +1177,23 @@ class Clip(Node):
         ret.labels = labels
         ret.comments = comments
         ret.medias = medias
+        if lazy:
+            ret.__media_tag = children['media']
+        ret.__unknown = _unknown_children(clip, cls._known_tags)
 
         return ret
 
+    @staticmethod
+    def __parse_medias(tag, lazy=False):
+        medias = {}
+        for media in tag.getchildren():
+            if media.tag == 'video':
+                medias.update({'video': _Video.Video(media, lazy)})
+            if media.tag == 'audio':
+                medias.update({'audio': _Audio.Audio(media, lazy)})
+
+        return medias
+
     @property
     def id_(self):
         return self.__id_
@@ -885,64 +1304,97 @@ class Clip(Node):
 
     @property
     def medias(self):
+        if self.__media_tag is not None:
+            self.__medias = self.__parse_medias(self.__media_tag, lazy=True)
+            self.__media_tag = None
         return self.__medias
 
     @medias.setter
     def medias(self, medias):
         self.__medias = medias
+        self.__media_tag = None
 
     @property
     def file_name(self):
         media = self.get_main_media()
         return media.track.clipitem.file.name
 
+    @property
+    def file_path(self):
+        """
+        Local path of the media file from its pathurl (file://localhost/Volumes/...), None without one
+        """
+        pathurl = self.get_main_media().track.clipitem.file.pathurl
+        if not pathurl:
+            return None
+        return pathurl_path(pathurl)
+
     @property
     def series(self):
-        return self.get_log()[0].split(self.__series_scene_delimiter)[0]
+        return self.__get_series_scene()[0]
 
     @series.setter
     def series(self, series):
-        self.logginginfo.scene = f'{series}{self.__series_scene_delimiter}{self.scene}'
+        self.__set_series_scene(series, self.scene)
 
     @property
     def scene(self):
-        logginginfo_scene_split = self.get_log()[0].split(self.__series_scene_delimiter)
-        len_first_element = len(logginginfo_scene_split[0])
-        len_delimiter = len(self.__series_scene_delimiter)
-        return self.get_log()[0][len_first_element + len_delimiter:]
+        return self.__get_series_scene()[1]
 
     @scene.setter
     def scene(self, scene):
-        self.logginginfo.scene = f'{self.series}{self.__series_scene_delimiter}{scene}'
+        self.__set_series_scene(self.series, scene)
 
     @property
     def shot(self):
-        return self.get_log()[1].split(self.__shot_take_delimiter)[0]
+        return self.__get_shot_take()[0]
 
     @shot.setter
     def shot(self, shot):
-        self.logginginfo.shottake = f'{shot}{self.__shot_take_delimiter}{self.take}'
+        self.__set_shot_take(shot, self.take)
 
     @property
     def take(self):
-        logginginfo_shottake_split = self.get_log()[1].split(self.__shot_take_delimiter)
-        len_first_element = len(logginginfo_shottake_split[0])
-        len_delimiter = len(self.__shot_take_delimiter)
-        return self.get_log()[1][len_first_element + len_delimiter:]
+        return self.__get_shot_take()[1]
 
     @take.setter
     def take(self, take):
-        self.logginginfo.shottake = f'{self.shot}{self.__shot_take_delimiter}{take}'
+        self.__set_shot_take(self.shot, take)
+
+    def __get_series_scene(self):
+        log_scene = self.logginginfo.scene or ''
+        if log_scene != self.__scene_key:
+            self.__series_scene = _split_first(log_scene, self.__series_scene_delimiter)
+            self.__scene_key = log_scene
+        return self.__series_scene
+
+    def __set_series_scene(self, series, scene):
+        series, scene = f'{series}', f'{scene}'
+        log_scene = f'{series}{self.__series_scene_delimiter}{scene}'
+        self.logginginfo.scene = log_scene
+        # it splits back into the same fields unless series has the delimiter
+        if self.__series_scene_delimiter not in series:
+            self.__series_scene = (series, scene)
+            self.__scene_key = log_scene
+
+    def __get_shot_take(self):
+        log_shottake = self.logginginfo.shottake or ''
+        if log_shottake != self.__shottake_key:
+            self.__shot_take = _split_first(log_shottake, self.__shot_take_delimiter)
+            self.__shottake_key = log_shottake
+        return self.__shot_take
+
+    def __set_shot_take(self, shot, take):
+        shot, take = f'{shot}', f'{take}'
+        log_shottake = f'{shot}{self.__shot_take_delimiter}{take}'
+        self.logginginfo.shottake = log_shottake
+        if self.__shot_take_delimiter not in shot:
+            self.__shot_take = (shot, take)
+            self.__shottake_key = log_shottake
 
     @property
     def first_aux_frame(self):
-        # ret = self.get_timecode_frame('aux1') if self.get_timecode_frame('aux1') else 0
-        # if self.get_timecode_frame('aux1'):
-        #     ret = self.get_timecode_frame('aux1')
-        # else:
-        #     ret = 0
-        # return ret
-        return self.get_timecode_frame('aux1') if self.get_timecode_frame('aux1') else 0
+        return self.get_timecode_frame('aux1') or 0
 
     @property
     def last_aux_frame(self):
@@ -952,38 +1404,40 @@ class Clip(Node):
         return f'id = {self.id_}, series = {self.series}, scene = {self.scene}, shot = {self.shot}, take = {self.take}'
 
     def get_timecode_frame(self, timecode_source):
-        media = self.get_main_media()
-        timecodes = media.track.clipitem.file.timecodes
-        if not timecodes:
-            return None
+        # read from the timecode itself, its frame is also set in place (set_frame)
+        timecode = (self.get_main_media().track.clipitem.file.timecodes or {}).get(timecode_source)
+        return None if timecode is None else timecode.frame
 
-        # if hasattr(media, 'track'):
-        #     track = media.track
-        # else:
-        #     track = media.tracks[0]
-        return timecodes[timecode_source].frame if timecode_source in timecodes else None
+    def get_timecode_format(self, timecode_source):
+        timecodes = self.get_main_media().track.clipitem.file.timecodes
+        if not timecodes or timecode_source not in timecodes:
+            return DEFAULT_FORMAT
+        return timecodes[timecode_source].format
 
     def is_video(self):
         return self.get_main_media().get_tag() == 'video'
 
     def remove_timecode(self, timecode_source):
-        media = self.get_main_media()
-        if media.track.clipitem.file.timecodes:
-            media.track.clipitem.file.timecodes.pop(timecode_source, None)
-
-    def insert_timecode(self, frame, timecode_source, reel_name=None):
-        timecode = _Timecode()
-        timecode.frame = frame
+        file = self.get_main_media().track.clipitem.file
+        if file.timecodes and timecode_source in file.timecodes:
+            file.timecodes = {source: timecode for source, timecode in file.timecodes.items()
+                              if source != timecode_source}
+
+    def insert_timecode(self, frame, timecode_source, reel_name=None, string=None):
+        """
+        The new timecode counts like the source one, 25 fps NDF without it
+        """
+        source = (self.get_main_media().track.clipitem.file.timecodes or {}).get('source')
+        timecode = _Timecode() if source is None else _Timecode(source.rate, displayformat=source.displayformat)
+        timecode.set_frame(frame, string)
         timecode.source = timecode_source
         if reel_name:
             if timecode.reel is None:
                 timecode.reel = _Reel()
             timecode.reel.name = reel_name
 
-        media = self.get_main_media()
-        if not media.track.clipitem.file.timecodes:
-            media.track.clipitem.file.timecodes = {}
-        media.track.clipitem.file.timecodes.update({timecode_source: timecode})
+        file = self.get_main_media().track.clipitem.file
+        file.timecodes = {**(file.timecodes or {}), timecode_source: timecode}
 
     def get_log(self):
         log_scene = ''
@@ -1039,11 +1493,14 @@ class Clip(Node):
         mastercomment3.text = self.comments.mastercomment3
         mastercomment4 = etree.SubElement(comments, 'mastercomment4')
         mastercomment4.text = self.comments.mastercomment4
-        media_node = etree.SubElement(clip_node, 'media')
-        if 'video' in self.medias:
-            media_node.append(self.medias['video'].create_video_node())
-        if 'audio' in self.medias:
-            media_node.append(self.medias['audio'].create_audio_node())
+        if self.__media_tag is not None:
+            clip_node.append(deepcopy(self.__media_tag))
+        else:
+            media_node = etree.SubElement(clip_node, 'media')
+            if 'video' in self.medias:
+                media_node.append(self.medias['video'].create_video_node())
+            if 'audio' in self.medias:
+                media_node.append(self.medias['audio'].create_audio_node())
         # if self.medias is not None:
         #     media_node = etree.SubElement(file_node, 'media')
         #     for media in self.medias:
@@ -1051,9 +1508,20 @@ class Clip(Node):
         #             media_node.append(media[1].create_video_node())
         #         if media[0] == 'audio':
         #             media_node.append(media[1].create_audio_node())
+        _insert_unknown(clip_node, self.__unknown)
 
         return clip_node
 
+    def drop_sources(self):
+        """
+        Forgets the parsed elements, every node is built field by field again.
+        Used by streaming, where the elements would keep the whole document in memory.
+        The children the model does not parse are copied out of them first
+        """
+        self.__unknown = [(anchor, deepcopy(child)) for anchor, child in self.__unknown]
+        for media in (self.__medias or {}).values():
+            media._drop_source()
+
     def get_main_media(self):
         if 'video' in self.medias:
             return self.medias['video']
@@ -1092,6 +1560,8 @@ class Clip(Node):
 
 
 class MergedClip(Clip):
+    __slots__ = ()
+
     def add_video_media(self, clip, offset):
         if not self.medias:
             self.medias = {}
@@ -1140,8 +1610,6 @@ class MergedClip(Clip):
                 track.clipitem.syncoffset = offset
             track.clipitem.subframeoffset = 0
             track.clipitem.masterclipid = self.name
-            track.enable = 'TRUE'
-            track.enable = 'FALSE'
         media = _Audio()
         media.in_ = -1
         media.out = -1
@@ -0,0 +1,76 @@
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Sequence, Tuple
+
+Interval = Tuple[int, int]
+
+
+class IntervalIndex:
+    """
+    Closed intervals [first, last] indexed for "which interval with the biggest position overlaps"
+    queries. Queries are answered in one sweep over the interval starts with a Fenwick tree of
+    maxima over the interval ends, O(log n) each.
+
+    With frames_per_day the frames are on a clock: intervals and queries are taken modulo the day,
+    one running past midnight is split in two and overlaps the ones just after 00:00:00:00.
+    Without it frames are compared as they are
+    """
+
+    def __init__(self, intervals: Sequence[Interval], frames_per_day: Optional[int] = None):
+        self.intervals = list(intervals)
+        self.frames_per_day = frames_per_day
+        # pieces of the intervals on the day, each knows the position of its interval
+        self.__pieces = [(first, last, idx) for idx, interval in enumerate(self.intervals)
+                         for first, last in self.__split(interval)]
+        self.__order_by_first = sorted(range(len(self.__pieces)), key=lambda piece: self.__pieces[piece][0])
+        self.__firsts = [self.__pieces[piece][0] for piece in self.__order_by_first]
+        self.__lasts = sorted({last for _, last, _ in self.__pieces})
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def __split(self, interval: Interval) -> List[Interval]:
+        first, last = interval
+        if self.frames_per_day is None:
+            return [interval]
+        if last - first >= self.frames_per_day - 1:
+            return [(0, self.frames_per_day - 1)]
+        first %= self.frames_per_day
+        last = first + interval[1] - interval[0]
+        if last < self.frames_per_day:
+            return [(first, last)]
+        return [(first, self.frames_per_day - 1), (0, last - self.frames_per_day)]
+
+    def last_overlapping(self, queries: Sequence[Interval]) -> List[Optional[int]]:
+        """
+        For every query the position of the last interval overlapping it, None if there is none
+        """
+        result: List[Optional[int]] = [None] * len(queries)
+        if not self.intervals:
+            return result
+        query_pieces = [(first, last, idx) for idx, query in enumerate(queries) for first, last in self.__split(query)]
+
+        # Fenwick tree over the interval ends in descending order: a prefix is "last >= frame"
+        size = len(self.__lasts)
+        tree = [-1] * (size + 1)
+        inserted = 0
+        for first, last, query_idx in sorted(query_pieces, key=lambda piece: piece[1]):
+            stop = bisect_right(self.__firsts, last, lo=inserted)
+            for piece in self.__order_by_first[inserted:stop]:
+                _, piece_last, idx = self.__pieces[piece]
+                rank = size - bisect_left(self.__lasts, piece_last)
+                while rank <= size:
+                    if tree[rank] < idx:
+                        tree[rank] = idx
+                    rank += rank & -rank
+            inserted = stop
+
+            rank = size - bisect_left(self.__lasts, first)
+            found = -1
+            while rank > 0:
+                if tree[rank] > found:
+                    found = tree[rank]
+                rank -= rank & -rank
+            if found != -1 and (result[query_idx] is None or found > result[query_idx]):
+                result[query_idx] = found
+
+        return result
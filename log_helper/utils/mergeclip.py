@@ -1,8 +1,58 @@
 import uuid
+from collections import Counter
+from typing import List, NamedTuple, Tuple
 
+from log_helper.utils.clip_table import ClipRows, ClipTable
 from log_helper.utils.fcpxml import MergedClip, Clip
 
 
+class MergePlan(NamedTuple):
+    pairs: List[Tuple[Clip, Clip]]
+    unmatched_video: List[Clip]
+    unmatched_audio: List[Clip]
+    multiple_matches: List[Clip]
+
+
+def plan_merge(clip_list: ClipRows) -> MergePlan:
+    """
+    Pairs video and audio clips with the same shot and take.
+    Pairs keep the order of the nested video x audio loop
+    """
+    table = clip_list if isinstance(clip_list, ClipTable) else ClipTable(clip_list)
+    video_clips = []
+    audio_by_key = {}
+    for row, clip in enumerate(table.clips):
+        key = (table.shot[row], table.take[row])
+        if table.is_video[row]:
+            video_clips.append((clip, key))
+        else:
+            audio_by_key.setdefault(key, []).append(clip)
+
+    pairs = []
+    unmatched_video = []
+    multiple_matches = []
+    audio_match_count = Counter()
+    for video_clip, key in video_clips:
+        audio_clips = audio_by_key.get(key, [])
+        if not audio_clips:
+            unmatched_video.append(video_clip)
+        elif len(audio_clips) > 1:
+            multiple_matches.append(video_clip)
+        for audio_clip in audio_clips:
+            pairs.append((video_clip, audio_clip))
+            audio_match_count[id(audio_clip)] += 1
+
+    unmatched_audio = []
+    for audio_clips in audio_by_key.values():
+        for audio_clip in audio_clips:
+            if not audio_match_count[id(audio_clip)]:
+                unmatched_audio.append(audio_clip)
+            elif audio_match_count[id(audio_clip)] > 1:
+                multiple_matches.append(audio_clip)
+
+    return MergePlan(pairs, unmatched_video, unmatched_audio, multiple_matches)
+
+
 def merge(video_clip: Clip, audio_clip: Clip):
     merge_name = get_merge_name(video_clip)
     duration = calculate_merge_duration(video_clip, audio_clip)
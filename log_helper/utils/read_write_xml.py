@@ -1,10 +1,17 @@
-from typing import List
+import gzip
+import os
+import sys
+from contextlib import contextmanager, suppress
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple, Union
 
 from lxml import etree
 from lxml.etree import _Element
 
-from log_helper.config import OUTPUT_PATH
+from log_helper.config import OUTPUT_PATH, OUTPUT_SUFFIX
 from log_helper.log_helper import WorkArguments
+from log_helper.utils.fcpxml import Clip, Node
+
+STDOUT = '-'
 
 
 def get_bin_list(arguments: WorkArguments) -> List[_Element]:
@@ -13,11 +20,153 @@ def get_bin_list(arguments: WorkArguments) -> List[_Element]:
     return root.findall('bin') if arguments.batch else [root]
 
 
-def write_xml(items: List) -> None:
-    xml = etree.Element('xmeml', version="5")
-    for item in items:
-        for node in item:
-            xml.append(node.create_node())
-    xml_file = etree.ElementTree(xml)
-    xml_file.write(OUTPUT_PATH, pretty_print=True, xml_declaration=True,
-                   encoding="utf-8", doctype="<!DOCTYPE xmeml>")
+def iter_clip_batches(arguments: WorkArguments) -> Iterator[Tuple[List[str], List[Clip]]]:
+    """
+    Streaming counterpart of get_bin_list: yields (bin names, clips) for every batch.
+    Each <clip> is handed to Clip.Clip as soon as it is parsed and then dropped from the tree, a bin when its name
+    is read, the elements before them (sequences, other top level elements) as soon as they are parsed.
+    Only the object model of the current batch stays in memory: with --batch one bin, without it every Clip
+    of the file, as the whole file is one batch
+    """
+    bin_list_from_xml = []
+    clip_list = []
+    open_bins = []
+    context = etree.iterparse(arguments.file, events=('start', 'end'), tag=('bin', 'clip'))
+    for event, element in context:
+        if element.tag == 'bin':
+            if event == 'start':
+                # names are known only at the end event, keep document order like root.iter('bin')
+                open_bins.append(len(bin_list_from_xml))
+                bin_list_from_xml.append(None)
+                _drop_previous_siblings(element)
+                continue
+            bin_list_from_xml[open_bins.pop()] = element.find('name').text
+            top_level = element.getparent().getparent() is None
+            _drop_element(element)
+            if arguments.batch and top_level:
+                yield bin_list_from_xml, clip_list
+                bin_list_from_xml = []
+                clip_list = []
+        elif event == 'end':
+            if open_bins or not arguments.batch:
+                clip = Clip.Clip(element, arguments.lazy)
+                clip.drop_sources()
+                clip_list.append(clip)
+            _drop_element(element)
+
+    # top level elements after the last bin or clip
+    if context.root is not None:
+        context.root.clear()
+    if not arguments.batch:
+        yield bin_list_from_xml, clip_list
+
+
+def _drop_element(element: _Element) -> None:
+    parent = element.getparent()
+    if parent is not None:
+        _drop_previous_siblings(element)
+        parent.remove(element)
+
+
+def _drop_previous_siblings(element: _Element) -> None:
+    """
+    The siblings before an element are parsed and handed over already
+    """
+    parent = element.getparent()
+    while element.getprevious() is not None:
+        del parent[0]
+
+
+def write_xml(items: Iterable[Iterable[Node]], output: Union[str, BinaryIO, None] = None,
+              compress: Optional[bool] = None) -> int:
+    """
+    Serializes every node as soon as it is produced, items may be a generator. Returns the number of written nodes.
+    output - a path (OUTPUT_PATH by default), STDOUT or an open binary file, which is written as the nodes come.
+    A path gets a temporary file next to it which replaces it only when every item is written,
+    so an error in a later bin leaves the previous output untouched.
+    compress - gzip the document, by default when the path ends with .gz
+    """
+    with open_output(output, compress) as stream:
+        return _write_document(stream, (node for item in items for node in item))
+
+
+def write_xml_per_bin(items: Iterable[Iterable[Node]], output_path: Optional[str] = None,
+                      compress: Optional[bool] = None) -> int:
+    """
+    write_xml of every item into its own document: out.01.xml, out.02.xml ... for out.xml
+    Every file is replaced on its own, the bins written before an error are kept
+    """
+    output_path = output_path or OUTPUT_PATH
+    nodes = 0
+    for idx, item in enumerate(items):
+        with open_output(bin_output_path(output_path, idx), compress) as stream:
+            nodes += _write_document(stream, item)
+    return nodes
+
+
+def bin_output_path(output_path: str, idx: int) -> str:
+    base, gz = (output_path[:-3], '.gz') if output_path.endswith('.gz') else (output_path, '')
+    if base.endswith(OUTPUT_SUFFIX) and os.path.basename(base) != OUTPUT_SUFFIX:
+        # day1__outXML.xml -> day1.01__outXML.xml, outputs keep their suffix
+        base, extension = base[:-len(OUTPUT_SUFFIX)], OUTPUT_SUFFIX
+    else:
+        base, extension = os.path.splitext(base)
+    return f'{base}.{idx + 1:02d}{extension}{gz}'
+
+
+@contextmanager
+def open_output(output: Union[str, BinaryIO, None] = None, compress: Optional[bool] = None) -> Iterator[BinaryIO]:
+    if output is None:
+        output = OUTPUT_PATH
+    if compress is None:
+        compress = isinstance(output, str) and output.endswith('.gz')
+    if output == STDOUT:
+        output = sys.stdout.buffer
+    if not isinstance(output, str):
+        with _compressed(output, compress) as stream:
+            yield stream
+        output.flush()
+        return
+
+    temp_path = f'{output}.{os.getpid()}.tmp'
+    try:
+        with open(temp_path, 'wb') as temp_file:
+            with _compressed(temp_file, compress) as stream:
+                yield stream
+        os.replace(temp_path, output)
+    except BaseException:
+        # the temporary file is not there when it could not be opened
+        with suppress(FileNotFoundError):
+            os.unlink(temp_path)
+        raise
+
+
+@contextmanager
+def _compressed(output: BinaryIO, compress: bool) -> Iterator[BinaryIO]:
+    if not compress:
+        yield output
+        return
+    # mtime 0: the same document gives the same bytes
+    with gzip.GzipFile(fileobj=output, mode='wb', mtime=0) as stream:
+        yield stream
+
+
+def _write_document(output: BinaryIO, nodes: Iterable[Node]) -> int:
+    count = 0
+    with etree.xmlfile(output, encoding='UTF-8') as xml_file:
+        xml_file.write_declaration()
+        xml_file.write_doctype('<!DOCTYPE xmeml>')
+        with xml_file.element('xmeml', version='5'):
+            for node in nodes:
+                _write_node(xml_file, node.create_node())
+                count += 1
+            xml_file.write('\n')
+    output.write(b'\n')
+    return count
+
+
+def _write_node(xml_file, node: _Element) -> None:
+    # same layout as ElementTree.write(pretty_print=True) of the whole document
+    etree.indent(node, level=1)
+    xml_file.write('\n  ')
+    xml_file.write(node)
@@ -0,0 +1,193 @@
+"""
+Timecode arithmetic for every timebase, drop frame included, and batched over a whole bin.
+Formats are precomputed tables, conversions of arrays have no per frame branching.
+NumPy is used when it is installed (pip install log-helper[fast]), the pure python path gives the same results
+"""
+from bisect import bisect_right
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TIMEBASE = 25
+FRAMESPERDAY = 24 * 60 * 60 * TIMEBASE
+# below it the per clip python loop is faster than building arrays
+VECTOR_MIN_SIZE = 64
+
+
+class TimecodeFormat(NamedTuple):
+    """
+    Counting of one timebase. Drop frame skips the first `drop` labels of every minute but each tenth,
+    so 29.97 and 59.94 timecodes keep up with the clock
+    """
+    timebase: int
+    ntsc: bool
+    drop: int
+    frames_per_minute: int
+    frames_per_ten_minutes: int
+    frames_per_day: int
+
+    @property
+    def fps(self) -> float:
+        return self.timebase * 1000 / 1001 if self.ntsc else float(self.timebase)
+
+    @property
+    def frames_separator(self) -> str:
+        return ';' if self.drop else ':'
+
+
+@lru_cache(maxsize=None)
+def timecode_format(timebase: int = TIMEBASE, ntsc='FALSE', displayformat: str = 'NDF') -> TimecodeFormat:
+    """
+    ntsc and displayformat as they are written in xmeml ('TRUE'/'FALSE', 'DF'/'NDF').
+    Drop frame exists only for multiples of 30, other timebases count NDF whatever displayformat says
+    """
+    timebase = int(timebase)
+    ntsc = ntsc in (True, 'TRUE')
+    drop = timebase // 15 if displayformat == 'DF' and timebase % 30 == 0 else 0
+    frames_per_minute = 60 * timebase - drop
+    frames_per_ten_minutes = 10 * frames_per_minute + drop
+    return TimecodeFormat(timebase, ntsc, drop, frames_per_minute, frames_per_ten_minutes,
+                          24 * 6 * frames_per_ten_minutes)
+
+
+DEFAULT_FORMAT = timecode_format()
+
+
+def frame_to_label(frame: int, tc_format: TimecodeFormat = DEFAULT_FORMAT) -> int:
+    """
+    Drop frame counts frames, labels run on as if nothing was dropped
+    """
+    if not tc_format.drop:
+        return frame
+    tens, rest = divmod(frame, tc_format.frames_per_ten_minutes)
+    minutes = max(rest - tc_format.drop, 0) // tc_format.frames_per_minute
+    return frame + tc_format.drop * (9 * tens + minutes)
+
+
+def label_to_frame(label: int, tc_format: TimecodeFormat = DEFAULT_FORMAT) -> int:
+    if not tc_format.drop:
+        return label
+    minutes = label // (60 * tc_format.timebase)
+    return label - tc_format.drop * (minutes - minutes // 10)
+
+
+class DriftTable(NamedTuple):
+    """
+    Drift of the recorder against the camera as a piecewise linear table of sync points:
+    frames - camera frames of the marks in ascending order, after midnight they go on above frames_per_day
+    deltas - audio minus camera frame at each of them.
+    Between two points the delta is interpolated, before the first and after the last one
+    the nearest segment goes on. Two points, the IN and OUT marks, give one line
+    """
+    frames: Tuple[int, ...]
+    deltas: Tuple[int, ...]
+    frames_per_day: int = FRAMESPERDAY
+
+
+def drift_frame(frame: int, table: DriftTable) -> int:
+    """
+    Source frame of a video clip moved by the drift at it, wrapped into the day
+    """
+    frames = table.frames
+    if frame < frames[0] and frame + table.frames_per_day <= frames[-1]:
+        # after midnight, inside the synced part of the day
+        frame += table.frames_per_day
+    idx = min(max(bisect_right(frames, frame) - 1, 0), len(frames) - 2)
+    frame_in = frames[idx]
+    delta_in = table.deltas[idx]
+    k = (frame - frame_in) / (frames[idx + 1] - frame_in)
+    frames_with_delta = frame + delta_in + round((table.deltas[idx + 1] - delta_in) * k)
+
+    return frames_with_delta % table.frames_per_day
+
+
+def drift_frames(frames: Sequence[int], table: DriftTable, vector: Optional[bool] = None) -> List[int]:
+    """
+    drift_frame for every frame, segments are found with one searchsorted
+    """
+    if not _use_vector(len(frames), vector):
+        return [drift_frame(frame, table) for frame in frames]
+
+    points = np.asarray(table.frames, dtype=np.int64)
+    deltas = np.asarray(table.deltas, dtype=np.int64)
+    frames = np.asarray(frames, dtype=np.int64)
+    frames = np.where((frames < points[0]) & (frames + table.frames_per_day <= points[-1]),
+                      frames + table.frames_per_day, frames)
+    idx = np.clip(np.searchsorted(points, frames, side='right') - 1, 0, len(points) - 2)
+    frame_in = points[idx]
+    delta_in = deltas[idx]
+    k = (frames - frame_in) / (points[idx + 1] - frame_in)
+    frames_with_delta = frames + delta_in + np.rint((deltas[idx + 1] - delta_in) * k).astype(np.int64)
+
+    return np.mod(frames_with_delta, table.frames_per_day).tolist()
+
+
+def frame_string(frame: int, tc_format: TimecodeFormat = DEFAULT_FORMAT) -> str:
+    seconds, frames = divmod(frame_to_label(frame, tc_format), tc_format.timebase)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+
+    return f'{hours:02d}:{minutes:02d}:{seconds:02d}{tc_format.frames_separator}{frames:02d}'
+
+
+def string_frame(string: str, tc_format: TimecodeFormat = DEFAULT_FORMAT) -> int:
+    t = string.replace(';', ':').split(':')
+    label = ((int(t[0]) * 60 + int(t[1])) * 60 + int(t[2])) * tc_format.timebase + int(t[3])
+    return label_to_frame(label, tc_format)
+
+
+def frame_strings(frames: Sequence[int], tc_format: TimecodeFormat = DEFAULT_FORMAT,
+                  vector: Optional[bool] = None) -> List[str]:
+    """
+    HH:MM:SS:FF of every frame, the digits are written into a byte array at once
+    """
+    if not _use_vector(len(frames), vector):
+        return [frame_string(frame, tc_format) for frame in frames]
+
+    frames = np.asarray(frames, dtype=np.int64)
+    if frames.min() < 0 or frames.max() >= 100 * 6 * tc_format.frames_per_ten_minutes or tc_format.timebase > 100:
+        # no fixed width digits for these, python formatting handles signs and long hours
+        return [frame_string(frame, tc_format) for frame in frames.tolist()]
+    labels = frames
+    if tc_format.drop:
+        tens, rest = np.divmod(frames, tc_format.frames_per_ten_minutes)
+        minutes = np.maximum(rest - tc_format.drop, 0) // tc_format.frames_per_minute
+        labels = frames + tc_format.drop * (9 * tens + minutes)
+    seconds, labels = np.divmod(labels, tc_format.timebase)
+    minutes, seconds = np.divmod(seconds, 60)
+    hours, minutes = np.divmod(minutes, 60)
+
+    chars = np.full((len(frames), 11), ord(':'), dtype=np.uint8)
+    chars[:, 8] = ord(tc_format.frames_separator)
+    for column, values in ((0, hours), (3, minutes), (6, seconds), (9, labels)):
+        chars[:, column] = values // 10 + ord('0')
+        chars[:, column + 1] = values % 10 + ord('0')
+
+    return chars.view('S11').ravel().astype(str).tolist()
+
+
+def string_frames(strings: Sequence[str], tc_format: TimecodeFormat = DEFAULT_FORMAT,
+                  vector: Optional[bool] = None) -> List[int]:
+    """
+    string_frame of every HH:MM:SS:FF string, the digits are read from a byte array at once
+    """
+    if not _use_vector(len(strings), vector) or any(len(string) != 11 for string in strings):
+        return [string_frame(string, tc_format) for string in strings]
+
+    digits = np.frombuffer(''.join(strings).encode('ascii'), dtype=np.uint8).reshape(-1, 11).astype(np.int64)
+    digits -= ord('0')
+    hours, minutes, seconds, frames = (digits[:, column] * 10 + digits[:, column + 1] for column in (0, 3, 6, 9))
+    total_minutes = hours * 60 + minutes
+    labels = (total_minutes * 60 + seconds) * tc_format.timebase + frames
+
+    return (labels - tc_format.drop * (total_minutes - total_minutes // 10)).tolist()
+
+
+def _use_vector(size: int, vector: Optional[bool]) -> bool:
+    if vector is None:
+        vector = size >= VECTOR_MIN_SIZE
+    return vector and np is not None
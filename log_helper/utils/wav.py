@@ -0,0 +1,123 @@
+"""
+RIFF/WAVE files of the referenced media. Only the chunk headers are read, through mmap, so a header walk
+touches a few pages of a file of gigabytes. Sample data is memory mapped by numpy when it is read
+"""
+import mmap
+import os
+import struct
+from typing import Dict, NamedTuple, Optional
+
+PCM = 1
+IEEE_FLOAT = 3
+EXTENSIBLE = 0xFFFE
+SAMPLE_BITS = {PCM: (8, 16, 24, 32), IEEE_FLOAT: (32, 64)}
+
+
+class WavFormat(NamedTuple):
+    format_tag: int
+    channels: int
+    samplerate: int
+    bits: int
+
+    @property
+    def block_align(self) -> int:
+        return self.channels * self.bits // 8
+
+
+class Chunk(NamedTuple):
+    offset: int  # of the data, after the 8 byte header
+    size: int
+
+
+def read_chunks(path: str) -> Dict[bytes, Chunk]:
+    """
+    Chunks of a RIFF WAVE file by id, the first one of each id. Empty for other files
+    """
+    with open(path, 'rb') as wav_file:
+        size = os.fstat(wav_file.fileno()).st_size
+        if size < 12:
+            return {}
+        with mmap.mmap(wav_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:4] != b'RIFF' or data[8:12] != b'WAVE':
+                return {}
+            chunks = {}
+            position = 12
+            while position + 8 <= size:
+                chunk_id, chunk_size = struct.unpack_from('<4sI', data, position)
+                chunks.setdefault(chunk_id, Chunk(position + 8, min(chunk_size, size - position - 8)))
+                # chunks are word aligned
+                position += 8 + chunk_size + (chunk_size & 1)
+            return chunks
+
+
+def read_chunk(path: str, chunk: Chunk) -> bytes:
+    with open(path, 'rb') as wav_file:
+        wav_file.seek(chunk.offset)
+        return wav_file.read(chunk.size)
+
+
+def wav_format(fmt: bytes) -> WavFormat:
+    format_tag, channels, samplerate, _, _, bits = struct.unpack_from('<HHIIHH', fmt)
+    if format_tag == EXTENSIBLE and len(fmt) >= 26:
+        # the real format is the first two bytes of the sub format guid
+        format_tag = struct.unpack_from('<H', fmt, 24)[0]
+    return WavFormat(format_tag, channels, samplerate, bits)
+
+
+class WavFile:
+    """
+    Format and sample data of a PCM or float WAVE file, None from open_wav for anything else
+    """
+    def __init__(self, path: str, wav_format_: WavFormat, data: Chunk):
+        self.path = path
+        self.format = wav_format_
+        self.data = data
+
+    @property
+    def samples(self) -> int:
+        return self.data.size // self.format.block_align
+
+    @property
+    def seconds(self) -> float:
+        return self.samples / self.format.samplerate
+
+    def read(self, start: int, count: int):
+        """
+        count samples from start, mixed down to one float64 channel. Only these pages are read from the file
+        """
+        import numpy as np
+
+        start = max(start, 0)
+        count = max(min(count, self.samples - start), 0)
+        channels = self.format.channels
+        width = self.format.bits // 8
+        if count == 0:
+            return np.zeros(0)
+        data = np.memmap(self.path, dtype='u1', mode='r', shape=(count * self.format.block_align,),
+                         offset=self.data.offset + start * self.format.block_align)
+        if self.format.format_tag == IEEE_FLOAT:
+            samples = data.view({4: '<f4', 8: '<f8'}[width]).reshape(count, channels)
+        elif width == 3:
+            # 24 bit: the upper two bytes of every sample read in place as 16 bit, enough to compare sounds
+            samples = np.ndarray((count, channels), dtype='<i2', buffer=data, offset=1,
+                                 strides=(self.format.block_align, 3))
+        elif width == 1:
+            samples = data.reshape(count, channels).astype(np.int16) - 128
+        else:
+            samples = data.view({2: '<i2', 4: '<i4'}[width]).reshape(count, channels)
+        if channels == 1:
+            return samples[:, 0].astype(np.float64)
+        return samples.mean(axis=1, dtype=np.float64)
+
+
+def open_wav(path: str) -> Optional[WavFile]:
+    try:
+        chunks = read_chunks(path)
+    except OSError:
+        return None
+    if b'fmt ' not in chunks or b'data' not in chunks or chunks[b'fmt '].size < 16:
+        return None
+    wav_format_ = wav_format(read_chunk(path, chunks[b'fmt ']))
+    if wav_format_.bits not in SAMPLE_BITS.get(wav_format_.format_tag, ()) or not wav_format_.channels:
+        return None
+    return WavFile(path, wav_format_, chunks[b'data'])
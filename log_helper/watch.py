@@ -0,0 +1,239 @@
+"""
+log_helper watch: processes xmeml files as they are exported into a folder.
+
+A file is taken when its size and modification time stay the same for --settle seconds,
+so exports still being written are left alone. Changed files are processed again.
+Files go through a bounded queue to one processing thread of this process, the status of every file
+(result, queue wait, latency from its appearance to the written output) is appended to a JSON lines file.
+inotify (pip install log-helper[watch]) wakes the scanner up on writes, without it the folder is polled.
+With --profile the stage times of every file go into its status and the trace of the last file is written,
+the records are dropped after each file
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from log_helper import profiling
+from log_helper.cli import add_work_arguments, check_work_arguments, get_output_path, process_file_safely
+from log_helper.config import OUTPUT_PATH, OUTPUT_SUFFIX
+from log_helper.log_helper import WorkArguments
+from log_helper.rules import Rules, get_rules
+
+STATUS_NAME = 'log_helper_status.jsonl'
+
+
+class Job(NamedTuple):
+    path: str
+    signature: Tuple[int, int]
+    detected: float  # time.time() when this version of the file was first seen
+    ready: float  # time.time() when it settled and was queued
+
+
+class _Seen(NamedTuple):
+    signature: Tuple[int, int]
+    detected: float
+    settled_since: float  # time.monotonic()
+
+
+class Watcher:
+    def __init__(self, directory: str, arguments: WorkArguments, output_dir: str, rules: Optional[Rules] = None,
+                 settle: float = 2.0, interval: float = 1.0, queue_size: int = 16, status_path: Optional[str] = None,
+                 existing: bool = False, poll: bool = False):
+        self.directory = directory
+        self.arguments = arguments
+        self.output_dir = output_dir
+        self.rules = rules if rules is not None else Rules(interactive=False)
+        self.settle = settle
+        self.interval = interval
+        self.status_path = status_path or os.path.join(output_dir, STATUS_NAME)
+        self.jobs: 'queue.Queue[Optional[Job]]' = queue.Queue(maxsize=queue_size)
+        self.__seen: Dict[str, _Seen] = {}
+        self.__done: Dict[str, Tuple[int, int]] = {}
+        self.__inotify = None if poll else _open_inotify(directory)
+        if not existing:
+            # what is already there has been processed before the start
+            for path, signature in self.__list_files().items():
+                self.__done[path] = signature
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self.__inotify is not None
+
+    def scan(self) -> List[Job]:
+        """
+        Files whose size and modification time did not change for settle seconds and were not processed yet
+        """
+        now = time.monotonic()
+        wall_now = time.time()
+        files = self.__list_files()
+        ready = []
+        for path, signature in files.items():
+            if self.__done.get(path) == signature:
+                continue
+            seen = self.__seen.get(path)
+            if seen is None or seen.signature != signature:
+                self.__seen[path] = _Seen(signature, wall_now if seen is None else seen.detected, now)
+            elif now - seen.settled_since >= self.settle:
+                ready.append(Job(path, signature, seen.detected, wall_now))
+                self.__done[path] = signature
+                del self.__seen[path]
+        for path in set(self.__seen) - set(files):
+            del self.__seen[path]
+        return ready
+
+    def process(self, job: Job) -> dict:
+        started = time.time()
+        arguments = self.arguments._replace(file=job.path, files=(job.path,))
+        output_path = get_output_path(job.path, self.output_dir, compress=arguments.gzip)
+        if arguments.profile:
+            profiling.enable(arguments.profile)
+        result = process_file_safely(arguments, self.rules, output_path)
+        # the daemon runs for days, the report of each file goes to the status file only
+        del self.rules.unresolved[:]
+        del self.rules.consulted[:]
+        records = []
+        if arguments.profile:
+            profiling.write()
+            records = profiling.disable()
+        finished = time.time()
+        status = {
+            'file': job.path,
+            'output': result.output if result.error is None else None,
+            'status': 'ok' if result.error is None else 'error',
+            'error': result.error,
+            'items': result.nodes,
+            'unresolved': [f'{item.kind}: {item.key}' for item in result.unresolved],
+            'detected': round(job.detected, 3),
+            'started': round(started, 3),
+            'finished': round(finished, 3),
+            'queue_wait': round(started - job.ready, 3),
+            'seconds': round(result.seconds, 3),
+            'latency': round(finished - job.detected, 3),
+        }
+        if records:
+            stages = {}
+            for record in records:
+                stages[record.name] = stages.get(record.name, 0.0) + record.wall
+            status['stages'] = {name: round(seconds, 3) for name, seconds in stages.items()}
+        self.write_status(status)
+        return status
+
+    def write_status(self, status: dict):
+        with open(self.status_path, 'a', encoding='utf-8') as status_file:
+            status_file.write(json.dumps(status, ensure_ascii=False) + '\n')
+        print(f"{status['status']:<5} {status['file']} {status['items']} items, "
+              f"{status['seconds']:.2f} s, latency {status['latency']:.2f} s" +
+              (f" ({status['error']})" if status['error'] else ''), flush=True)
+
+    def run(self, stop: Optional[threading.Event] = None):
+        """
+        Scans until stop is set or KeyboardInterrupt, the file being processed is finished before returning
+        """
+        stop = stop or threading.Event()
+        worker = threading.Thread(target=self.__work, name='log_helper watch', daemon=True)
+        worker.start()
+        try:
+            while not stop.is_set():
+                for job in self.scan():
+                    # blocks when the queue is full, the scanner waits for the processing thread
+                    self.jobs.put(job)
+                self.__wait(self.settle if self.__seen else self.interval, stop)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # queued files are dropped, they are found again at the next start with --existing
+            try:
+                while True:
+                    self.jobs.get_nowait()
+            except queue.Empty:
+                pass
+            self.jobs.put(None)
+            worker.join()
+            if self.__inotify is not None:
+                self.__inotify.close()
+
+    def __work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            self.process(job)
+
+    def __wait(self, timeout: float, stop: threading.Event):
+        if self.__inotify is not None:
+            # returns as soon as something is written, moved or created in the folder
+            self.__inotify.read(timeout=int(timeout * 1000))
+        else:
+            stop.wait(timeout)
+
+    def __list_files(self) -> Dict[str, Tuple[int, int]]:
+        files = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                name = entry.name
+                if (not name.lower().endswith('.xml') or name.endswith(OUTPUT_SUFFIX) or name.startswith('.')
+                        or not entry.is_file()):
+                    continue
+                stat = entry.stat()
+                files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+
+def _open_inotify(directory: str):
+    try:
+        from inotify_simple import INotify, flags
+    except ImportError:
+        return None
+    try:
+        inotify = INotify()
+        inotify.add_watch(directory, flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.MODIFY)
+    except OSError:
+        return None
+    return inotify
+
+
+def get_watch_arguments(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(prog='log_helper watch')
+    p.add_argument('directory')
+    p.add_argument('-o', '--output-dir', dest='output_dir',
+                   help='folder for <name>__outXML.xml outputs and the status file, the folder of OUTPUT_PATH by default')
+    p.add_argument('--settle', type=float, default=2.0, help='seconds a file must stay unchanged, 2 by default')
+    p.add_argument('--interval', type=float, default=1.0, help='seconds between scans, 1 by default')
+    p.add_argument('--queue', type=int, default=16, help='files waiting for processing at most, 16 by default')
+    p.add_argument('--status', help=f'JSON lines status file, {STATUS_NAME} in the output folder by default')
+    p.add_argument('--existing', action='store_true', default=False,
+                   help='process the files that are in the folder at the start as well')
+    p.add_argument('--poll', action='store_true', default=False, help='poll even when inotify is available')
+    add_work_arguments(p)
+
+    args = p.parse_args(argv)
+    if not os.path.isdir(args.directory):
+        p.error(f'{args.directory} is not a directory')
+    if args.jobs != 1 and (args.stream or not args.batch):
+        p.error('-j/--jobs needs --batch and cannot be used with --stream')
+    check_work_arguments(p, args)
+    return args
+
+
+def main(argv: List[str]):
+    args = get_watch_arguments(argv)
+    watch_options = {name: getattr(args, name) for name in ('directory', 'output_dir', 'settle', 'interval', 'queue',
+                                                              'status', 'existing', 'poll')}
+    for name in watch_options:
+        delattr(args, name)
+    # a daemon has nobody to ask
+    args.non_interactive = True
+    arguments = WorkArguments(file='', **vars(args))
+
+    output_dir = watch_options['output_dir'] or os.path.dirname(OUTPUT_PATH)
+    watcher = Watcher(watch_options['directory'], arguments, output_dir, get_rules(arguments.rules, interactive=False),
+                      settle=watch_options['settle'], interval=watch_options['interval'],
+                      queue_size=watch_options['queue'], status_path=watch_options['status'],
+                      existing=watch_options['existing'], poll=watch_options['poll'])
+    print(f"watching {watch_options['directory']} ({'inotify' if watcher.uses_inotify else 'polling'}), "
+          f'outputs in {output_dir}, Ctrl+C to stop', flush=True)
+    watcher.run()
@@ -15,7 +15,7 @@ with open('README.rst') as readme_file:
 
 requirements = [
     'argparse',
-    'lxml'
+    'lxml>=4.5'
 ]
 
 setup(
@@ -31,6 +31,11 @@ setup(
         ],
     },
     install_requires=requirements,
+    extras_require={
+        'yaml': ['PyYAML'],
+        'fast': ['numpy'],
+        'watch': ['inotify_simple'],
+    },
     license='MIT license',
     long_description=readme,  # + '\n\n' + history,
     long_description_content_type='text/x-rst',
@@ -0,0 +1,109 @@
+import wave
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from log_helper.log_helper import WorkArguments, auto_sync_delta  # noqa: E402
+from log_helper.utils import autosync  # noqa: E402
+from log_helper.utils.autosync import SyncJob, find_offset, sync_point  # noqa: E402
+from log_helper.utils.timecode import DEFAULT_FORMAT  # noqa: E402
+from log_helper.utils.wav import open_wav  # noqa: E402
+
+RATE = 16000
+FPS = 25
+
+
+def write_wav(path, samples, channels=1, width=2):
+    scale = 2 ** (8 * width - 1) - 1
+    data = np.repeat(np.round(samples * scale).astype('<i4'), channels)
+    with wave.open(str(path), 'wb') as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(width)
+        wav_file.setframerate(RATE)
+        # little endian int32 bytes, the lowest `width` ones are the sample
+        wav_file.writeframes(data.view('u1').reshape(-1, 4)[:, :width].tobytes())
+    return str(path)
+
+
+def make_recording(tmp_path, seconds=30, seed=0):
+    rnd = np.random.default_rng(seed)
+    # a recording with some structure: noise shaped by a slow envelope
+    samples = rnd.uniform(-1, 1, seconds * RATE) * np.repeat(rnd.uniform(0.1, 0.9, seconds * 10), RATE // 10)
+    return samples * 0.5, write_wav(tmp_path / 'recorder.wav', samples * 0.5, channels=2, width=3)
+
+
+def test_read_24_bit_stereo(tmp_path):
+    samples, path = make_recording(tmp_path, seconds=1)
+    wav = open_wav(path)
+    assert (wav.format.channels, wav.format.bits, wav.samples) == (2, 24, RATE)
+    read = wav.read(100, 50) / 2 ** 15
+    assert np.allclose(read, samples[100:150], atol=1e-4)
+    assert open_wav(str(tmp_path / 'missing.wav')) is None
+
+
+def test_find_offset():
+    rnd = np.random.default_rng(1)
+    signal = rnd.normal(size=5000)
+    lag, score = find_offset(signal[1234:3234], signal)
+    assert lag == 1234
+    assert score > 20
+
+
+def test_sync_point(tmp_path):
+    samples, recorder = make_recording(tmp_path)
+    # the camera rolled 7.32 s into the recording, its timecode is 1.5 s off the recorder
+    offset = round(7.32 * RATE)
+    scratch = samples[offset:offset + 10 * RATE] + np.random.default_rng(2).normal(scale=0.05, size=10 * RATE)
+    scratch_path = write_wav(tmp_path / 'A001C001.wav', scratch)
+    audio_frame = 90000
+    video_frame = audio_frame + round(7.32 * FPS) - round(1.5 * FPS)
+    job = SyncJob(scratch_path, video_frame, FPS, 10 * FPS, recorder, audio_frame, FPS, guess=0)
+
+    point = sync_point(job, window=2.0)
+    assert point is not None
+    assert abs(point.delta - round(1.5 * FPS)) <= 1
+    # beyond the window only noise is found
+    assert sync_point(job, window=1.0) is None
+
+
+class AudioClip:
+    """
+    The part of Clip auto_sync_delta reads
+    """
+    def __init__(self, path, frame, duration, is_video):
+        self.file_path = path
+        self.frame = frame
+        self.duration = duration
+        self.video = is_video
+        self.in_ = self.out = -1
+
+    def get_timecode_frame(self, source):
+        return self.frame
+
+    def get_timecode_format(self, source):
+        return DEFAULT_FORMAT
+
+    def is_video(self):
+        return self.video
+
+
+def test_auto_sync_delta_without_marks(tmp_path, monkeypatch):
+    samples, recorder = make_recording(tmp_path)
+    clips = [AudioClip(recorder, 90000, 30 * FPS, False)]
+    for idx, start in enumerate((3, 15)):
+        scratch = samples[start * RATE:(start + 8) * RATE]
+        path = write_wav(tmp_path / f'A001C00{idx}.wav', scratch)
+        # the camera is 1 s behind the recorder
+        clips.append(AudioClip(path.replace('.wav', '.mov'), 90000 + start * FPS - FPS, 8 * FPS, True))
+    arguments = WorkArguments(file='', bin=False, next_day=False, prev_day=False, rename=False, merge=False,
+                              batch=False, testing=False, auto_sync=True)
+
+    delta = auto_sync_delta(clips, arguments)
+    assert delta.table.deltas == (FPS, FPS)
+
+    # the points found are stored with --cache, a second run does not correlate again
+    arguments = arguments._replace(cache=str(tmp_path / 'cache.sqlite'))
+    assert auto_sync_delta(clips, arguments) == delta
+    monkeypatch.setattr(autosync, 'sync_point', lambda job, window: pytest.fail('correlated again'))
+    assert auto_sync_delta(clips, arguments) == delta
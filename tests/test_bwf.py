@@ -0,0 +1,76 @@
+import os
+import struct
+
+from lxml import etree
+
+from log_helper.log_helper import get_log_info, read_audio_metadata, set_log_info
+from log_helper.utils.bwf import AudioMetadata, read_all_metadata, read_metadata
+from log_helper.utils.fcpxml import Clip
+
+CLIPS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'clips.xml')
+IXML = b'<?xml version="1.0"?><BWFXML><SCENE>101-12-3</SCENE><TAKE>4</TAKE><NOTE>wild</NOTE></BWFXML>\x00\x00'
+
+
+def chunk(chunk_id, data):
+    return chunk_id + struct.pack('<I', len(data)) + data + b'\x00' * (len(data) & 1)
+
+
+def write_bwf(path, description=b'', time_reference=0, ixml=None):
+    fmt = struct.pack('<HHIIHH', 1, 2, 48000, 48000 * 6, 6, 24)
+    bext = struct.pack('<256s32s32s10s8sII', description, b'', b'', b'', b'', time_reference & 0xFFFFFFFF,
+                       time_reference >> 32) + b'\x00' * 346
+    body = b'WAVE' + chunk(b'fmt ', fmt) + chunk(b'bext', bext)
+    if ixml is not None:
+        body += chunk(b'iXML', ixml)
+    body += chunk(b'data', b'\x00' * 600)
+    with open(path, 'wb') as wav_file:
+        wav_file.write(b'RIFF' + struct.pack('<I', len(body)) + body)
+    return str(path)
+
+
+def test_read_metadata(tmp_path):
+    # 10:00:00 at 48 kHz does not fit in 32 bits
+    seconds = 10 * 3600
+    description = b'sSPEED=025.000-ND\r\nsSCENE=101-12-2\r\nsTAKE=7\r\n'
+    path = write_bwf(tmp_path / 'take.wav', description, seconds * 48000)
+
+    metadata = read_metadata(path)
+    assert metadata == AudioMetadata('101-12-2', '7', None, seconds * 48000, 48000)
+    assert metadata.seconds == seconds
+
+    # iXML is preferred to the bext description
+    path = write_bwf(tmp_path / 'ixml.wav', description, 0, IXML)
+    assert read_metadata(path)[:3] == ('101-12-3', '4', 'wild')
+
+    (tmp_path / 'plain.txt').write_bytes(b'not a wave file')
+    assert read_all_metadata([path, str(tmp_path / 'plain.txt'), str(tmp_path / 'missing.wav')]) == {
+        path: read_metadata(path)}
+
+
+def test_metadata_names_the_clip(tmp_path):
+    root = etree.parse(CLIPS_PATH).getroot()
+    audio = [element for element in root.iter('clip') if element.get('id').endswith('.WAV')][0]
+    path = write_bwf(tmp_path / 'take.wav', time_reference=9 * 3600 * 48000, ixml=IXML)
+    audio.find('.//pathurl').text = 'file://localhost' + path.replace(' ', '%20')
+    clip = Clip.Clip(audio)
+
+    metadata = read_audio_metadata([clip])
+    set_log_info(clip, metadata=metadata[path])
+    assert (clip.series, clip.scene, clip.shot, clip.take) == ('101', '12', '03', '04')
+    # the xml already has a source timecode, it is kept
+    assert clip.get_timecode_frame('source') == 822295
+
+    # without one it comes from the time reference
+    file_ = audio.find('.//file')
+    file_.remove(file_.find('timecode'))
+    clip = Clip.Clip(audio)
+    read_audio_metadata([clip])
+    assert clip.get_timecode_frame('source') == 9 * 3600 * 25
+
+
+def test_plain_scene_keeps_the_series_and_shot_of_the_name():
+    # 4_41f_4_9p.WAV, the recorder only knows the scene
+    metadata = AudioMetadata('12', '4', None, None, None)
+    assert get_log_info(False, '4_41f_4_9p.WAV', metadata=metadata) == ('284', '12', '04', '04')
+    assert get_log_info(False, '4_41f_4_9p.WAV', metadata=metadata._replace(scene='12_3')) == ('284', '12', '03', '04')
+    assert get_log_info(False, '4_41f_4_9p.WAV', metadata=metadata._replace(take='2p')) == ('284', '12', '04', '02pu')
@@ -0,0 +1,129 @@
+from copy import deepcopy
+import os
+
+from lxml import etree
+
+from log_helper import rules as rules_module
+from log_helper.cache import CachedBin, ResultCache
+from log_helper.log_helper import WorkArguments, _referenced_files, get_xml_items
+from log_helper.rules import BIN, SCENE, Rules
+
+CLIPS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'clips.xml')
+
+
+def load_bins():
+    root = etree.parse(CLIPS_PATH).getroot()
+    for clip in root.iter('clip'):
+        clip.find('in').text = '50'
+        clip.find('out').text = '60'
+    return [root]
+
+
+def node_bytes(items):
+    nodes = []
+    for node in items[0]:
+        element = node.create_node()
+        # bins get a new uuid every run
+        for uuid_ in element.findall('uuid'):
+            element.remove(uuid_)
+        nodes.append(etree.tostring(element))
+    return nodes
+
+
+def test_replay_needs_the_same_answers(tmp_path):
+    with ResultCache(str(tmp_path / 'cache.sqlite')) as cache:
+        rules = Rules(interactive=False)
+        rules.answer(SCENE, '101_3_4')
+        rules.ask(BIN, '101.12', '101.12?')
+        cache.put('key', CachedBin([b'<clip/>'], rules.consulted))
+
+        rules = Rules(interactive=False)
+        assert cache.replay('key', rules) == [b'<clip/>']
+        # the unanswered question is reported again
+        assert [item.key for item in rules.unresolved] == ['101.12']
+        assert cache.replay('key', Rules({BIN: {'101.12': '101.12+13'}}, interactive=False)) is None
+        assert cache.replay('key', Rules({SCENE: {'101_3_4': '12_03'}}, interactive=False)) is None
+        # it would be asked now
+        assert cache.replay('key', Rules(interactive=True)) is None
+        assert cache.replay('other', Rules(interactive=False)) is None
+
+
+def test_unchanged_bins_are_replayed_without_questions(tmp_path, monkeypatch):
+    questions = []
+    monkeypatch.setattr(rules_module, 'ask', lambda question: questions.append(question) or '')
+    arguments = WorkArguments(file=CLIPS_PATH, bin=True, next_day=False, prev_day=False, rename=True, merge=True,
+                              batch=False, testing=False)
+    expected = node_bytes(get_xml_items(load_bins(), arguments, Rules()))
+    asked = len(questions)
+    assert asked
+
+    arguments = arguments._replace(cache=str(tmp_path / 'cache.sqlite'))
+    assert node_bytes(get_xml_items(load_bins(), arguments, Rules())) == expected
+    assert len(questions) == 2 * asked
+
+    # answers typed in the first cached run are not asked again
+    assert node_bytes(get_xml_items(load_bins(), arguments, Rules())) == expected
+    assert len(questions) == 2 * asked
+
+
+def test_changed_audio_file_reprocesses_the_bin(tmp_path, capsys):
+    wav_path = tmp_path / 'take.wav'
+    wav_path.write_bytes(b'RIFF')
+    bins = load_bins()
+    for pathurl in bins[0].iter('pathurl'):
+        pathurl.text = 'file://localhost' + str(wav_path)
+    arguments = WorkArguments(file=CLIPS_PATH, bin=True, next_day=False, prev_day=False, rename=True, merge=True,
+                              batch=False, testing=False, non_interactive=True, bwf=True,
+                              cache=str(tmp_path / 'cache.sqlite'))
+
+    def cache_report():
+        get_xml_items(bins, arguments, Rules(interactive=False))
+        return [line for line in capsys.readouterr().out.splitlines() if line.startswith('cache:')]
+
+    assert cache_report() == ['cache: 0 bins replayed, 1 processed']
+    assert cache_report() == ['cache: 1 bins replayed, 0 processed']
+    # a re-stamped recorder file
+    wav_path.write_bytes(b'RIFF' + b'\x00' * 8)
+    assert cache_report() == ['cache: 0 bins replayed, 1 processed']
+    assert cache_report() == ['cache: 1 bins replayed, 0 processed']
+    # without --bwf the files are not read, the key does not change with them
+    arguments = arguments._replace(bwf=False)
+    assert cache_report() == ['cache: 0 bins replayed, 1 processed']
+    wav_path.unlink()
+    assert cache_report() == ['cache: 1 bins replayed, 0 processed']
+
+
+def test_auto_sync_keys_the_scratch_audio_names():
+    arguments = WorkArguments(file=CLIPS_PATH, bin=True, next_day=False, prev_day=False, rename=True, merge=True,
+                              batch=False, testing=False, auto_sync=True)
+    paths = _referenced_files(load_bins()[0], arguments)
+    assert '/Volumes/MEDIA/A001C001.mov' in paths
+    # not there yet, one exported later changes the key
+    assert {'/Volumes/MEDIA/A001C001.wav', '/Volumes/MEDIA/A001C001.WAV'} <= set(paths)
+    assert _referenced_files(load_bins()[0], arguments._replace(auto_sync=False)) == []
+
+
+def test_added_clip_replays_the_other_clips(tmp_path, capsys):
+    def load_with_new_clip():
+        root = load_bins()[0]
+        clip = deepcopy(list(root.iter('clip'))[-1])
+        clip.set('id', '4_41f_4_10.WAV')
+        clip.find('name').text = '4_41f_4_10.WAV'
+        clip.find('in').text = clip.find('out').text = '-1'
+        list(root.iter('clip'))[-1].addnext(clip)
+        return [root]
+
+    arguments = WorkArguments(file=CLIPS_PATH, bin=False, next_day=False, prev_day=False, rename=True, merge=False,
+                              batch=False, testing=False, non_interactive=True)
+    expected = node_bytes(get_xml_items(load_with_new_clip(), arguments, Rules(interactive=False)))
+    arguments = arguments._replace(cache=str(tmp_path / 'cache.sqlite'))
+
+    def clip_cache_report(bins):
+        items = get_xml_items(bins, arguments, Rules(interactive=False))
+        return node_bytes(items), [line for line in capsys.readouterr().out.splitlines() if 'cache:' in line]
+
+    assert clip_cache_report(load_bins())[1] == ['clip cache: 0 clips replayed, 2 processed',
+                                                 'cache: 0 bins replayed, 1 processed']
+    # without -B the file is one bin, it changed, its old clips did not
+    assert clip_cache_report(load_with_new_clip()) == (expected, ['clip cache: 2 clips replayed, 1 processed',
+                                                                  'cache: 0 bins replayed, 1 processed'])
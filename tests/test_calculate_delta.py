@@ -0,0 +1,56 @@
+import pytest
+
+from log_helper.errors import SyncMarksMismatch
+from log_helper.log_helper import WorkArguments, calculate_delta
+from log_helper.utils.timecode import DEFAULT_FORMAT, FRAMESPERDAY
+
+ARGUMENTS = WorkArguments(file='', bin=False, next_day=False, prev_day=False, rename=False, merge=False,
+                          batch=False, testing=False)
+
+
+class MarkedClip:
+    """
+    The part of Clip calculate_delta reads
+    """
+    def __init__(self, source, is_video, in_=-1, out=-1):
+        self.id_ = 'clip'
+        self.source = source
+        self.video = is_video
+        self.in_ = in_
+        self.out = out
+
+    def get_timecode_frame(self, source):
+        return self.source
+
+    def get_timecode_format(self, source):
+        return DEFAULT_FORMAT
+
+    def is_video(self):
+        return self.video
+
+
+def test_in_and_out_give_the_line():
+    clips = [MarkedClip(1000, True, in_=10), MarkedClip(5000, True, out=20),
+             MarkedClip(1100, False, in_=10), MarkedClip(5103, False, out=20)]
+    delta = calculate_delta(clips, ARGUMENTS)
+
+    assert delta[:5] == (100, 1010, 4010.0, 3, FRAMESPERDAY)
+    assert delta.drift_table() == delta._replace(table=None).drift_table()
+    assert all(clip.in_ == -1 and clip.out == -1 for clip in clips)
+
+
+def make_day_clips():
+    # the day runs past midnight, marks are given in any order
+    day_start = FRAMESPERDAY - 1000
+    return [MarkedClip(500, True, in_=0), MarkedClip(day_start, True, in_=0), MarkedClip(3000, True, out=0),
+            MarkedClip(day_start + 100, False, in_=0), MarkedClip(3110, False, out=0), MarkedClip(605, False, in_=0)]
+
+
+def test_every_mark_is_a_sync_point():
+    delta = calculate_delta(make_day_clips(), ARGUMENTS)
+
+    assert delta.table.frames == (FRAMESPERDAY - 1000, FRAMESPERDAY + 500, FRAMESPERDAY + 3000)
+    assert delta.table.deltas == (100, 105, 110)
+
+    with pytest.raises(SyncMarksMismatch):
+        calculate_delta(make_day_clips()[:-1], ARGUMENTS)
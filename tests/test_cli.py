@@ -0,0 +1,80 @@
+import os
+from copy import deepcopy
+
+from lxml import etree
+
+from log_helper import cli, profiling
+from log_helper.log_helper import WorkArguments
+from log_helper.rules import Rules
+
+CLIPS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'clips.xml')
+
+
+def write_clips(path, marked):
+    tree = etree.parse(CLIPS_PATH)
+    for clip in tree.getroot().iter('clip'):
+        clip.find('in').text = '50' if marked else '-1'
+        clip.find('out').text = '60' if marked else '-1'
+    tree.write(str(path))
+    return str(path)
+
+
+def test_expand_files(tmp_path):
+    for name in ('b.xml', 'a.xml', 'notes.txt'):
+        (tmp_path / name).write_text('')
+    xml_files = [str(tmp_path / 'a.xml'), str(tmp_path / 'b.xml')]
+
+    assert cli.expand_files([str(tmp_path)]) == xml_files
+    assert cli.expand_files([str(tmp_path / '*.xml'), str(tmp_path / 'a.xml')]) == xml_files
+    assert cli.expand_files([str(tmp_path / 'missing.xml')]) == [str(tmp_path / 'missing.xml')]
+
+
+def test_output_paths(monkeypatch):
+    monkeypatch.setattr(cli, 'OUTPUT_PATH', '/out/__outXML.xml')
+    assert cli.get_output_paths(['day1.xml']) == ['/out/__outXML.xml']
+    assert cli.get_output_paths(['a/day1.xml', 'b/day1.xml', 'day2.xml']) == [
+        '/out/day1__outXML.xml', '/out/day1_2__outXML.xml', '/out/day2__outXML.xml']
+    assert cli.get_output_paths(['day1.xml'], compress=True) == ['/out/__outXML.xml.gz']
+    assert cli.get_output_paths(['day1.xml'], '-', compress=True) == ['-']
+
+
+def test_output_folder(tmp_path):
+    assert cli.get_output_paths(['a/day1.xml'], str(tmp_path)) == [str(tmp_path / 'day1__outXML.xml')]
+    assert cli.get_output_paths(['day1.xml', 'day2.xml'], str(tmp_path), compress=True) == [
+        str(tmp_path / 'day1__outXML.xml.gz'), str(tmp_path / 'day2__outXML.xml.gz')]
+
+
+def test_failed_file_does_not_stop_the_others(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, 'OUTPUT_PATH', str(tmp_path / '__outXML.xml'))
+    files = (write_clips(tmp_path / 'unmarked.xml', marked=False), write_clips(tmp_path / 'marked.xml', marked=True))
+    arguments = WorkArguments(file=files[0], bin=False, next_day=False, prev_day=False, rename=False, merge=False,
+                              batch=False, testing=False, files=files)
+
+    results = cli.process_files(arguments, Rules(interactive=False))
+
+    assert [result.error for result in results] == ['DeltaBaseZero', None]
+    assert results[1].nodes == 2
+    assert not os.path.exists(results[0].output)
+    assert etree.parse(results[1].output).getroot().findall('clip')
+
+
+def test_workers_do_not_repeat_the_records_of_the_parent(tmp_path):
+    tree = etree.parse(write_clips(tmp_path / 'day1.xml', marked=True))
+    first_bin = tree.getroot().find('bin')
+    second_bin = deepcopy(first_bin)
+    second_bin.find('name').text = 'clips 2'
+    first_bin.addnext(second_bin)
+    tree.write(str(tmp_path / 'day1.xml'))
+    arguments = WorkArguments(file=str(tmp_path / 'day1.xml'), bin=False, next_day=False, prev_day=False,
+                              rename=False, merge=False, batch=True, testing=False, jobs=2, profile='profile.json')
+
+    profiling.enable()
+    try:
+        cli.process_file(arguments, Rules(interactive=False), str(tmp_path / 'out.xml'))
+    finally:
+        records = profiling.disable()
+
+    names = [record.name for record in records]
+    assert names.count('get_bin_list') == names.count('write_xml') == 1
+    assert names.count('bin') == 2
+    assert len({record.pid for record in records if record.name == 'bin'} - {os.getpid()}) >= 1
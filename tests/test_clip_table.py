@@ -0,0 +1,69 @@
+import os
+from datetime import datetime
+
+from lxml import etree
+
+from log_helper.log_helper import (FRAMESPERDAY, Delta, fix_duplicate_clip_id, insert_aux_timecodes, set_log_infos,
+                                   set_video_name_by_audio)
+from log_helper.utils.clip_table import ClipTable
+from log_helper.utils.fcpxml import Clip
+from log_helper.utils.mergeclip import plan_merge
+
+CLIPS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'clips.xml')
+STAGES_PATH = os.path.join(os.path.dirname(__file__), 'data', 'clips_stages.xml')
+DELTA = Delta(delta_in=12295, in_frame=810000, base=1000.0, k_max=5)
+DATE = datetime(2022, 10, 18)
+
+
+def load_clips():
+    parser = etree.XMLParser(remove_blank_text=True)
+    return [Clip.Clip(element) for element in etree.parse(CLIPS_PATH, parser).getroot().iter('clip')]
+
+
+def clip_bytes(clips):
+    return [etree.tostring(clip.create_node()) for clip in clips]
+
+
+def test_stages_on_a_table_write_the_same_clips():
+    # clips_stages.xml was written by the stages on plain Clip lists, before they ran on a table
+    parser = etree.XMLParser(remove_blank_text=True)
+    expected = [etree.tostring(clip) for clip in etree.parse(STAGES_PATH, parser).getroot()]
+
+    table = ClipTable(load_clips())
+    insert_aux_timecodes(table, DELTA)
+    set_log_infos(table)
+    set_video_name_by_audio(table, DATE)
+    fix_duplicate_clip_id(table)
+    table.write_back()
+
+    assert clip_bytes(table.clips) == expected
+    # the video clip is named by the audio clip it overlaps, they are merged
+    assert plan_merge(table).pairs == [(table.clips[0], table.clips[1])]
+
+
+def test_untouched_table_leaves_the_clips_as_parsed():
+    clips = load_clips()
+    expected = clip_bytes(clips)
+    table = ClipTable(clips)
+    assert len(table.source) == len(table.aux) == len(table.series) == len(clips)
+    table.write_back()
+    assert clip_bytes(clips) == expected
+
+
+def test_select_keeps_the_columns_read():
+    table = ClipTable(load_clips())
+    table.set_log(0, '101', '12', '03', '02')
+    table.write_back()
+    selected = table.select([0])
+    assert selected.clips == [table.clips[0]]
+    assert selected.log(0) == ('101', '12', '03', '02')
+    assert 'is_video' not in vars(selected)
+
+
+def test_video_after_midnight_is_named_by_audio_running_past_it():
+    table = ClipTable(load_clips())
+    # the recorder starts at 23:59:50:00, the camera at 00:00:05:00 of the next day
+    table.set_aux([5 * 25, FRAMESPERDAY - 10 * 25], ['00:00:05:00', '23:59:50:00'])
+    table.set_logs([('', '', '', ''), ('101', '12', '03', '04')])
+    set_video_name_by_audio(table, DATE)
+    assert table.name(0) == '101.12_03_04-181022m'
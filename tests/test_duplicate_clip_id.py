@@ -0,0 +1,45 @@
+import random
+from collections import Counter
+
+from log_helper.log_helper import fix_duplicate_clip_id
+
+
+class NamedClip:
+    def __init__(self, id_):
+        self.id_ = id_
+
+    def set_clip_name(self, clip_name):
+        if clip_name:
+            self.id_ = clip_name
+
+
+def naive_fix_duplicate_clip_id(clip_list):
+    """
+    The rescanning loop fix_duplicate_clip_id used
+    """
+    clip_id_list = [clip.id_ for clip in clip_list]
+    if len(clip_id_list) != len(set(clip_id_list)):
+        duplicates = [k for k, v in Counter(clip_id_list).items() if v > 1]
+        for duplicate in duplicates:
+            selected_clips = [clip for clip in clip_list if clip.id_ == duplicate]
+            for idx, clip in enumerate(selected_clips):
+                clip.set_clip_name(f'{clip.id_}_{idx:02d}')
+
+
+def test_same_suffixes_as_rescanning_loop():
+    rnd = random.Random(5)
+    for _ in range(100):
+        ids = [f'101.12_{rnd.randint(1, 8):02d}_0{rnd.randint(1, 3)}-181022m' for _ in range(rnd.randint(0, 40))]
+        clips = [NamedClip(id_) for id_ in ids]
+        expected = [NamedClip(id_) for id_ in ids]
+        fix_duplicate_clip_id(clips)
+        naive_fix_duplicate_clip_id(expected)
+        assert [clip.id_ for clip in clips] == [clip.id_ for clip in expected]
+
+
+def test_suffixed_id_does_not_collide_with_existing_one():
+    clips = [NamedClip(id_) for id_ in ('a', 'a_00', 'a', 'a_02', 'a')]
+    fix_duplicate_clip_id(clips)
+    ids = [clip.id_ for clip in clips]
+    assert ids == ['a_01', 'a_00', 'a_03', 'a_02', 'a_04']
+    assert len(set(ids)) == len(ids)
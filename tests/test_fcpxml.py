@@ -0,0 +1,149 @@
+import os
+
+from lxml import etree
+
+from log_helper.log_helper import WorkArguments
+from log_helper.utils.fcpxml import Clip
+from log_helper.utils.read_write_xml import iter_clip_batches
+
+CLIPS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'clips.xml')
+
+
+def load_clip_elements():
+    parser = etree.XMLParser(remove_blank_text=True)
+    return list(etree.parse(CLIPS_PATH, parser).getroot().iter('clip'))
+
+
+def media_bytes(node):
+    return etree.tostring(node.find('media'))
+
+
+def test_untouched_clip_writes_media_as_parsed():
+    for element in load_clip_elements():
+        assert media_bytes(Clip.Clip(element).create_node()) == etree.tostring(element.find('media'))
+
+
+def test_unknown_tags_are_kept():
+    element = load_clip_elements()[0]
+    clipitem = element.find('media/video/track/clipitem')
+    etree.SubElement(clipitem, 'customclipitem').text = 'kept'
+    etree.SubElement(clipitem.find('file'), 'customfile').text = 'kept'
+    clip = Clip.Clip(element)
+
+    assert b'customclipitem' in media_bytes(clip.create_node())
+    # a modified file and clipitem are rebuilt, the unknown children go along
+    clip.insert_timecode(100, 'aux1')
+    node = clip.create_node()
+    assert node.find('media/video/track/clipitem/customclipitem').text == 'kept'
+    assert node.find('media/video/track/clipitem/file/customfile').text == 'kept'
+
+
+def add_unknown_tags(element):
+    """
+    A clip <marker> after the comments, unknown tags first in the video track and around it in the video
+    """
+    marker = etree.Element('marker')
+    etree.SubElement(marker, 'name').text = 'kept'
+    element.find('comments').addnext(marker)
+    video = element.find('media/video')
+    video.find('track').insert(0, etree.Element('customtrack'))
+    video.insert(0, etree.Element('customvideo'))
+    video.find('track').addnext(etree.Element('customvideo'))
+
+
+def child_tags(node):
+    return [child.tag for child in node if isinstance(child.tag, str)]
+
+
+def test_unknown_tags_keep_their_place_in_rebuilt_nodes():
+    element = load_clip_elements()[0]
+    add_unknown_tags(element)
+    expected = {path: child_tags(element.find(path)) for path in ('media/video', 'media/video/track')}
+    clip = Clip.Clip(element)
+    # a dirty track rebuilds the video around it
+    clip.medias['video'].track.enabled = 'FALSE'
+    node = clip.create_node()
+
+    assert node.find('media/video/track/enabled').text == 'FALSE'
+    assert child_tags(node) == child_tags(element)
+    assert node.find('marker/name').text == 'kept'
+    for path, tags in expected.items():
+        assert child_tags(node.find(path)) == tags
+
+
+def test_unknown_tags_are_kept_when_streaming(tmp_path):
+    root = etree.parse(CLIPS_PATH).getroot()
+    add_unknown_tags(root.find('bin/children/clip'))
+    path = tmp_path / 'clips.xml'
+    path.write_bytes(etree.tostring(root))
+    arguments = WorkArguments(file=str(path), bin=False, next_day=False, prev_day=False, rename=False, merge=False,
+                              batch=False, testing=False, stream=True)
+
+    (_, clips), = iter_clip_batches(arguments)
+    node = clips[0].create_node()
+    assert node.find('marker/name').text == 'kept'
+    assert node.find('media/video/track/customtrack') is not None
+    assert child_tags(node.find('media/video')) == ['customvideo', 'track', 'customvideo']
+
+
+def test_changes_are_written():
+    element = load_clip_elements()[0]
+    clip = Clip.Clip(element)
+    clip.insert_timecode(100, 'aux1')
+    clip.set_clip_name('101.12_03_04-181026m')
+    node = clip.create_node()
+
+    clipitem = node.find('media/video/track/clipitem')
+    assert clipitem.get('id') == '101.12_03_04-181026m1'
+    assert clipitem.find('name').text == '101.12_03_04-181026m'
+    assert [link.find('linkclipref').text for link in clipitem.findall('link')][0] == '101.12_03_04-181026m1'
+    assert clipitem.find("file/timecode[source='aux1']/frame").text == '100'
+
+
+def test_dropped_sources_are_rebuilt_the_same():
+    for element in load_clip_elements():
+        clip = Clip.Clip(element)
+        clip.drop_sources()
+        assert media_bytes(clip.create_node()) == etree.tostring(element.find('media'))
+
+
+def test_comments_between_children_are_skipped():
+    element = load_clip_elements()[0]
+    expected = etree.tostring(element.find('media'))
+    clipitem = element.find('media/video/track/clipitem')
+    for parent in (element, clipitem, clipitem.find('rate'), clipitem.find('logginginfo'), clipitem.find('file')):
+        parent.insert(0, etree.Comment('skipped'))
+    clip = Clip.Clip(element)
+    assert clip.logginginfo == Clip.Clip(load_clip_elements()[0]).logginginfo
+    clip.drop_sources()
+    assert media_bytes(clip.create_node()) == expected
+
+
+def test_log_fields_follow_logginginfo():
+    clip = Clip.Clip(load_clip_elements()[1])
+    clip.series, clip.scene, clip.shot, clip.take = '101', '12+13FB', '03dop', '04pu'
+    assert (clip.series, clip.scene, clip.shot, clip.take) == ('101', '12+13FB', '03dop', '04pu')
+    assert (clip.logginginfo.scene, clip.logginginfo.shottake) == ('101.12+13FB', '03dop_04pu')
+
+    # written around the properties, read back the same way as the strings are split
+    clip.logginginfo.scene = '102.14'
+    clip.logginginfo.shottake = '05_06_07'
+    assert (clip.series, clip.scene, clip.shot, clip.take) == ('102', '14', '05', '06_07')
+    clip.series = '1.2'
+    assert (clip.series, clip.scene, clip.logginginfo.scene) == ('1', '2.14', '1.2.14')
+
+
+def test_aux_frame_follows_timecodes():
+    clip = Clip.Clip(load_clip_elements()[0])
+    clip.remove_timecode('aux1')
+    assert clip.first_aux_frame == 0
+    clip.insert_timecode(100, 'aux1')
+    assert (clip.first_aux_frame, clip.last_aux_frame) == (100, 100 + clip.duration)
+    clip.insert_timecode(200, 'aux1')
+    assert clip.first_aux_frame == 200
+    # set in place on the timecode object
+    timecodes = clip.get_main_media().track.clipitem.file.timecodes
+    timecodes['aux1'].frame = 300
+    assert clip.first_aux_frame == 300
+    timecodes['source'].set_frame(400, '00:00:16:00')
+    assert clip.get_timecode_frame('source') == 400
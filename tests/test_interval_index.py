@@ -0,0 +1,70 @@
+import random
+
+from log_helper.log_helper import FRAMESPERDAY
+from log_helper.utils.interval_index import IntervalIndex
+
+
+def naive_last_overlapping(intervals, queries):
+    """
+    The loop set_video_name_by_audio used: every audio clip is checked, the last overlapping one wins
+    """
+    result = []
+    for first, last in queries:
+        found = None
+        for idx, (interval_first, interval_last) in enumerate(intervals):
+            if not (first > interval_last or last < interval_first):
+                found = idx
+        result.append(found)
+    return result
+
+
+def random_intervals(rnd, count, span):
+    intervals = []
+    for _ in range(count):
+        first = rnd.randrange(span)
+        intervals.append((first, first + rnd.randrange(span // 10 + 1)))
+    return intervals
+
+
+def test_last_overlapping_matches_naive_loop():
+    rnd = random.Random(3)
+    for _ in range(3000):
+        span = rnd.choice([10, 100, FRAMESPERDAY])
+        intervals = random_intervals(rnd, rnd.randrange(30), span)
+        queries = random_intervals(rnd, rnd.randrange(30), span)
+        assert IntervalIndex(intervals).last_overlapping(queries) == naive_last_overlapping(intervals, queries)
+
+
+def test_touching_ends_overlap():
+    index = IntervalIndex([(0, 10), (20, 30)])
+    assert index.last_overlapping([(10, 15), (15, 19), (5, 25), (31, 40)]) == [0, None, 1, None]
+
+
+def test_without_a_day_past_midnight_is_not_wrapped():
+    # a clip running past midnight keeps its last frame above FRAMESPERDAY
+    index = IntervalIndex([(FRAMESPERDAY - 10, FRAMESPERDAY + 10)])
+    assert index.last_overlapping([(FRAMESPERDAY + 5, FRAMESPERDAY + 6), (5, 6)]) == [0, None]
+
+
+def test_clips_crossing_midnight_overlap():
+    # the audio clip runs from 23:59:59:15 past midnight, the video clip starts at 00:00:00:05
+    index = IntervalIndex([(100, 200), (FRAMESPERDAY - 10, FRAMESPERDAY + 10)], FRAMESPERDAY)
+    assert index.last_overlapping([(5, 50), (FRAMESPERDAY + 5, FRAMESPERDAY + 6), (11, 99)]) == [1, 1, None]
+    # a query crossing midnight finds intervals on both sides, the last one wins
+    index = IntervalIndex([(2, 3), (FRAMESPERDAY - 3, FRAMESPERDAY - 2)], FRAMESPERDAY)
+    assert index.last_overlapping([(FRAMESPERDAY - 5, FRAMESPERDAY + 5), (-5, 2)]) == [1, 1]
+
+
+def naive_wrapped(intervals, queries, day):
+    def frames(first, last):
+        return {frame % day for frame in range(first, last + 1)}
+    return [max((idx for idx, interval in enumerate(intervals) if frames(*interval) & frames(*query)), default=None)
+            for query in queries]
+
+
+def test_wrapped_matches_naive_frame_sets():
+    rnd = random.Random(5)
+    for _ in range(1000):
+        intervals = random_intervals(rnd, rnd.randrange(10), 100)
+        queries = random_intervals(rnd, rnd.randrange(10), 100)
+        assert IntervalIndex(intervals, 50).last_overlapping(queries) == naive_wrapped(intervals, queries, 50)
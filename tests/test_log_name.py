@@ -0,0 +1,32 @@
+import csv
+import os
+
+from log_helper.log_helper import parse_log_name
+
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), 'data', 'log_names.csv')
+
+
+def load_golden():
+    """
+    Sound file names with series, scene, shot and take given by the original
+    get_log_from_name and *_correcting functions
+    """
+    with open(GOLDEN_PATH, newline='') as golden_file:
+        reader = csv.reader(golden_file)
+        next(reader)
+        return [(name, tuple(expected)) for name, *expected in reader]
+
+
+def test_parse_log_name_matches_golden():
+    golden = load_golden()
+    mismatches = [(name, expected, parse_log_name(name)) for name, expected in golden
+                  if parse_log_name(name) != expected]
+    assert len(golden) > 2000
+    assert mismatches == []
+
+
+def test_parse_log_name_is_memoized():
+    parse_log_name.cache_clear()
+    parse_log_name('101_12_3_4')
+    parse_log_name('101_12_3_4')
+    assert parse_log_name.cache_info().hits == 1
@@ -0,0 +1,46 @@
+import json
+
+from log_helper import profiling
+
+
+def test_disabled_stage_records_nothing():
+    assert not profiling.is_enabled()
+    with profiling.stage('calculate_delta', clips=3):
+        pass
+    assert profiling.disable() == []
+
+
+def test_stages_hooks_and_trace_events(tmp_path):
+    hooked = []
+    path = tmp_path / 'profile.json'
+    profiling.enable(str(path))
+    try:
+        profiling.add_hook(hooked.append)
+        with profiling.stage('bin', index=0):
+            with profiling.stage('Clip.Clip', clips=2):
+                clips = [list(range(1000)) for _ in range(2)]
+        profiling.write()
+    finally:
+        records = profiling.disable()
+
+    assert [record.name for record in records] == ['Clip.Clip', 'bin']
+    assert hooked == records
+    assert records[0].args == {'clips': 2}
+    assert records[0].allocated > 0
+    assert records[1].start <= records[0].start and records[1].wall >= records[0].wall
+
+    events = json.loads(path.read_text())['traceEvents']
+    assert [event['name'] for event in events] == ['Clip.Clip', 'bin']
+    assert all(event['ph'] == 'X' for event in events)
+    assert events[0]['args']['clips'] == 2
+    assert len(clips) == 2
+
+
+def test_records_of_workers_are_added():
+    record = profiling.StageRecord('merge', 0.0, 0.5, 0.5, 0, 1, {'bin': '101.12'})
+    profiling.add_records([record])
+    profiling.enable()
+    try:
+        profiling.add_records([record])
+    finally:
+        assert profiling.disable() == [record]
@@ -0,0 +1,88 @@
+import gzip
+import io
+import os
+
+import pytest
+from lxml import etree
+
+from log_helper.utils.fcpxml import Clip
+from log_helper.log_helper import WorkArguments
+from log_helper.utils.read_write_xml import bin_output_path, iter_clip_batches, write_xml, write_xml_per_bin
+
+CLIPS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'clips.xml')
+
+
+def load_items():
+    return [[Clip.Clip(clip)] for clip in etree.parse(CLIPS_PATH).getroot().iter('clip')]
+
+
+def test_stream_and_gzip_give_the_same_document(tmp_path):
+    stream = io.BytesIO()
+    assert write_xml(load_items(), stream) == 2
+
+    path = str(tmp_path / 'out.xml.gz')
+    assert write_xml(load_items(), path) == 2
+    with gzip.open(path) as compressed:
+        assert compressed.read() == stream.getvalue()
+    assert etree.fromstring(stream.getvalue()).tag == 'xmeml'
+
+
+def test_failed_write_keeps_the_previous_output(tmp_path):
+    path = tmp_path / 'out.xml'
+    path.write_bytes(b'previous')
+
+    def items():
+        yield load_items()[0]
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        write_xml(items(), str(path))
+    assert path.read_bytes() == b'previous'
+    assert os.listdir(tmp_path) == ['out.xml']
+
+
+def test_unwritable_output_raises_its_own_error(tmp_path):
+    # the temporary file cannot be created in a missing folder, the error is not hidden by its cleanup
+    with pytest.raises(FileNotFoundError) as excinfo:
+        write_xml(load_items(), str(tmp_path / 'missing' / 'out.xml'))
+    assert excinfo.value.__context__ is None
+
+
+def test_per_bin_outputs(tmp_path):
+    assert write_xml_per_bin(load_items(), str(tmp_path / 'day1__outXML.xml')) == 2
+    assert sorted(os.listdir(tmp_path)) == ['day1.01__outXML.xml', 'day1.02__outXML.xml']
+    assert bin_output_path('/out/__outXML.xml.gz', 0) == '/out/__outXML.01.xml.gz'
+    assert bin_output_path('/out/cut.xml', 11) == '/out/cut.12.xml'
+
+
+@pytest.mark.parametrize('batch', [False, True])
+def test_streaming_drops_what_is_parsed(tmp_path, monkeypatch, batch):
+    root = etree.parse(CLIPS_PATH).getroot()
+    first_bin = root.find('bin')
+    audio = first_bin.find('children')[1]
+    second_bin = etree.SubElement(root, 'bin')
+    etree.SubElement(second_bin, 'name').text = 'clips 2'
+    etree.SubElement(second_bin, 'children').append(audio)
+    first_bin.addnext(etree.Element('sequence'))
+    root.append(etree.Element('sequence'))
+    path = tmp_path / 'clips.xml'
+    path.write_bytes(etree.tostring(root))
+
+    parse_clip = Clip.Clip
+    parsed_roots = []
+
+    def recording_clip(element, lazy=False):
+        parsed_roots.append(element.getroottree().getroot())
+        return parse_clip(element, lazy)
+
+    monkeypatch.setattr(Clip, 'Clip', recording_clip)
+    arguments = WorkArguments(file=str(path), bin=False, next_day=False, prev_day=False, rename=False, merge=False,
+                              batch=batch, testing=False, stream=True)
+    batches = []
+    for names, clips in iter_clip_batches(arguments):
+        # no bin that was handed over is left in the tree
+        assert not [name for name in parsed_roots[0].xpath('bin/name/text()') if name in names]
+        batches.append((names, len(clips)))
+
+    assert batches == ([(['clips'], 1), (['clips 2'], 1)] if batch else [(['clips', 'clips 2'], 2)])
+    assert len(parsed_roots[0]) == 0
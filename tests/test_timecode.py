@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+from log_helper.utils.timecode import (FRAMESPERDAY, DriftTable, drift_frame, drift_frames, frame_string,
+                                       frame_strings, string_frame, string_frames, timecode_format)
+
+FORMATS = [timecode_format(25), timecode_format(24, 'TRUE'), timecode_format(50),
+           timecode_format(30, 'TRUE', 'DF'), timecode_format(60, 'TRUE', 'DF'), timecode_format(30, 'TRUE', 'NDF')]
+
+
+def random_delta(rnd):
+    in_frame = rnd.randrange(FRAMESPERDAY)
+    return dict(delta_in=rnd.randrange(-FRAMESPERDAY // 2, FRAMESPERDAY // 2), in_frame=in_frame,
+                base=float(rnd.choice([2, 4, 10, 250, 90000])), k_max=rnd.randrange(-50, 50))
+
+
+def test_frames_per_day():
+    assert [tc_format.frames_per_day for tc_format in FORMATS] == [2160000, 2073600, 4320000, 2589408, 5178816,
+                                                                   2592000]
+
+
+def test_drop_frame_labels():
+    df = timecode_format(30, 'TRUE', 'DF')
+    assert frame_string(1799, df) == '00:00:59;29'
+    assert frame_string(1800, df) == '00:01:00;02'
+    assert frame_string(17982, df) == '00:10:00;00'
+    assert string_frame('00:01:00;02', df) == 1800
+    assert frame_string(df.frames_per_day - 1, df) == '23:59:59;29'
+
+
+def test_strings_round_trip():
+    for tc_format in FORMATS:
+        frames = list(range(0, tc_format.frames_per_day, 997)) + [tc_format.frames_per_day - 1]
+        assert [string_frame(string, tc_format) for string in frame_strings(frames, tc_format)] == frames
+
+
+def line_frame(frame, delta_in, in_frame, base, k_max):
+    """
+    The straight line between the IN and OUT marks the aux1 frames were computed with before the drift tables
+    """
+    return (frame + delta_in + round(k_max * ((frame - in_frame) / base))) % FRAMESPERDAY
+
+
+def line_table(delta):
+    return DriftTable((delta['in_frame'], delta['in_frame'] + int(delta['base'])),
+                      (delta['delta_in'], delta['delta_in'] + delta['k_max']))
+
+
+def test_drift_frame_wraps_into_the_day():
+    assert drift_frame(FRAMESPERDAY - 1, DriftTable((0, 100), (10, 10))) == 9
+    assert drift_frame(5, DriftTable((0, 100), (-10, -10))) == FRAMESPERDAY - 5
+
+
+def test_two_point_drift_is_the_line():
+    rnd = random.Random(13)
+    for _ in range(300):
+        delta = random_delta(rnd)
+        delta['in_frame'] = rnd.randrange(FRAMESPERDAY - int(delta['base']))
+        # frames at half steps of the drift, where rounding ties happen
+        frames = [rnd.randrange(FRAMESPERDAY) for _ in range(50)] + [delta['in_frame'] + step for step in range(-8, 8)]
+        expected = [line_frame(frame, **delta) for frame in frames]
+        assert [drift_frame(frame, line_table(delta)) for frame in frames] == expected
+        assert drift_frames(frames, line_table(delta), vector=False) == expected
+
+
+def test_two_point_drift_vector_is_the_line():
+    pytest.importorskip('numpy')
+    rnd = random.Random(11)
+    for _ in range(300):
+        delta = random_delta(rnd)
+        delta['in_frame'] = rnd.randrange(FRAMESPERDAY - int(delta['base']))
+        frames = [rnd.randrange(FRAMESPERDAY) for _ in range(200)] + [delta['in_frame'] + step for step in range(-8, 8)]
+        assert drift_frames(frames, line_table(delta), vector=True) == [line_frame(frame, **delta) for frame in frames]
+
+
+def test_piecewise_drift():
+    table = DriftTable((1000, 2000, 4000), (100, 110, 100))
+    assert [drift_frame(frame, table) for frame in (0, 1000, 1500, 2000, 3000, 4000, 5000)] == [
+        90, 1100, 1605, 2110, 3105, 4100, 5095]
+    # past midnight inside the synced part of the day
+    table = DriftTable((FRAMESPERDAY - 1000, FRAMESPERDAY + 1000), (100, 120))
+    assert drift_frame(0, table) == 110
+    assert drift_frame(FRAMESPERDAY - 1000, table) == FRAMESPERDAY - 900
+
+
+def test_many_point_drift_past_midnight():
+    # a night shoot: the points go on above FRAMESPERDAY after 00:00:00:00
+    table = DriftTable((FRAMESPERDAY - 2000, FRAMESPERDAY - 1000, FRAMESPERDAY + 1000, FRAMESPERDAY + 3000),
+                       (100, 120, 100, 140))
+    frames = [FRAMESPERDAY - 3000, FRAMESPERDAY - 1500, FRAMESPERDAY - 1, 0, 500, 2000, 2500, 3000]
+    # moved past midnight, the frames of the last day hours wrap into the day
+    expected = [FRAMESPERDAY - 2920, FRAMESPERDAY - 1390, 109, 110, 605, 2120, 2630, 3140]
+    assert [drift_frame(frame, table) for frame in frames] == expected
+    assert drift_frames(frames, table, vector=False) == expected
+
+
+def test_drift_frames_vector_matches_scalar():
+    pytest.importorskip('numpy')
+    rnd = random.Random(14)
+    for _ in range(100):
+        start = rnd.randrange(FRAMESPERDAY)
+        frames = sorted(rnd.sample(range(start, start + FRAMESPERDAY // 2), rnd.randrange(2, 8)))
+        table = DriftTable(tuple(frames), tuple(rnd.randrange(-50, 50) for _ in frames))
+        queries = [rnd.randrange(FRAMESPERDAY) for _ in range(200)] + [frame % FRAMESPERDAY for frame in frames]
+        assert drift_frames(queries, table, vector=True) == drift_frames(queries, table, vector=False)
+
+
+def test_strings_vector_match_scalar():
+    pytest.importorskip('numpy')
+    rnd = random.Random(12)
+    for tc_format in FORMATS:
+        frames = [rnd.randrange(tc_format.frames_per_day) for _ in range(5000)] + [0, tc_format.frames_per_day - 1]
+        strings = frame_strings(frames, tc_format, vector=False)
+        assert frame_strings(frames, tc_format, vector=True) == strings
+        assert string_frames(strings, tc_format, vector=True) == string_frames(strings, tc_format, vector=False)
+    # out of the fixed width range
+    frames = [-1, -26, 100 * 60 * 60 * 25 + 3]
+    assert frame_strings(frames, vector=True) == frame_strings(frames, vector=False)
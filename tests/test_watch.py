@@ -0,0 +1,84 @@
+import json
+import os
+
+from lxml import etree
+
+from log_helper import profiling
+from log_helper.log_helper import WorkArguments
+from log_helper.watch import Watcher
+
+CLIPS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'clips.xml')
+
+
+def write_clips(path, marked=True):
+    tree = etree.parse(CLIPS_PATH)
+    for clip in tree.getroot().iter('clip'):
+        clip.find('in').text = '50' if marked else '-1'
+        clip.find('out').text = '60' if marked else '-1'
+    tree.write(str(path))
+
+
+def make_watcher(tmp_path, **kwargs):
+    arguments = WorkArguments(file='', bin=False, next_day=False, prev_day=False, rename=False, merge=False,
+                              batch=False, testing=False, non_interactive=True)
+    (tmp_path / 'in').mkdir(exist_ok=True)
+    (tmp_path / 'out').mkdir(exist_ok=True)
+    return Watcher(str(tmp_path / 'in'), arguments, str(tmp_path / 'out'), settle=0, poll=True, **kwargs)
+
+
+def test_files_are_taken_once_settled(tmp_path):
+    watcher = make_watcher(tmp_path)
+    path = tmp_path / 'in' / 'day1.xml'
+    write_clips(path)
+    (tmp_path / 'in' / 'notes.txt').write_text('')
+
+    assert watcher.scan() == []
+    assert [job.path for job in watcher.scan()] == [str(path)]
+    assert watcher.scan() == []
+
+    # written again: a new version to process
+    path.write_text(path.read_text() + '\n')
+    assert watcher.scan() == []
+    assert [job.path for job in watcher.scan()] == [str(path)]
+
+
+def test_existing_files_are_skipped_unless_asked(tmp_path):
+    (tmp_path / 'in').mkdir()
+    write_clips(tmp_path / 'in' / 'day1.xml')
+    watcher = make_watcher(tmp_path)
+    watcher.scan()
+    assert watcher.scan() == []
+
+    watcher = make_watcher(tmp_path, existing=True)
+    watcher.scan()
+    assert len(watcher.scan()) == 1
+
+
+def test_status_of_processed_files(tmp_path):
+    watcher = make_watcher(tmp_path)
+    write_clips(tmp_path / 'in' / 'good.xml')
+    write_clips(tmp_path / 'in' / 'unmarked.xml', marked=False)
+    watcher.scan()
+    statuses = [watcher.process(job) for job in sorted(watcher.scan())]
+
+    assert [(status['status'], status['error']) for status in statuses] == [('ok', None), ('error', 'DeltaBaseZero')]
+    assert os.path.exists(tmp_path / 'out' / 'good__outXML.xml')
+    assert not os.path.exists(tmp_path / 'out' / 'unmarked__outXML.xml')
+    lines = (tmp_path / 'out' / 'log_helper_status.jsonl').read_text().splitlines()
+    assert [json.loads(line)['file'] for line in lines] == [status['file'] for status in statuses]
+    assert statuses[0]['latency'] >= statuses[0]['seconds'] >= 0
+
+
+def test_profile_records_are_dropped_after_each_file(tmp_path):
+    watcher = make_watcher(tmp_path)
+    watcher.arguments = watcher.arguments._replace(profile=str(tmp_path / 'profile.json'))
+    for name in ('day1.xml', 'day2.xml'):
+        write_clips(tmp_path / 'in' / name)
+    watcher.scan()
+    statuses = [watcher.process(job) for job in sorted(watcher.scan())]
+
+    assert not profiling.is_enabled()
+    assert all(status['stages']['file'] >= status['stages']['write_xml'] for status in statuses)
+    # the trace of the last file only
+    events = json.loads((tmp_path / 'profile.json').read_text())['traceEvents']
+    assert [event['args']['file'] for event in events if event['name'] == 'file'] == [statuses[-1]['file']]